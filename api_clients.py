@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import atexit
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from openai import OpenAI
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Keep-alive connections per API key when no concurrency level is given
+DEFAULT_POOL_SIZE = 8
+
+
+class ApiClients:
+    """
+    Pooled HTTP clients for one API key.
+
+    Holds a requests.Session (used for the vision requests and other plain HTTP
+    calls) and an OpenAI client (used for the translation requests). Both keep
+    their connections alive, so only the first request to OpenRouter pays for
+    DNS, TCP and TLS setup.
+    """
+
+    def __init__(self, api_key, pool_size=DEFAULT_POOL_SIZE):
+        self.api_key = api_key
+        self.pool_size = max(1, pool_size)
+        self._lock = threading.Lock()
+        self._openai_client = None
+
+        self.session = requests.Session()
+        self._mount_adapter()
+
+    def _mount_adapter(self):
+        # Every request goes to the same host, so one pool sized to the concurrency level is enough
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+
+    def ensure_pool_size(self, pool_size):
+        """Grow the connection pool to at least pool_size connections"""
+        with self._lock:
+            if pool_size <= self.pool_size:
+                return
+            self.pool_size = pool_size
+            old_adapter = self.session.get_adapter("https://")
+            self._mount_adapter()
+            old_adapter.close()
+
+    @property
+    def openai_client(self):
+        """The shared OpenAI client for this key (created on first use)"""
+        with self._lock:
+            if self._openai_client is None:
+                # Retries on 429 are handled by the shared rate limiter, not by the client
+                self._openai_client = OpenAI(
+                    base_url=OPENROUTER_BASE_URL,
+                    api_key=self.api_key,
+                    max_retries=0,
+                )
+            return self._openai_client
+
+    def close(self):
+        with self._lock:
+            self.session.close()
+            if self._openai_client is not None:
+                self._openai_client.close()
+                self._openai_client = None
+
+
+# One set of clients per API key, shared by every job using that key
+_API_CLIENTS = {}
+_API_CLIENTS_LOCK = threading.Lock()
+
+
+def get_api_clients(api_key=None, pool_size=None):
+    """Return the shared clients for an API key, growing the pool to pool_size if given"""
+    with _API_CLIENTS_LOCK:
+        clients = _API_CLIENTS.get(api_key or "")
+        if clients is None:
+            clients = ApiClients(api_key, max(pool_size or 0, DEFAULT_POOL_SIZE))
+            _API_CLIENTS[api_key or ""] = clients
+    if pool_size:
+        clients.ensure_pool_size(pool_size)
+    return clients
+
+
+def close_api_clients():
+    """Close every pooled connection (called automatically at interpreter exit)"""
+    with _API_CLIENTS_LOCK:
+        clients = list(_API_CLIENTS.values())
+        _API_CLIENTS.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"⚠️ Error closing API client: {str(e)}")
+
+
+atexit.register(close_api_clients)
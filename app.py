@@ -1,20 +1,25 @@
 import os
-import io
 import json
 import csv
 import shutil
-import zipfile
 import configparser
 import secrets
 import threading
 import time
-import pandas as pd
 import re
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory, make_response, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory, make_response, send_file, Response
 from werkzeug.utils import secure_filename
-from flask_socketio import SocketIO, emit
-from minimal_localization_tool import read_csv_file, process_csv_data, load_character_data, LANGUAGE_CODES
+from flask_socketio import SocketIO, emit, join_room
+from minimal_localization_tool import read_csv_file, process_csv_data, load_character_data
+from csv_ingest import validate_csv_file
+from api_clients import OPENROUTER_BASE_URL, get_api_clients
+from result_stream import checkpoint_path, write_json_array
+from job_manager import JobManager, JobQueueFull
+from job_store import JOB_STORE_FILENAME, get_job_store
+from artifact_store import get_artifact_store
+from language_export import (DEFAULT_ZIP_COMPRESSION, ZIP_COMPRESSION, export_cache_key, language_names, stream_language_zip,
+                             write_language_zip)
 
 app = Flask(__name__)
 app.secret_key = "localization_tool_secret_key"
@@ -26,108 +31,31 @@ app.config['OUTPUT_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__fil
 # Enable CORS for SocketIO and set session handling
 socketio = SocketIO(app, manage_session=True, cors_allowed_origins='*')
 
-# Global variable to store the latest processing results
-# This ensures we don't depend solely on session data
-GLOBAL_EXPORT_DATA = {
-    'results': [],
-    'languages': {},
-    'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S')
-}
+# Upper bound for the concurrent worker count accepted from the web form
+MAX_WORKERS_LIMIT = 32
+
+# CSV files larger than this are grouped through a spill file instead of in memory
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+# Localization jobs run in the background; their events go to a Socket.IO room per job
+job_manager = JobManager(emit=lambda event, data, room: socketio.emit(event, data, to=room))
+
+# Results of every job, indexed by job ID, so exports never depend on process-wide state
+job_store = get_job_store(os.path.join(app.config['OUTPUT_FOLDER'], JOB_STORE_FILENAME))
+
+# Generated downloads are kept on disk by content hash; clients only get artifact IDs
+artifact_store = get_artifact_store(os.path.join(app.config['OUTPUT_FOLDER'], 'artifacts'))
+# Artifacts of pruned or replaced jobs are deleted with them
+job_store.on_delete = artifact_store.release
 
 # Create upload and output folders if they don't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
-# Import zipfile for creating ZIP archives
-import zipfile
-import io
-
 def allowed_file(filename):
     """Check if the file has an allowed extension"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'csv'}
 
-def validate_csv_format(file_path):
-    """Validate that the CSV file has the required columns"""
-    try:
-        # Multiple attempts with different separators/parsers to ensure we can load the file
-        dfs = []
-        exceptions = []
-        
-        # Try various parsing methods
-        parsing_methods = [
-            # Try semicolon separator first (like in example.csv)
-            lambda: pd.read_csv(file_path, sep=';', encoding='utf-8', engine='python'),
-            # Try comma separator
-            lambda: pd.read_csv(file_path, sep=',', encoding='utf-8', engine='python'),
-            # Try with automatic separator detection
-            lambda: pd.read_csv(file_path, sep=None, engine='python'),
-            # Try with tab separator
-            lambda: pd.read_csv(file_path, sep='\t', encoding='utf-8', engine='python'),
-        ]
-        
-        # Try each parsing method
-        for method in parsing_methods:
-            try:
-                df = method()
-                if not df.empty and len(df.columns) > 1:  # Ensure we got meaningful data
-                    dfs.append(df)
-                    break  # Stop if we successfully parsed the file
-            except Exception as e:
-                exceptions.append(str(e))
-        
-        # If none of the above methods worked, try sniffing the dialect
-        if not dfs:
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    # Read a sample to detect dialect
-                    sample = f.read(4096)  # Read a larger sample
-                    f.seek(0)
-                    
-                    # Try to sniff the dialect
-                    try:
-                        dialect = csv.Sniffer().sniff(sample)
-                        reader = csv.reader(f, dialect)
-                        headers = next(reader)
-                        rows = list(reader)
-                        df = pd.DataFrame(rows, columns=headers)
-                        dfs.append(df)
-                    except Exception as e:
-                        # If sniffing failed, try a direct read with semicolon
-                        f.seek(0)
-                        reader = csv.reader(f, delimiter=';')
-                        headers = next(reader)
-                        rows = list(reader)
-                        df = pd.DataFrame(rows, columns=headers)
-                        dfs.append(df)
-            except Exception as e:
-                exceptions.append(f"Dialect detection failed: {str(e)}")
-        
-        # If we still don't have any dataframes, raise an error
-        if not dfs:
-            error_messages = "\n".join(exceptions)
-            return False, f"Failed to parse CSV file with any method. Errors: {error_messages}"
-        
-        # Use the first successfully parsed dataframe
-        df = dfs[0]
-        
-        # Print column names for debugging
-        print(f"CSV columns found: {list(df.columns)}")
-        
-        # Check for required columns (case insensitive)
-        required_columns = ['IDS', 'EN', 'LOCID']
-        
-        # Normalize column names by stripping whitespace and converting to uppercase
-        normalized_columns = [col.strip().upper() for col in df.columns]
-        
-        # Check each required column
-        for col in required_columns:
-            if col.upper() not in normalized_columns:
-                return False, f"Missing required column: {col}"
-        
-        return True, "CSV format is valid"
-    except Exception as e:
-        return False, f"Error validating CSV: {str(e)}"
-
 # Create a static folder for JavaScript files
 static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
 os.makedirs(static_folder, exist_ok=True)
@@ -136,52 +64,46 @@ os.makedirs(static_folder, exist_ok=True)
 def serve_static(filename):
     return send_from_directory(static_folder, filename)
 
+def find_export_job(job_id=None):
+    """
+    Return the stored job to export: the requested job ID, else the most recent
+    job of this session. Jobs submitted from another session are never returned.
+    """
+    client_id = session.get('client_id')
+    if not client_id:
+        return None
+    job_id = job_id or job_store.latest_job_id(client_id)
+    stored_job = job_store.get_job(job_id) if job_id else None
+    if not stored_job or stored_job['owner'] != client_id:
+        return None
+    return stored_job
+
+def find_session_job(job_id):
+    """Return the queued, running or recently finished job with this ID if this session submitted it"""
+    client_id = session.get('client_id')
+    job = job_manager.get(job_id or '')
+    if not client_id or not job or job.owner != client_id:
+        return None
+    return job
+
+def session_owns_artifact(artifact_id):
+    """Whether a job of this session references the artifact"""
+    client_id = session.get('client_id')
+    if not client_id:
+        return False
+    for job_id in artifact_store.job_ids(artifact_id):
+        stored_job = job_store.get_job(job_id)
+        if stored_job and stored_job['owner'] == client_id:
+            return True
+    return False
+
 @app.route('/get_available_languages')
 def get_available_languages():
-    """API endpoint to get available languages for export"""
+    """API endpoint to get available languages for export (of ?job_id=..., default: the latest job of this session)"""
     try:
-        # First check the global variable, which is the most reliable source
-        global GLOBAL_EXPORT_DATA
-        if GLOBAL_EXPORT_DATA and 'languages' in GLOBAL_EXPORT_DATA and GLOBAL_EXPORT_DATA['languages']:
-            print(f"Using global export data with languages: {list(GLOBAL_EXPORT_DATA['languages'].keys())}")
-            return jsonify({'success': True, 'languages': GLOBAL_EXPORT_DATA['languages']})
-            
-        # If global data is empty, try session
-        export_data = None
-        if 'export_data' in session:
-            try:
-                export_data = session.get('export_data')
-                print(f"Retrieved export data from session")
-                # Update global data for future use
-                GLOBAL_EXPORT_DATA = export_data
-            except Exception as e:
-                print(f"Error retrieving from session: {str(e)}")
-                export_data = None
-        
-        # If no session data, try to find backup files
-        if not export_data:
-            try:
-                export_files = [f for f in os.listdir(app.config['OUTPUT_FOLDER']) if f.startswith('export_data_')]
-                
-                if export_files:
-                    # Sort by name (timestamp) to get the most recent one
-                    latest_file = sorted(export_files)[-1]
-                    try:
-                        with open(os.path.join(app.config['OUTPUT_FOLDER'], latest_file), 'r', encoding='utf-8') as f:
-                            export_data = json.load(f)
-                            # Update both session and global data
-                            session['export_data'] = export_data
-                            GLOBAL_EXPORT_DATA = export_data
-                            session.modified = True
-                            print(f"Loaded and cached export data from backup file: {latest_file}")
-                    except Exception as e:
-                        print(f"Error loading backup file: {str(e)}")
-            except Exception as e:
-                print(f"Error searching for backup files: {str(e)}")
-        
-        # If we have export data, return languages
-        if export_data and 'languages' in export_data:
-            return jsonify({'success': True, 'languages': export_data['languages']})
+        stored_job = find_export_job(request.args.get('job_id'))
+        if stored_job and stored_job['languages']:
+            return jsonify({'success': True, 'languages': stored_job['languages'], 'job_id': stored_job['job_id']})
         
         # If all else fails, use hard-coded default languages for testing
         # These are just to ensure the UI shows something usable
@@ -298,7 +220,7 @@ def upload_file():
     csv_file.save(csv_path)
     
     # Validate CSV format
-    is_valid, message = validate_csv_format(csv_path)
+    is_valid, message = validate_csv_file(csv_path)
     if not is_valid:
         os.remove(csv_path)  # Remove invalid file
         flash(message, 'danger')
@@ -323,6 +245,14 @@ def process():
     model = request.form.get('model', 'grok3')
     api_key = request.form.get('api_key', '')
     debug_mode = 'debug_mode' in request.form
+    grouped_mode = 'grouped_mode' in request.form
+    use_cache = 'bypass_cache' not in request.form
+    
+    # Number of concurrent API requests (1 = sequential)
+    try:
+        max_workers = max(1, min(int(request.form.get('max_workers', 1)), MAX_WORKERS_LIMIT))
+    except ValueError:
+        max_workers = 1
     
     # Validate OpenRouter API key format if provided and not in debug mode
     if api_key and not debug_mode:
@@ -402,6 +332,9 @@ def process():
     custom_prompt = request.form.get('custom_prompt', '')
     game_selection = request.form.get('game_selection', 'brain-test-1')
     
+    # Identifies this browser session as the owner of the jobs it submits
+    client_id = session.setdefault('client_id', secrets.token_hex(16))
+    
     # Store processing parameters in session
     session['processing'] = {
         'csv_path': csv_path,
@@ -411,12 +344,35 @@ def process():
         'languages': selected_languages,
         'api_key': api_key,
         'debug_mode': debug_mode,
+        'max_workers': max_workers,
+        'grouped_mode': grouped_mode,
+        'use_cache': use_cache,
         'skip_images': skip_images,
         'output_formats': selected_formats,  # Store the selected output formats
         'custom_prompt': custom_prompt,      # Store the custom prompt
-        'game_selection': game_selection     # Store the game selection
+        'game_selection': game_selection,    # Store the game selection
+        'checkpoint_id': secrets.token_hex(8),  # Names the checkpoint of this job and its resumes
+        'client_id': client_id               # Only this session can read the job's results
     }
     
+    # Remember the job so it can be resumed from its checkpoint after a crash or restart
+    session['last_job'] = session['processing']
+    
+    return redirect(url_for('processing'))
+
+@app.route('/resume_last_job', methods=['POST'])
+def resume_last_job():
+    """Run the last job again, continuing from its checkpoint"""
+    last_job = session.get('last_job')
+    if not last_job:
+        flash('No previous job found to resume.', 'warning')
+        return redirect(url_for('index'))
+    
+    if not os.path.exists(last_job.get('csv_path', '')):
+        flash('The CSV file of the last job no longer exists. Please upload it again.', 'danger')
+        return redirect(url_for('index'))
+    
+    session['processing'] = dict(last_job, resume=True)
     return redirect(url_for('processing'))
 
 @app.route('/processing')
@@ -447,8 +403,8 @@ def check_openrouter_limits():
             })
         
         # Make request to OpenRouter API to get key info
-        response = requests.get(
-            url="https://openrouter.ai/api/v1/auth/key",
+        response = get_api_clients(api_key).session.get(
+            url=f"{OPENROUTER_BASE_URL}/auth/key",
             headers={
                 "Authorization": f"Bearer {api_key}"
             }
@@ -485,27 +441,18 @@ def handle_image_warning_check(data=None):
         'message': message
     })
 
-@socketio.on('start_processing')
-def handle_start_processing(data=None):
+def run_localization_job(job):
+    """
+    Run one localization job on a job manager worker.
+    
+    Status and progress events go to the job's Socket.IO room. Returns the
+    completion message (with the output file names), or None on failure.
+    """
+    emit = job.emit
     try:
-        # Check if processing is already in progress or completed
-        if session.get('processing_status') == 'in_progress':
-            emit('update_status', {
-                'status': 'Processing already in progress',
-            })
-            return
-        
-        # Set processing status to in_progress
-        session['processing_status'] = 'in_progress'
-        session.modified = True
-        
-        # Default to not skipping images
-        skip_images = False
-        if data and 'skip_images' in data:
-            skip_images = data['skip_images']
-        
-        # Get process parameters from session
-        params = session.get('processing', {})
+        # Get process parameters stored with the job
+        params = job.params
+        skip_images = params.get('skip_images_confirmed', False)
         csv_path = params.get('csv_path', '')
         images_dir = params.get('images_dir', '')
         chars_file = params.get('chars_file', '')
@@ -513,12 +460,16 @@ def handle_start_processing(data=None):
         languages = params.get('languages', ['TR', 'FR', 'DE'])
         api_key = params.get('api_key', '')
         debug_mode = params.get('debug_mode', False)
+        max_workers = params.get('max_workers', 1)
+        grouped_mode = params.get('grouped_mode', False)
+        use_cache = params.get('use_cache', True)
         custom_prompt = params.get('custom_prompt', '')
         game_selection = params.get('game_selection', 'brain-test-1')
+        resume = params.get('resume', False)
         
-        # Print session data for debugging
-        print(f"Session data during processing: {session.get('processing')}")
-        print(f"CSV path from session: {csv_path}")
+        # Print job data for debugging
+        print(f"Job {job.id} parameters: {params}")
+        print(f"CSV path for job: {csv_path}")
         
         # Check if CSV path exists and is valid
         if not csv_path:
@@ -527,7 +478,7 @@ def handle_start_processing(data=None):
                 'error': True,
                 'message': 'If you downloaded the example.csv file, you still need to upload it using the "Upload CSV" button.'
             })
-            return
+            return None
         
         if not os.path.isfile(csv_path):
             emit('update_status', {
@@ -535,7 +486,7 @@ def handle_start_processing(data=None):
                 'error': True,
                 'message': 'The CSV file may have been moved or deleted. Please upload it again.'
             })
-            return
+            return None
         
         # Always use example_chars.json as the default character file
         # Try to use explicitly specified chars file first
@@ -563,15 +514,29 @@ def handle_start_processing(data=None):
         csv_data = read_csv_file(csv_path)
         if not csv_data:
             emit('update_status', {'status': 'Error: Failed to read CSV file.', 'error': True})
-            return
+            return None
         
-        emit('update_status', {'status': f'Processing {len(csv_data)} entries...'})
+        emit('update_status', {'status': f'Processing entries from {os.path.basename(csv_path)} (separator {csv_data.delimiter!r}, {csv_data.encoding})...'})
         
         # Process data
         emit('update_status', {'status': f'Using model: {model} for translations...'})
         emit('update_status', {'status': f'Selected languages: {", ".join(languages)}'})
         if api_key:
             emit('update_status', {'status': 'Using provided API key'})
+        if max_workers > 1:
+            emit('update_status', {'status': f'Running {max_workers} API requests concurrently'})
+        if grouped_mode:
+            emit('update_status', {'status': 'Grouped mode: one translation request per image ID'})
+        if not use_cache:
+            emit('update_status', {'status': 'Translation cache bypassed: every text will be translated again'})
+        
+        # One checkpoint per submitted job, shared only with its resumes; a resumed job skips the translations it already holds
+        checkpoint_file = checkpoint_path(app.config['OUTPUT_FOLDER'], csv_path, params.get('checkpoint_id') or job.id)
+        if resume:
+            if os.path.exists(checkpoint_file):
+                emit('update_status', {'status': 'Resuming last job: finished translations are taken from the checkpoint'})
+            else:
+                emit('update_status', {'status': 'No checkpoint found for the last job, starting from the beginning'})
             
         # Add skip_images parameter to process_csv_data
         if skip_images:
@@ -584,77 +549,70 @@ def handle_start_processing(data=None):
         if custom_prompt:
             emit('update_status', {'status': 'Using custom prompt for localization'})
         
+        # Generate timestamp (with part of the job ID so parallel jobs never share output file names)
+        timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job.id[:8]}"
+        
+        # Every finished image ID is appended to this file while the job runs
+        results_file = os.path.join(app.config['OUTPUT_FOLDER'], f'results_{timestamp}.jsonl')
+        
+        # Store language codes for export
+        languages_list = language_names(languages)
+        
+        # Finished image IDs are also indexed in the job store, which the exports read from
+        job_store.create_job(job.id, languages_list, timestamp, results_file, owner=params.get('client_id'))
+        
+        def report_progress(image_id, image_result, completed, total):
+            job_store.add_result(job.id, image_id, image_result)
+            emit('progress', {
+                'filename': image_result.get('filename', ''),
+                'completed': completed,
+                'total': total
+            })
+        
+        # Only very large files are grouped on disk; smaller ones get the in-memory grouping and its reports
+        streaming = os.path.getsize(csv_path) > STREAMING_THRESHOLD_BYTES
+        if streaming:
+            emit('update_status', {'status': 'Large CSV file: grouping rows on disk to keep memory use bounded'})
+        
         # Process data with custom prompt
-        results = process_csv_data(csv_data, images_dir, chars_file, model, languages, api_key, debug_mode, skip_images, custom_prompt=custom_prompt)
-        if not results:
+        result_count = process_csv_data(csv_data, images_dir, chars_file, model, languages, api_key, debug_mode, skip_images, custom_prompt=custom_prompt, max_workers=max_workers, grouped=grouped_mode, use_cache=use_cache,
+                                        results_file=results_file, on_result=report_progress, keep_results=False,
+                                        checkpoint_file=checkpoint_file, resume=resume, cancel_event=job.cancel_event,
+                                        streaming=streaming, spill_dir=app.config['OUTPUT_FOLDER'])
+        cancelled = job.cancel_event.is_set()
+        if cancelled and not result_count:
+            emit('update_status', {'status': 'Processing cancelled before any image ID was finished.', 'complete': True, 'cancelled': True})
+            return None
+        if cancelled:
+            # Export what was finished; the checkpoint lets "Resume last job" pick up the rest
+            emit('update_status', {'status': f'Processing cancelled: saving the results of {result_count} image ID(s)...'})
+        if not result_count:
             emit('update_status', {'status': 'Error: Failed to process data.', 'error': True})
-            return
+            return None
         
-        # Generate timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Exports read the results back from the job store instead of keeping them in memory
+        results = job_store.results(job.id)
         
         # Get selected output formats
-        params = session.get('processing', {})
         output_formats = params.get('output_formats', ['allOutput'])  # Default to allOutput
         print(f"Output formats selected: {output_formats}")
         
         # Initialize paths
         json_output_path = None
+        json_artifact = None
         csv_output_path = None
         
         # Create complete output.json if 'allOutput' format is selected
-        json_memory_file = None
         if 'allOutput' in output_formats:
-            # Create JSON in memory instead of saving to disk
-            json_data = json.dumps(results, ensure_ascii=False, indent=2)
-            json_memory_file = io.BytesIO(json_data.encode('utf-8'))
-            json_output_path = f'output_{timestamp}.json'  # Just store the filename, not the path
-            
-            # Store the memory file in the session for download
-            if 'memory_files' not in session:
-                session['memory_files'] = {}
-            session['memory_files'][json_output_path] = json_memory_file.getvalue()
-            session.modified = True
+            json_output_path = f'output_{timestamp}.json'  # Download name of the artifact
             
-            # Also save to disk as a backup
-            disk_path = os.path.join(app.config['OUTPUT_FOLDER'], json_output_path)
-            with open(disk_path, 'wb') as f:
-                f.write(json_memory_file.getvalue())
+            # Stream the results from the job store to disk and add the file to the artifact store
+            disk_path = artifact_store.temp_path('.json')
+            with open(disk_path, 'w', encoding='utf-8') as f:
+                write_json_array(results, f)
+            json_artifact = artifact_store.put_file(disk_path, json_output_path, 'application/json', job_id=job.id)
             
-            print(f"Created output.json file (memory + disk backup at {disk_path})")
-        
-        # Store language codes for export
-        languages_list = {}
-        for lang_code in languages:
-            lang_name = next((k for k, v in LANGUAGE_CODES.items() if v.upper() == lang_code.upper()), lang_code.lower())
-            languages_list[lang_code] = lang_name
-        
-        # Store results and language info in both session and global variable for export
-        export_data = {
-            'results': results,
-            'languages': languages_list,
-            'timestamp': timestamp
-        }
-        
-        # Update session
-        session['export_data'] = export_data
-        session.modified = True
-        
-        # Update global variable
-        global GLOBAL_EXPORT_DATA
-        GLOBAL_EXPORT_DATA = export_data
-        print(f"Updated global export data with languages: {list(languages_list.keys())}")
-        
-        # Also save a backup of the export data to a file for redundancy
-        export_data_file = os.path.join(app.config['OUTPUT_FOLDER'], f'export_data_{timestamp}.json')
-        with open(export_data_file, 'w', encoding='utf-8') as f:
-            # We need to convert the data to be JSON serializable
-            json_safe_data = {
-                'results': results,
-                'languages': languages_list,
-                'timestamp': timestamp
-            }
-            json.dump(json_safe_data, f, ensure_ascii=False, indent=2)
+            print(f"Created output.json artifact {json_artifact}")
         
         # Create CSV output only if allOutput format is selected
         if 'allOutput' in output_formats and csv_output_path:
@@ -677,68 +635,59 @@ def handle_start_processing(data=None):
                         }
                         csv_rows.append(row)
             
-            # Convert to DataFrame and save
+            # Save the rows with the csv module
             if csv_rows:
-                df = pd.DataFrame(csv_rows)
-                df.to_csv(csv_output_path, index=False, encoding='utf-8')
+                with open(csv_output_path, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=list(csv_rows[0].keys()))
+                    writer.writeheader()
+                    writer.writerows(csv_rows)
                 print(f"Saved CSV output to {csv_output_path}")
             
 
         
         # Initialize zip variables
-        zip_path = None
+        zip_artifact = None
         zip_filename = None
         
         # Create language-specific JSON files and package them in a ZIP if the format is selected
-        zip_memory_file = None
         if 'allbyLang' in output_formats or 'third' in output_formats:
             try:
-                # Create a ZIP file for language-specific JSONs
-                zip_memory_file = create_language_specific_json_files(results, languages)
+                # Write the ZIP file for language-specific JSONs straight to disk, then add it to the artifact store
                 zip_filename = f"localized_strings_{timestamp}.zip"
+                disk_path = artifact_store.temp_path('.zip')
+                write_language_zip(results, languages, disk_path)
+                zip_artifact = artifact_store.put_file(disk_path, zip_filename, 'application/zip', job_id=job.id)
                 
-                # Store the memory file in the session for download
-                if 'memory_files' not in session:
-                    session['memory_files'] = {}
-                session['memory_files'][zip_filename] = zip_memory_file.getvalue()
-                session.modified = True
-                
-                # Also save to disk as a backup
-                disk_path = os.path.join(app.config['OUTPUT_FOLDER'], zip_filename)
-                with open(disk_path, 'wb') as f:
-                    f.write(zip_memory_file.getvalue())
+                # The same languages downloaded later are served from this file
+                job_store.save_export(job.id, export_cache_key(languages), zip_artifact, result_count)
                 
-                # Set the path variable to just the filename for reference
-                zip_path = zip_filename
-                
-                print(f"Created language-specific JSON files (memory + disk backup at {disk_path})")
+                print(f"Created language-specific JSON files as artifact {zip_artifact}")
                 
             except Exception as e:
                 print(f"Error creating language-specific JSON files: {str(e)}")
-                zip_path = None
+                zip_artifact = None
                 zip_filename = None
         
         # Send success message with file paths for all generated formats
         response_data = {
-            'status': 'Processing completed successfully!',
+            'status': 'Processing cancelled, partial results saved.' if cancelled else 'Processing completed successfully!',
             'complete': True,
+            'cancelled': cancelled,
             'output_formats': output_formats
         }
         
-        # Mark processing as completed
-        session['processing_status'] = 'completed'
-        session.modified = True
-        
-        # Add paths to the response if they were created
-        if json_output_path:
-            response_data['json_path'] = json_output_path
+        # Add the artifact IDs to the response if the files were created
+        if json_artifact:
+            response_data['json_artifact'] = json_artifact
+            response_data['json_filename'] = json_output_path
         if csv_output_path:
             response_data['csv_path'] = csv_output_path
-        if zip_path:
-            response_data['zip_path'] = zip_path
+        if zip_artifact:
+            response_data['zip_artifact'] = zip_artifact
             response_data['zip_filename'] = zip_filename
             
         emit('update_status', response_data)
+        return response_data
         
     except Exception as e:
         print(f"Error in process_uploads: {str(e)}")
@@ -748,104 +697,128 @@ def handle_start_processing(data=None):
             'complete': True,
             'error': True
         })
+        return None
 
-# Function to create language-specific JSON files
-def create_language_specific_json_files(results, languages):
-    """
-    Create separate JSON files for each language and package them into a ZIP file.
-    Formats keys according to standard mapping and excludes custom_description.
+def submit_processing_job(params, skip_images=False):
+    """Queue a localization job with the given processing parameters and return it"""
+    return job_manager.submit(run_localization_job, dict(params, skip_images_confirmed=skip_images), owner=params.get('client_id'))
+
+@socketio.on('start_processing')
+def handle_start_processing(data=None):
+    # Re-attach to the job of this page if it is still queued or running
+    job = find_session_job(session.get('processing_job_id'))
+    if job and job.active:
+        join_room(job.id)
+        emit('job_submitted', {'job_id': job.id, 'state': job.state})
+        emit('update_status', {'status': 'Processing already in progress', 'job_id': job.id})
+        return
     
-    Args:
-        results: List of processed localization entries
-        languages: List of language codes to include
-        
-    Returns:
-        BytesIO object containing the ZIP file
-    """
-    print(f"Creating language-specific JSON files for: {languages}")
-    memory_file = io.BytesIO()
+    # Default to not skipping images
+    skip_images = False
+    if data and 'skip_images' in data:
+        skip_images = data['skip_images']
     
-    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Process each language
-        for lang_code in languages:
-            # Get language name from code
-            lang_name = next((k for k, v in LANGUAGE_CODES.items() if v.upper() == lang_code.upper()), lang_code.lower())
-            print(f"Processing language: {lang_code} ({lang_name})")
-            
-            # Create export for this language
-            flat_export = {}
-            
-            # Process all results
-            for item in results:
-                # Process each key in the item
-                for key, loc_data in item.items():
-                    # Skip metadata fields and custom_description
-                    if key in ('ID', 'id', 'filename', 'OCR_EN', 'image_path', 'image_description', 'description'):
-                        continue
-                    
-                    # Format the key according to LOCID type
-                    formatted_key = None
-                    
-                    # Handle standard prefixes with correct multi-level ID formatting
-                    if key.startswith('LEVEL_TEXT_'):
-                        parts = key.replace('LEVEL_TEXT_', '').split('_')
-                        formatted_key = f"question_{parts[0]}"
-                        if len(parts) > 1:
-                            formatted_key += '_' + '_'.join(parts[1:])
-                    elif key.startswith('HINT_'):
-                        parts = key.replace('HINT_', '').split('_')
-                        formatted_key = f"hint_{parts[0]}"
-                        if len(parts) > 1:
-                            formatted_key += '_' + '_'.join(parts[1:])
-                    elif key.startswith('END_'):
-                        parts = key.replace('END_', '').split('_')
-                        formatted_key = f"endText_{parts[0]}"
-                        if len(parts) > 1:
-                            formatted_key += '_' + '_'.join(parts[1:])
-                    else:
-                        # Skip custom_description
-                        if key == 'custom_description' or key.lower() == 'description':
-                            continue
-                        # For any other LOCID, use custom prefix but not for descriptions
-                        formatted_key = f"custom_{key}"
-                    
-                    # Get translation for this language
-                    translation = ""
-                    if isinstance(loc_data, dict):
-                        # Try different ways to get the translation
-                        if lang_name.lower() in loc_data:
-                            translation = loc_data[lang_name.lower()]
-                        elif lang_code.lower() in loc_data:
-                            translation = loc_data[lang_code.lower()]
-                        else:
-                            # Try to find a matching key
-                            for k in loc_data.keys():
-                                if lang_name.lower() in k.lower() or lang_code.lower() in k.lower():
-                                    translation = loc_data[k]
-                                    break
-                                elif k.lower() == 'english' and lang_code.upper() == 'EN':
-                                    translation = loc_data[k]
-                                    break
-                        
-                        # Skip empty or error translations
-                        if translation and (translation.startswith('[No translation') or translation.startswith('Error:')):
-                            translation = ""
-                    
-                    # Add to our export if we have a formatted key
-                    if formatted_key and formatted_key != "custom_description":
-                        flat_export[formatted_key] = translation
-                        
-            # Create JSON content for this language
-            json_content = json.dumps(flat_export, ensure_ascii=False, indent=2)
-            
-            # Add to ZIP with appropriate filename
-            filename = f"strings_{lang_code.lower()}.json"
-            zf.writestr(filename, json_content)
-            print(f"Added {filename} to ZIP with {len(flat_export)} entries")
+    try:
+        job = submit_processing_job(session.get('processing', {}), skip_images)
+    except JobQueueFull as e:
+        emit('update_status', {'status': f'Error: {str(e)}', 'complete': True, 'error': True})
+        return
     
-    # Reset file pointer and return
-    memory_file.seek(0)
-    return memory_file
+    # Events of the job are sent to its room
+    join_room(job.id)
+    session['processing_job_id'] = job.id
+    emit('job_submitted', {'job_id': job.id, 'state': job.state})
+    position = job_manager.queue_position(job.id)
+    if job.state == 'queued' and position:
+        emit('update_status', {'status': f'Job queued, {position} job(s) ahead', 'job_id': job.id})
+
+@socketio.on('join_job')
+def handle_join_job(data=None):
+    """Subscribe this client to the events of a job (e.g. after a reconnect)"""
+    job = find_session_job((data or {}).get('job_id'))
+    if not job:
+        emit('update_status', {'status': 'Error: Unknown job', 'complete': True, 'error': True})
+        return
+    join_room(job.id)
+    emit('job_status', job.to_dict())
+
+@app.route('/jobs', methods=['GET', 'POST'])
+def jobs():
+    """List the jobs of this session, or submit the job configured in the session"""
+    if request.method == 'GET':
+        client_id = session.get('client_id')
+        return jsonify({'success': True, 'jobs': job_manager.list_jobs(owner=client_id) if client_id else []})
+    
+    params = session.get('processing')
+    if not params:
+        return jsonify({'success': False, 'error': 'No job configured. Please submit the form first.'}), 400
+    try:
+        job = submit_processing_job(params, request.form.get('skip_images') == 'true')
+    except JobQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    return jsonify({'success': True, 'job_id': job.id, 'state': job.state})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Return the state and progress of a job"""
+    job = find_session_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify(dict(job.to_dict(), success=True))
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job or stop a running one"""
+    if not find_session_job(job_id) or not job_manager.cancel(job_id):
+        return jsonify({'success': False, 'error': 'Job not found or already finished'}), 404
+    return jsonify({'success': True, 'state': job_manager.get(job_id).state})
+
+@app.route('/jobs/<job_id>/results')
+def job_results(job_id):
+    """Return one page of a job's texts, filtered by ?ids=, ?locid= and ?language= (code or name)"""
+    stored_job = find_export_job(job_id)
+    if not stored_job:
+        return jsonify({'success': False, 'error': 'No results stored for this job'}), 404
+    
+    # Result entries hold English under "EN" and the other languages under their full name
+    language = request.args.get('language', '')
+    if language.upper() == 'EN':
+        language = 'EN'
+    else:
+        language = stored_job['languages'].get(language.upper(), language)
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit and offset must be numbers'}), 400
+    
+    items, total = job_store.query(job_id, image_id=request.args.get('ids'), locid=request.args.get('locid'),
+                                   language=language, limit=limit, offset=offset)
+    return jsonify({'success': True, 'job_id': job_id, 'items': items, 'total': total, 'limit': limit, 'offset': offset})
+
+
+def cache_export_stream(chunks, job_id, cache_key, image_count, filename):
+    """
+    Pass the chunks of an export through while also writing them to a file;
+    once the export is complete it is added to the artifact store and
+    remembered for the job, so the next identical download is served from disk.
+    """
+    disk_path = artifact_store.temp_path('.zip')
+    complete = False
+    try:
+        with open(disk_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        complete = True
+    finally:
+        if complete:
+            artifact_id = artifact_store.put_file(disk_path, filename, 'application/zip', job_id=job_id)
+            job_store.save_export(job_id, cache_key, artifact_id, image_count)
+            print(f"Cached export {artifact_id} for {cache_key}")
+        elif os.path.exists(disk_path):
+            # The client went away before the export was finished
+            os.remove(disk_path)
 
 # New language-based export functionality
 @app.route('/download_all_by_lang', methods=['POST'])
@@ -862,67 +835,18 @@ def download_all_by_lang():
     print(f"Received language selection for download: {selected_lang_codes}")
     
     try:
-        # Get export data from various sources
-        export_data = None
-        
-        # First try global data
-        global GLOBAL_EXPORT_DATA
-        if GLOBAL_EXPORT_DATA and 'results' in GLOBAL_EXPORT_DATA:
-            export_data = GLOBAL_EXPORT_DATA
-            print(f"Using global data with languages: {list(export_data.get('languages', {}).keys())}")
-            
-        # Try session data if needed
-        if not export_data and 'export_data' in session:
-            try:
-                export_data = session.get('export_data')
-                print(f"Using session data")
-            except Exception as e:
-                print(f"Error getting session data: {str(e)}")
-                
-        # If still no data, try to find export files
-        if not export_data:
-            try:
-                export_files = [f for f in os.listdir(app.config['OUTPUT_FOLDER']) if f.startswith('export_data_')]
-                if export_files:
-                    latest_file = sorted(export_files)[-1]
-                    print(f"Found backup file: {latest_file}")
-                    try:
-                        with open(os.path.join(app.config['OUTPUT_FOLDER'], latest_file), 'r', encoding='utf-8') as f:
-                            export_data = json.load(f)
-                            print(f"Loaded backup file with languages: {list(export_data.get('languages', {}).keys())}")
-                    except Exception as e:
-                        print(f"Error loading backup file: {str(e)}")
-            except Exception as e:
-                print(f"Error searching for backup files: {str(e)}")
-        
-        # If no data found, show error
-        if not export_data or 'results' not in export_data:
+        # Export the requested job, or the most recent one of this session if the page did not send its job ID
+        stored_job = find_export_job(request.form.get('job_id'))
+        if not stored_job or not stored_job['image_count']:
             error_msg = 'No export data available. Please process data first.'
             print(error_msg)
             return make_response(error_msg, 400)
-        
-        # Get output.json directly from uploads folder (newest one)
-        output_files = sorted([f for f in os.listdir(app.config['UPLOAD_FOLDER']) if f.startswith('output_') and f.endswith('.json')], reverse=True)
-        
-        if output_files:
-            newest_output = output_files[0]
-            output_path = os.path.join(app.config['UPLOAD_FOLDER'], newest_output)
-            print(f"Found output.json file: {output_path}")
-            
-            try:
-                # Load the complete output.json file to ensure we have all entries
-                with open(output_path, 'r', encoding='utf-8') as f:
-                    complete_results = json.load(f)
-                    print(f"Loaded complete output.json with {len(complete_results)} entries")
-            except Exception as e:
-                print(f"Error loading output.json: {str(e)}")
-                complete_results = export_data.get('results', [])
-        else:
-            complete_results = export_data.get('results', [])
+        print(f"Exporting job {stored_job['job_id']} with {stored_job['image_count']} image IDs")
+        complete_results = job_store.results(stored_job['job_id'])
         
         # Get timestamp and language data
-        timestamp = export_data.get('timestamp', datetime.now().strftime('%Y%m%d_%H%M%S'))
-        languages = export_data.get('languages', {})
+        timestamp = stored_job['timestamp']
+        languages = stored_job['languages']
         
         # If no languages found, use defaults
         if not languages:
@@ -941,146 +865,40 @@ def download_all_by_lang():
                 else:
                     languages[lang_code] = lang_code.lower()
         
-        # Create ZIP file with individual JSON files per language
-        memory_file = io.BytesIO()
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            # Filter to only selected languages
-            filtered_languages = {}
-            for lang_code, lang_name in languages.items():
-                if lang_code in selected_lang_codes:
-                    filtered_languages[lang_code] = lang_name
-            
-            print(f"Creating exports for languages: {list(filtered_languages.keys())}")
-            
-            # If no languages match, use all available
-            if not filtered_languages:
-                filtered_languages = languages
-                print(f"No matching languages found, using all: {list(filtered_languages.keys())}")
-            
-            # Process each language separately
-            for lang_code, lang_name in filtered_languages.items():
-                print(f"\nProcessing language: {lang_code} ({lang_name})")
-                
-                # Create export for this language
-                flat_export = {}
-                
-                # Process all entries from the complete results
-                entry_count = 0
-                for item in complete_results:
-                    item_id = item.get('ID', 'unknown')
-                    
-                    # Process each key in the item
-                    for key, loc_data in item.items():
-                        # Skip metadata fields and description
-                        if key in ('ID', 'id', 'filename', 'OCR_EN', 'image_path', 'image_description', 'description'):
-                            continue
-                        
-                        # Skip custom_description or any description fields
-                        if key == 'custom_description' or 'description' in key.lower():
-                            continue
-                        
-                        # Format the key according to LOCID type
-                        formatted_key = None
-                        
-                        # Handle standard prefixes with correct multi-level ID formatting
-                        if key.startswith('LEVEL_TEXT_'):
-                            parts = key.replace('LEVEL_TEXT_', '').split('_')
-                            formatted_key = f"question_{parts[0]}"
-                            if len(parts) > 1:
-                                formatted_key += '_' + '_'.join(parts[1:])
-                        elif key.startswith('HINT_'):
-                            parts = key.replace('HINT_', '').split('_')
-                            formatted_key = f"hint_{parts[0]}"
-                            if len(parts) > 1:
-                                formatted_key += '_' + '_'.join(parts[1:])
-                        elif key.startswith('END_'):
-                            parts = key.replace('END_', '').split('_')
-                            formatted_key = f"endText_{parts[0]}"
-                            if len(parts) > 1:
-                                formatted_key += '_' + '_'.join(parts[1:])
-                        else:
-                            # For any other LOCID, use custom prefix
-                            formatted_key = f"custom_{key}"
-                        
-                        # Get translation for this language
-                        translation = ""
-                        if isinstance(loc_data, dict):
-                            # Try different ways to get the translation
-                            # First try with language name (most common)
-                            if lang_name.lower() in loc_data:
-                                translation = loc_data[lang_name.lower()]
-                            # Next try with language code
-                            elif lang_code.lower() in loc_data:
-                                translation = loc_data[lang_code.lower()]
-                            # Special case for English
-                            elif lang_code.upper() == 'EN' and 'english' in loc_data:
-                                translation = loc_data['english']
-                            # Try finding a key that contains the language
-                            else:
-                                for k in loc_data.keys():
-                                    if lang_name.lower() in k.lower() or lang_code.lower() in k.lower():
-                                        translation = loc_data[k]
-                                        break
-                            
-                            # Skip error or empty translations
-                            if translation and (translation.startswith('[No translation') or translation.startswith('Error:')):
-                                translation = ""
-                        
-                        # Add to our flat export structure if we have a formatted key
-                        if formatted_key and formatted_key != "custom_description":
-                            flat_export[formatted_key] = translation
-                            entry_count += 1
-                
-                print(f"Added {entry_count} entries for language {lang_code}")
-                
-                # Create JSON content for this language
-                json_content = json.dumps(flat_export, ensure_ascii=False, indent=2)
-                
-                # Add to ZIP with appropriate filename
-                filename = f"strings_{lang_code.lower()}.json"
-                zf.writestr(filename, json_content)
-                print(f"Added {filename} to ZIP")
-        
-        # Reset file pointer and create response
-        memory_file.seek(0)
-        print("Memory file created successfully, preparing to send...")
-        
-        # Create response with the ZIP file
-        try:
-            response = send_file(
-                memory_file,
-                mimetype='application/zip',
-                as_attachment=True,
-                download_name=f"all_translations_{timestamp}.zip"
-            )
-            print(f"Successfully prepared ZIP file for download")
-            return response
-        except Exception as e:
-            print(f"Error creating file response: {e}")
-            return make_response(f"Error creating file response: {str(e)}", 500)
-                
-        # Add to ZIP with appropriate filename
-        filename = f"strings_{lang_code.lower()}.json"
-        zf.writestr(filename, json_content)
-        print(f"Added {filename} to ZIP")
-
-        # Reset file pointer and create response
-        memory_file.seek(0)
-        print("Memory file created successfully, preparing to send...")
-        
-        # Create response with the ZIP file
-        try:
-            response = send_file(
-                memory_file,
-                mimetype='application/zip',
-                as_attachment=True,
-                download_name=f"all_translations_{timestamp}.zip"
-            )
-            print(f"Successfully prepared ZIP file for download")
-            return response
-        except Exception as e:
-            print(f"Error creating file response: {e}")
-            return make_response(f"Error creating file response: {str(e)}", 500)
+        # Filter to only selected languages
+        filtered_languages = {code: name for code, name in languages.items() if code in selected_lang_codes}
+        
+        # If no languages match, use all available
+        if not filtered_languages:
+            filtered_languages = languages
+            print(f"No matching languages found, using all: {list(filtered_languages.keys())}")
+        print(f"Creating exports for languages: {list(filtered_languages.keys())}")
+        
+        # "stored" skips compression, which is fastest for local downloads
+        compression = request.form.get('compression', DEFAULT_ZIP_COMPRESSION)
+        if compression not in ZIP_COMPRESSION:
+            return make_response(f"Unknown compression: {compression}", 400)
+        
+        download_name = f"all_translations_{timestamp}.zip"
+        
+        # Exports are cached per job and sorted language set until the job's results change
+        cache_key = export_cache_key(filtered_languages, compression)
+        artifact = artifact_store.get(job_store.get_export(stored_job['job_id'], cache_key))
+        if artifact:
+            print(f"Serving cached export {artifact['artifact_id']} for {cache_key}")
+            return send_file(artifact['path'], mimetype='application/zip', as_attachment=True, download_name=download_name,
+                             conditional=True, etag=artifact['artifact_id'])
+        
+        # Stream the ZIP file: the results are read once, then each language file is compressed and sent in turn
+        filtered_languages = {code: filtered_languages[code] for code in sorted(filtered_languages)}
+        chunks = stream_language_zip(complete_results, filtered_languages, compression)
+        response = Response(
+            cache_export_stream(chunks, stored_job['job_id'], cache_key, stored_job['image_count'], download_name),
+            mimetype='application/zip'
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        print(f"Streaming ZIP file for download ({compression} compression)")
+        return response
     
     except Exception as e:
         print(f"Error in download_all_by_lang: {str(e)}")
@@ -1089,60 +907,40 @@ def download_all_by_lang():
 
 @app.route('/download')
 def download_file():
-    """Download a file from memory or disk"""
+    """Download a generated artifact (?artifact=<ID>) or a file from the output folder (?file_path=<name>)"""
+    artifact_id = request.args.get('artifact', '')
+    if artifact_id:
+        # Artifacts are only served to the session of a job that produced them
+        artifact = artifact_store.get(artifact_id) if session_owns_artifact(artifact_id) else None
+        if not artifact:
+            print(f"Artifact not found: {artifact_id}")
+            flash('File not found', 'danger')
+            return redirect(url_for('index'))
+        
+        # The content hash is a strong ETag; conditional=True also answers If-None-Match and Range requests
+        print(f"Downloading artifact {artifact_id} as {artifact['filename']}")
+        return send_file(
+            artifact['path'],
+            mimetype=artifact['mimetype'],
+            as_attachment=True,
+            download_name=artifact['filename'],
+            conditional=True,
+            etag=artifact_id,
+            max_age=86400
+        )
+    
     file_path = request.args.get('file_path', '')
     print(f"Download requested for: {file_path}")
     
-    # Get just the filename without the path
-    if os.path.sep in file_path:
-        filename = os.path.basename(file_path)
-    else:
-        filename = file_path  # Already just a filename
-    
-    # Try to get the file from session memory
-    found_in_session = False
-    if 'memory_files' in session and filename in session['memory_files']:
-        try:
-            # Create BytesIO object from the stored bytes
-            file_data = session['memory_files'][filename]
-            memory_file = io.BytesIO(file_data)
-            memory_file.seek(0)
-            found_in_session = True
-            
-            # Determine content type
-            content_type = 'application/json'
-            if filename.endswith('.zip'):
-                content_type = 'application/zip'
-            
-            # Log the download
-            print(f"Downloading in-memory file: {filename} (found in session)")
-            
-            # Create and return the response
-            return send_file(
-                memory_file,
-                mimetype=content_type,
-                as_attachment=True,
-                download_name=filename
-            )
-        except Exception as e:
-            print(f"Error retrieving from session: {str(e)}")
-            found_in_session = False
-    else:
-        print(f"File not found in session memory: {filename}")
-
-    # Try finding in output folder if not found in session
+    # Only files directly inside the output folder can be downloaded by name
+    filename = os.path.basename(file_path)
     disk_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-    if os.path.exists(disk_path):
+    if filename and os.path.isfile(disk_path):
         print(f"Downloading file from disk (output folder): {disk_path}")
-        return send_file(disk_path, as_attachment=True, download_name=filename)
-    
-    # Fallback to checking the exact path specified
-    if os.path.exists(file_path):
-        print(f"Downloading file from disk (fallback): {file_path}")
-        return send_file(file_path, as_attachment=True, download_name=filename)
+        return send_file(disk_path, as_attachment=True, download_name=filename, conditional=True)
     
     # If file not found anywhere, return error
-    error_msg = f"File not found. Checked session, output folder ({disk_path}), and full path ({file_path})"
+    error_msg = f"File not found in the artifact store or output folder ({disk_path})"
     print(error_msg)
     flash('File not found', 'danger')
     return redirect(url_for('index'))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import os
+import re
+import time
+import uuid
+import threading
+import mimetypes
+from localization_cache import DEFAULT_CACHE_DIR, open_database, file_hash
+
+# Default location of generated downloads, next to the other generated files
+DEFAULT_ARTIFACT_DIR = os.path.join(DEFAULT_CACHE_DIR, 'artifacts')
+
+_ARTIFACT_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated files (output JSON, ZIP archives).
+
+    Each file is kept once under the SHA-256 of its bytes, which is also its
+    artifact ID, with its download name, MIME type and size in a SQLite index.
+    Requests and sessions only carry artifact IDs, never the file contents.
+
+    Every job that stores a file holds a reference to it; release() drops the
+    references of deleted jobs and removes the files no job refers to anymore.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = open_database(os.path.join(root, 'artifacts.sqlite'), [
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " artifact_id TEXT PRIMARY KEY,"
+            " filename TEXT NOT NULL,"
+            " mimetype TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL)",
+            "CREATE TABLE IF NOT EXISTS artifact_refs ("
+            " job_id TEXT NOT NULL,"
+            " artifact_id TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, artifact_id))",
+            "CREATE INDEX IF NOT EXISTS idx_artifact_refs_artifact ON artifact_refs (artifact_id)",
+        ])
+
+    @staticmethod
+    def is_artifact_id(artifact_id):
+        return bool(artifact_id) and bool(_ARTIFACT_ID_PATTERN.match(artifact_id))
+
+    def _object_path(self, artifact_id):
+        return os.path.join(self.root, artifact_id[:2], artifact_id)
+
+    def temp_path(self, suffix=''):
+        """Path of a new scratch file inside the store, to be written and then passed to put_file()"""
+        return os.path.join(self._tmp_dir, f"{uuid.uuid4().hex}{suffix}")
+
+    def put_file(self, path, filename=None, mimetype=None, job_id=None):
+        """
+        Move a finished file into the store and return its artifact ID, referenced
+        by job_id if given. If the same content is already stored, the file is
+        dropped and the existing copy is reused with its original download name,
+        so links handed out for another job keep their name.
+        """
+        filename = filename or os.path.basename(path)
+        mimetype = mimetype or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        artifact_id = file_hash(path)
+        size = os.path.getsize(path)
+        object_path = self._object_path(artifact_id)
+        with self._lock:
+            if os.path.exists(object_path):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(path, object_path)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO artifacts (artifact_id, filename, mimetype, size, created) VALUES (?, ?, ?, ?, ?)",
+                (artifact_id, filename, mimetype, size, time.time())
+            )
+            if job_id:
+                self._conn.execute("INSERT OR IGNORE INTO artifact_refs (job_id, artifact_id) VALUES (?, ?)", (job_id, artifact_id))
+            self._conn.commit()
+        return artifact_id
+
+    def put_bytes(self, data, filename, mimetype=None, job_id=None):
+        """Store bytes that are already in memory and return their artifact ID"""
+        path = self.temp_path()
+        with open(path, 'wb') as f:
+            f.write(data)
+        return self.put_file(path, filename, mimetype, job_id)
+
+    def release(self, job_ids):
+        """Drop the references of the given jobs and delete the artifacts left without one. Returns the number deleted."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return 0
+        placeholders = ", ".join("?" * len(job_ids))
+        with self._lock:
+            candidates = [row[0] for row in self._conn.execute(
+                f"SELECT DISTINCT artifact_id FROM artifact_refs WHERE job_id IN ({placeholders})", job_ids
+            )]
+            self._conn.execute(f"DELETE FROM artifact_refs WHERE job_id IN ({placeholders})", job_ids)
+            orphans = [artifact_id for artifact_id in candidates
+                       if self._conn.execute("SELECT 1 FROM artifact_refs WHERE artifact_id = ? LIMIT 1", (artifact_id,)).fetchone() is None]
+            self._conn.executemany("DELETE FROM artifacts WHERE artifact_id = ?", [(artifact_id,) for artifact_id in orphans])
+            self._conn.commit()
+            for artifact_id in orphans:
+                try:
+                    os.remove(self._object_path(artifact_id))
+                except FileNotFoundError:
+                    pass
+        return len(orphans)
+
+    def job_ids(self, artifact_id):
+        """IDs of the jobs that reference an artifact"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT job_id FROM artifact_refs WHERE artifact_id = ?", (artifact_id,))]
+
+    def get(self, artifact_id):
+        """Return the metadata and on-disk path of an artifact, or None if it is unknown"""
+        if not self.is_artifact_id(artifact_id):
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT filename, mimetype, size, created FROM artifacts WHERE artifact_id = ?", (artifact_id,)
+            ).fetchone()
+        path = self._object_path(artifact_id)
+        if row is None or not os.path.exists(path):
+            return None
+        return {
+            "artifact_id": artifact_id,
+            "filename": row[0],
+            "mimetype": row[1],
+            "size": row[2],
+            "created": row[3],
+            "path": path,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# One store object per directory, shared by all jobs
+_ARTIFACT_STORES = {}
+_ARTIFACT_STORES_LOCK = threading.Lock()
+
+
+def get_artifact_store(root=None):
+    """Return the shared ArtifactStore for root (default: output/artifacts)"""
+    root = os.path.abspath(root or DEFAULT_ARTIFACT_DIR)
+    with _ARTIFACT_STORES_LOCK:
+        store = _ARTIFACT_STORES.get(root)
+        if store is None:
+            store = ArtifactStore(root)
+            _ARTIFACT_STORES[root] = store
+        return store
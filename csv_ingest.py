@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+import os
+import csv
+import codecs
+import sqlite3
+import tempfile
+import itertools
+
+# Columns every localization CSV must have (matched case-insensitively)
+REQUIRED_COLUMNS = ('IDS', 'EN', 'LOCID')
+
+# Bytes read from the start of the file to detect the encoding and dialect
+SNIFF_BYTES = 64 * 1024
+
+# Separators accepted in uploaded files; semicolon is what example.csv uses
+DELIMITERS = ';,\t|'
+
+# Rows written to the spill file of SpilledGroups per batch
+SPILL_BATCH_SIZE = 10000
+
+# Tried in order when the file has no byte order mark
+FALLBACK_ENCODINGS = ('utf-8', 'cp1252')
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class CsvFormatError(ValueError):
+    """Raised when a CSV file cannot be decoded or lacks a required column"""
+
+
+def _detect_encoding(prefix):
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            # The prefix may end in the middle of a character, so don't flush the decoder
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise CsvFormatError("Could not detect the file encoding (expected UTF-8 or Windows-1252)")
+
+
+def _dialect_with(delimiter):
+    class Dialect(csv.excel):
+        pass
+    Dialect.delimiter = delimiter
+    return Dialect
+
+
+def _detect_dialect(sample):
+    """
+    Pick the separator whose split of the header line holds every required
+    column; csv.Sniffer is only consulted when no separator does, since texts
+    full of commas easily mislead it.
+    """
+    header = sample.splitlines()[0] if sample else ""
+    for delimiter in DELIMITERS:
+        columns = [column.strip().upper() for column in next(csv.reader([header], delimiter=delimiter), [])]
+        if all(column in columns for column in REQUIRED_COLUMNS):
+            return _dialect_with(delimiter)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS)
+    except csv.Error:
+        raise CsvFormatError("Could not detect the CSV separator (expected ; , tab or |)")
+
+
+class CsvSource:
+    """
+    A localization CSV whose encoding, dialect and header are detected once
+    from a prefix of the file.
+
+    Iterating streams the rows as {"IDS", "EN", "LOCID"} dicts straight from
+    disk, so a file of any size is read in a single pass in constant memory.
+    Blank rows are skipped; rows too short to hold the required columns are
+    skipped as well and counted in skipped_rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            prefix = f.read(SNIFF_BYTES)
+        if not prefix.strip():
+            raise CsvFormatError("The CSV file is empty")
+        self.encoding = _detect_encoding(prefix)
+
+        sample = codecs.getincrementaldecoder(self.encoding)(errors='replace').decode(prefix, final=False)
+        # Only sniff complete lines
+        if len(prefix) == SNIFF_BYTES and '\n' in sample:
+            sample = sample[:sample.rindex('\n')]
+        self.dialect = _detect_dialect(sample)
+
+        header = next(csv.reader(sample.splitlines()[:1], self.dialect), [])
+        self.columns = [column.strip() for column in header]
+        normalized = [column.upper() for column in self.columns]
+        for column in REQUIRED_COLUMNS:
+            if column not in normalized:
+                raise CsvFormatError(f"Missing required column: {column}")
+        self._indexes = [normalized.index(column) for column in REQUIRED_COLUMNS]
+        self.skipped_rows = 0
+
+    @property
+    def delimiter(self):
+        return self.dialect.delimiter
+
+    def __iter__(self):
+        return self.rows()
+
+    def rows(self):
+        """Yield the rows of the file as dicts with the required columns"""
+        self.skipped_rows = 0
+        min_length = max(self._indexes) + 1
+        with open(self.path, 'r', encoding=self.encoding, newline='') as f:
+            reader = csv.reader(f, self.dialect)
+            next(reader, None)  # header
+            for row in reader:
+                if len(row) < min_length:
+                    if any(cell.strip() for cell in row):
+                        self.skipped_rows += 1
+                    continue
+                yield {column: row[index] for column, index in zip(REQUIRED_COLUMNS, self._indexes)}
+
+
+def validate_csv_file(path):
+    """Check the encoding, dialect and required columns of a CSV file. Returns (is_valid, message)."""
+    try:
+        source = CsvSource(path)
+    except CsvFormatError as e:
+        return False, str(e)
+    except Exception as e:
+        return False, f"Error validating CSV: {str(e)}"
+    print(f"CSV columns found: {source.columns} (separator {source.delimiter!r}, encoding {source.encoding})")
+    return True, "CSV format is valid"
+
+
+def iter_contiguous_groups(rows):
+    """
+    Yield (IDS, rows) for each run of consecutive rows with the same IDS.
+    Only one group is held in memory at a time; a file that is not sorted by
+    IDS yields the same IDS more than once (use SpilledGroups for those).
+    """
+    for image_id, group in itertools.groupby(rows, key=lambda row: row['IDS']):
+        yield image_id, list(group)
+
+
+class SpilledGroups:
+    """
+    External group-by for CSV files that are not sorted by IDS.
+
+    The rows are spilled once into a temporary SQLite file, indexed by IDS.
+    Iterating yields (IDS, rows) in order of each IDS's first appearance,
+    just like grouping into a dict, but reads one group at a time. The
+    spill file is removed by close() or when the object is garbage collected.
+    """
+
+    def __init__(self, rows, spill_dir=None, batch_size=SPILL_BATCH_SIZE):
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix='groups_', suffix='.sqlite', dir=spill_dir)
+        os.close(fd)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        # The rowid of the groups table is the order in which the IDS first appeared
+        self._conn.execute("CREATE TABLE groups (ids TEXT PRIMARY KEY)")
+        self._conn.execute("CREATE TABLE rows (ids TEXT NOT NULL, seq INTEGER NOT NULL, en TEXT NOT NULL, locid TEXT NOT NULL)")
+
+        self.row_count = 0
+        batch = []
+        for row in rows:
+            batch.append((row['IDS'], self.row_count, row['EN'], row['LOCID']))
+            self.row_count += 1
+            if len(batch) >= batch_size:
+                self._insert(batch)
+                batch = []
+        self._insert(batch)
+        self._conn.execute("CREATE INDEX idx_rows_ids ON rows (ids, seq)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM groups").fetchone()[0]
+
+    def _insert(self, batch):
+        self._conn.executemany("INSERT OR IGNORE INTO groups (ids) VALUES (?)", [(row[0],) for row in batch])
+        self._conn.executemany("INSERT INTO rows (ids, seq, en, locid) VALUES (?, ?, ?, ?)", batch)
+
+    def __len__(self):
+        return self._count
+
+    def distinct_texts(self, normalize=None):
+        """Number of distinct EN texts, compared after normalize(text) if given (counted by SQLite, on disk)"""
+        if normalize is None:
+            return self._conn.execute("SELECT COUNT(DISTINCT en) FROM rows").fetchone()[0]
+        self._conn.create_function("normalize_text", 1, normalize, deterministic=True)
+        return self._conn.execute("SELECT COUNT(DISTINCT normalize_text(en)) FROM rows").fetchone()[0]
+
+    def image_ids(self):
+        """Yield the distinct IDS values in order of first appearance"""
+        last = 0
+        while True:
+            batch = self._conn.execute(
+                "SELECT rowid, ids FROM groups WHERE rowid > ? ORDER BY rowid LIMIT ?", (last, SPILL_BATCH_SIZE)
+            ).fetchall()
+            if not batch:
+                return
+            for _, image_id in batch:
+                yield image_id
+            last = batch[-1][0]
+
+    def __iter__(self):
+        for image_id in self.image_ids():
+            rows = self._conn.execute("SELECT en, locid FROM rows WHERE ids = ? ORDER BY seq", (image_id,)).fetchall()
+            yield image_id, [{'IDS': image_id, 'EN': en, 'LOCID': locid} for en, locid in rows]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
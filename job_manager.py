@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of localization jobs that run at the same time on one server
+DEFAULT_JOB_WORKERS = int(os.getenv("LOCALIZATION_JOB_WORKERS", "2"))
+
+# Jobs waiting for a worker before new submissions are rejected
+DEFAULT_MAX_QUEUED_JOBS = int(os.getenv("LOCALIZATION_MAX_QUEUED_JOBS", "20"))
+
+# Finished jobs kept for status requests
+MAX_FINISHED_JOBS = 100
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit() when too many jobs are already waiting"""
+
+
+class Job:
+    """
+    One localization run with its parameters, state and progress.
+
+    States: queued -> running -> completed / failed / cancelled.
+    Events sent with emit() go to the Socket.IO room named after the job ID.
+    """
+
+    def __init__(self, job_id, params, emit=None, owner=None):
+        self.id = job_id
+        self.params = params
+        self.owner = owner
+        self.state = "queued"
+        self.message = "Queued"
+        self.completed = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self._emit = emit
+        self._future = None
+
+    @property
+    def active(self):
+        return self.state in ("queued", "running")
+
+    def emit(self, event, data):
+        """Record a status or progress event and push it to the job's room"""
+        data = dict(data, job_id=self.id)
+        if event == "update_status" and data.get("status"):
+            self.message = data["status"]
+        elif event == "progress":
+            self.completed = data.get("completed", self.completed)
+            self.total = data.get("total", self.total)
+        if self._emit:
+            try:
+                self._emit(event, data, self.id)
+            except Exception as e:
+                print(f"Error emitting {event} for job {self.id}: {str(e)}")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "message": self.message,
+            "completed": self.completed,
+            "total": self.total,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager:
+    """
+    Runs localization jobs on a bounded worker pool.
+
+    submit() queues a job and returns immediately; at most max_workers jobs run
+    at once and at most max_queued wait for a worker. The target function is
+    called as target(job) and returns the job result, or None if it failed
+    (after reporting the error itself).
+    """
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, max_queued=DEFAULT_MAX_QUEUED_JOBS, emit=None):
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max_queued
+        self._emit = emit
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, target, params, owner=None):
+        """Queue target(job) and return the new Job; owner identifies the client that submitted it"""
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.state == "queued")
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} jobs are already waiting, please try again later")
+
+            job = Job(uuid.uuid4().hex, params, self._emit, owner)
+            self._jobs[job.id] = job
+            self._prune()
+            job._future = self._executor.submit(self._run, job, target)
+        return job
+
+    def _run(self, job, target):
+        with self._lock:
+            if job.state != "queued":
+                return
+            job.state = "running"
+            job.started = time.time()
+        try:
+            job.result = target(job)
+            if job.cancel_event.is_set():
+                job.state = "cancelled"
+            else:
+                job.state = "completed" if job.result is not None else "failed"
+        except Exception as e:
+            print(f"✗ Job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.state = "failed"
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_position(self, job_id):
+        """Number of queued jobs submitted before this one (0 if it is running or next)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state != "queued":
+                return 0
+            return sum(1 for other in self._jobs.values() if other.state == "queued" and other.created < job.created)
+
+    def cancel(self, job_id):
+        """Cancel a queued job or ask a running one to stop. Returns False if the job is unknown or finished."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.cancel_event.set()
+            if job.state == "queued":
+                job._future.cancel()
+                job.state = "cancelled"
+                job.finished = time.time()
+                job.message = "Cancelled before it started"
+                return True
+        job.emit("update_status", {"status": "Cancelling..."})
+        return True
+
+    def list_jobs(self, owner=None):
+        """Jobs in submission order; only those submitted by owner if it is given"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if owner is None or job.owner == owner]
+            return [job.to_dict() for job in sorted(jobs, key=lambda job: job.created)]
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if not job.active), key=lambda job: job.created)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def shutdown(self, wait=False):
+        """Cancel everything and stop the worker pool"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            self.cancel(job.id)
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import threading
+from localization_cache import DEFAULT_CACHE_DIR, open_database
+
+JOB_STORE_FILENAME = 'job_results.sqlite'
+
+# Jobs kept in the store before the oldest ones are removed
+MAX_STORED_JOBS = 200
+
+# Page size of query() when no limit is given
+DEFAULT_PAGE_SIZE = 100
+
+
+class JobResults:
+    """Re-iterable view of the image results of one job (every iteration queries the store again)"""
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+
+    def __iter__(self):
+        return self.store.iter_results(self.job_id)
+
+
+class JobResultStore:
+    """
+    Results of every web job, indexed by job ID, backed by SQLite.
+
+    Each finished image result is stored as a whole (for the exports) and as
+    one row per (IDS, LOCID, language) text (for paged queries), so readers
+    never have to load a complete job to find a few entries.
+
+    Generated exports are remembered per job and export key as artifact IDs,
+    valid for as long as no further result has been added to the job.
+    on_delete(job_ids), if given, is called after jobs were replaced, deleted
+    or pruned, e.g. to release their artifacts.
+    """
+
+    def __init__(self, path, max_jobs=MAX_STORED_JOBS, on_delete=None):
+        self.path = path
+        self.max_jobs = max_jobs
+        self.on_delete = on_delete
+        self._lock = threading.Lock()
+        self._conn = open_database(path, [
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " timestamp TEXT NOT NULL,"
+            " languages TEXT NOT NULL,"
+            " results_file TEXT,"
+            " owner TEXT,"
+            " created REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created)",
+            "CREATE TABLE IF NOT EXISTS images ("
+            " job_id TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " image_id TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, position))",
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " job_id TEXT NOT NULL,"
+            " image_id TEXT NOT NULL,"
+            " locid TEXT NOT NULL,"
+            " language TEXT NOT NULL,"
+            " text TEXT NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_entries_image ON entries (job_id, image_id)",
+            "CREATE INDEX IF NOT EXISTS idx_entries_locid ON entries (job_id, locid)",
+            "CREATE INDEX IF NOT EXISTS idx_entries_language ON entries (job_id, language)",
+            "CREATE TABLE IF NOT EXISTS exports ("
+            " job_id TEXT NOT NULL,"
+            " export_key TEXT NOT NULL,"
+            " artifact_id TEXT NOT NULL,"
+            " image_count INTEGER NOT NULL,"
+            " PRIMARY KEY (job_id, export_key))",
+        ])
+
+    def create_job(self, job_id, languages, timestamp, results_file=None, owner=None):
+        """
+        Register a job with its {code: language name} mapping, replacing earlier
+        results of the same ID. owner identifies the client the job belongs to.
+        """
+        with self._lock:
+            self._delete(job_id)
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, timestamp, languages, results_file, owner, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, timestamp, json.dumps(languages, ensure_ascii=False), results_file, owner, time.time())
+            )
+            deleted = [job_id] + self._prune()
+            self._conn.commit()
+        self._deleted(deleted)
+
+    def add_result(self, job_id, image_id, result):
+        """Append the finished result of one image ID to a job"""
+        entries = [
+            (job_id, image_id, locid, language, text)
+            for locid, entry in result.items() if isinstance(entry, dict)
+            for language, text in entry.items()
+        ]
+        with self._lock:
+            position = self._image_count(job_id)
+            self._conn.execute(
+                "INSERT INTO images (job_id, position, image_id, result) VALUES (?, ?, ?, ?)",
+                (job_id, position, image_id, json.dumps(result, ensure_ascii=False))
+            )
+            self._conn.executemany(
+                "INSERT INTO entries (job_id, image_id, locid, language, text) VALUES (?, ?, ?, ?, ?)", entries
+            )
+            self._conn.commit()
+
+    def get_job(self, job_id):
+        """Return the job's metadata and image count, or None if it is not stored"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, timestamp, languages, results_file, owner, created FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            image_count = self._image_count(job_id)
+        return {
+            "job_id": row[0],
+            "timestamp": row[1],
+            "languages": json.loads(row[2]),
+            "results_file": row[3],
+            "owner": row[4],
+            "created": row[5],
+            "image_count": image_count,
+        }
+
+    def latest_job_id(self, owner):
+        """ID of the most recently created job of owner, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT job_id FROM jobs WHERE owner = ? ORDER BY created DESC LIMIT 1", (owner,)).fetchone()
+        return row[0] if row else None
+
+    def _image_count(self, job_id):
+        # Positions are consecutive from 0, so the last one is found in the primary key index
+        return self._conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM images WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+    def iter_results(self, job_id, batch_size=DEFAULT_PAGE_SIZE):
+        """Yield the image results of a job in the order they finished, reading batch_size rows at a time"""
+        position = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT position, result FROM images WHERE job_id = ? AND position >= ? ORDER BY position LIMIT ?",
+                    (job_id, position, batch_size)
+                ).fetchall()
+            for _, result in rows:
+                yield json.loads(result)
+            if len(rows) < batch_size:
+                return
+            position = rows[-1][0] + 1
+
+    def results(self, job_id):
+        """Re-iterable view of a job's image results, usable wherever a results list is expected"""
+        return JobResults(self, job_id)
+
+    def query(self, job_id, image_id=None, locid=None, language=None, limit=DEFAULT_PAGE_SIZE, offset=0):
+        """
+        Return one page of a job's texts as {"IDS", "LOCID", "language", "text"}
+        dicts, filtered by image ID, LOCID and language (the result entry key,
+        e.g. "turkish" or "EN"), together with the total number of matches.
+        """
+        where = ["job_id = ?"]
+        params = [job_id]
+        for column, value in (("image_id", image_id), ("locid", locid), ("language", language)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        condition = " AND ".join(where)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM entries WHERE {condition}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT image_id, locid, language, text FROM entries WHERE {condition} ORDER BY rowid LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        items = [{"IDS": row[0], "LOCID": row[1], "language": row[2], "text": row[3]} for row in rows]
+        return items, total
+
+    def get_export(self, job_id, export_key):
+        """Artifact ID of an export built from the job's current results, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT artifact_id, image_count FROM exports WHERE job_id = ? AND export_key = ?", (job_id, export_key)
+            ).fetchone()
+            if row is None:
+                return None
+            image_count = self._image_count(job_id)
+        # Results are only ever appended, so the image count identifies the state the export was built from
+        return row[0] if row[1] == image_count else None
+
+    def save_export(self, job_id, export_key, artifact_id, image_count):
+        """Remember the artifact built from the first image_count results of a job"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO exports (job_id, export_key, artifact_id, image_count) VALUES (?, ?, ?, ?)",
+                (job_id, export_key, artifact_id, image_count)
+            )
+            self._conn.commit()
+
+    def delete_job(self, job_id):
+        with self._lock:
+            self._delete(job_id)
+            self._conn.commit()
+        self._deleted([job_id])
+
+    def _deleted(self, job_ids):
+        if self.on_delete:
+            self.on_delete(job_ids)
+
+    def _delete(self, job_id):
+        for table in ("exports", "entries", "images", "jobs"):
+            self._conn.execute(f"DELETE FROM {table} WHERE job_id = ?", (job_id,))
+
+    def _prune(self):
+        old_jobs = self._conn.execute(
+            "SELECT job_id FROM jobs ORDER BY created DESC LIMIT -1 OFFSET ?", (self.max_jobs,)
+        ).fetchall()
+        for (job_id,) in old_jobs:
+            self._delete(job_id)
+        return [job_id for (job_id,) in old_jobs]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# One store object per database file, shared by all jobs
+_JOB_STORES = {}
+_JOB_STORES_LOCK = threading.Lock()
+
+
+def get_job_store(path=None):
+    """Return the shared JobResultStore for path (default: output/job_results.sqlite)"""
+    path = os.path.abspath(path or os.path.join(DEFAULT_CACHE_DIR, JOB_STORE_FILENAME))
+    with _JOB_STORES_LOCK:
+        store = _JOB_STORES.get(path)
+        if store is None:
+            store = JobResultStore(path)
+            _JOB_STORES[path] = store
+        return store
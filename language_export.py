@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import io
+import json
+import zipfile
+from minimal_localization_tool import LANGUAGE_CODES
+from result_stream import is_completed_translation
+
+# Result keys that describe the image rather than hold a LOCID
+METADATA_KEYS = frozenset(('ID', 'id', 'filename', 'OCR_EN', 'image_path', 'image_description', 'description', 'custom_description'))
+
+# LOCID prefixes and the key prefixes the game expects in its string files
+EXPORT_KEY_PREFIXES = (
+    ('LEVEL_TEXT_', 'question_'),
+    ('HINT_', 'hint_'),
+    ('END_', 'endText_'),
+)
+
+
+def language_names(lang_codes):
+    """Map language codes to the names used in the result entries, e.g. {"TR": "turkish"}"""
+    names = {}
+    for lang_code in lang_codes:
+        names[lang_code] = next((k for k, v in LANGUAGE_CODES.items() if v.upper() == lang_code.upper()), lang_code.lower())
+    return names
+
+
+def format_export_key(locid):
+    """Key of a LOCID in the exported string files (LEVEL_TEXT_3_1 -> question_3_1), or None for metadata"""
+    if locid in METADATA_KEYS or locid.lower() == 'description':
+        return None
+    for prefix, export_prefix in EXPORT_KEY_PREFIXES:
+        if locid.startswith(prefix):
+            return export_prefix + locid[len(prefix):]
+    return f"custom_{locid}"
+
+
+def _find_field(entry_keys, lang_code, lang_name):
+    """Field of a result entry that holds the text of one language, or None"""
+    code = lang_code.lower()
+    if lang_name in entry_keys:
+        return lang_name
+    if code in entry_keys:
+        return code
+    for key in entry_keys:
+        if lang_name in key.lower() or code in key.lower():
+            return key
+        if key.lower() == 'english' and code == 'en':
+            return key
+    return None
+
+
+class LanguageExporter:
+    """
+    Builds the flat strings_<lang>.json exports of every language.
+
+    Each LOCID key is formatted once, and the entry field that holds each
+    language is looked up once per distinct set of entry fields (in practice
+    once per job). The results are walked a single time no matter how many
+    languages are exported.
+    """
+
+    def __init__(self, languages):
+        # languages: {code: name} or a list of codes
+        if not isinstance(languages, dict):
+            languages = language_names(languages)
+        self.languages = [(code, name.lower()) for code, name in languages.items()]
+        self._export_keys = {}
+        self._fields = {}
+
+    def _export_key(self, locid):
+        if locid not in self._export_keys:
+            self._export_keys[locid] = format_export_key(locid)
+        return self._export_keys[locid]
+
+    def _entry_fields(self, entry_keys):
+        fields = self._fields.get(entry_keys)
+        if fields is None:
+            fields = [_find_field(entry_keys, code, name) for code, name in self.languages]
+            self._fields[entry_keys] = fields
+        return fields
+
+    def _build(self, results, indexes):
+        """Walk the results once and return the exports of the languages at the given indexes"""
+        exports = [{} for _ in indexes]
+        for item in results:
+            for locid, entry in item.items():
+                key = self._export_key(locid)
+                if key is None:
+                    continue
+                if not isinstance(entry, dict):
+                    for export in exports:
+                        export[key] = ""
+                    continue
+                fields = self._entry_fields(tuple(entry))
+                for export, index in zip(exports, indexes):
+                    field = fields[index]
+                    text = entry[field] if field else ""
+                    export[key] = text if is_completed_translation(text) else ""
+        return exports
+
+    def export(self, results):
+        """Return {code: {export key: text}} for every language; error placeholders are exported as empty strings"""
+        exports = self._build(results, range(len(self.languages)))
+        return {code: export for (code, _), export in zip(self.languages, exports)}
+
+    def files(self, results):
+        """
+        Yield (filename, JSON text) for each language's string file.
+
+        All languages are built in one pass over the results; each file is
+        then serialized only when it is requested, and its export dropped.
+        """
+        exports = self.export(results)
+        for lang_code, _ in self.languages:
+            export = exports.pop(lang_code)
+            yield f"strings_{lang_code.lower()}.json", json.dumps(export, ensure_ascii=False, indent=2)
+
+
+# ZIP compression choices: (method, compresslevel); "stored" skips compression for fast local downloads
+ZIP_COMPRESSION = {
+    'stored': (zipfile.ZIP_STORED, None),
+    'fast': (zipfile.ZIP_DEFLATED, 1),
+    'default': (zipfile.ZIP_DEFLATED, 6),
+    'best': (zipfile.ZIP_DEFLATED, 9),
+}
+DEFAULT_ZIP_COMPRESSION = 'default'
+
+
+def _zip_file(output, compression):
+    method, level = ZIP_COMPRESSION.get(compression, ZIP_COMPRESSION[DEFAULT_ZIP_COMPRESSION])
+    return zipfile.ZipFile(output, 'w', method, compresslevel=level)
+
+
+def export_cache_key(lang_codes, compression=DEFAULT_ZIP_COMPRESSION):
+    """Key of a language ZIP export: the sorted language set and the compression"""
+    return f"zip:{compression}:{','.join(sorted(code.upper() for code in lang_codes))}"
+
+
+def write_language_zip(results, languages, output, compression=DEFAULT_ZIP_COMPRESSION):
+    """Write the string files of the given languages into a ZIP file (a path or binary file object)"""
+    with _zip_file(output, compression) as zf:
+        for filename, content in LanguageExporter(languages).files(results):
+            zf.writestr(filename, content)
+            print(f"Added {filename} to ZIP")
+    return output
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that collects what ZipFile writes until it is taken"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_language_zip(results, languages, compression=DEFAULT_ZIP_COMPRESSION):
+    """
+    Yield a ZIP archive of the string files of the given languages in chunks.
+
+    The results are walked once for all languages before the first chunk;
+    after that each strings_<lang>.json is serialized, compressed and yielded
+    in turn, so the whole archive is never held in memory.
+    """
+    buffer = _ChunkBuffer()
+    # An unseekable output makes ZipFile write data descriptors instead of seeking back
+    with _zip_file(buffer, compression) as zf:
+        for filename, content in LanguageExporter(languages).files(results):
+            zf.writestr(filename, content)
+            print(f"Streamed {filename}")
+            yield buffer.take()
+    yield buffer.take()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Default location of the cache database, next to the other generated files
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+TRANSLATION_CACHE_FILENAME = 'translation_cache.sqlite'
+DESCRIPTION_CACHE_FILENAME = 'description_cache.sqlite'
+
+# Maximum number of cached translations before the least recently used ones are evicted
+DEFAULT_MAX_ENTRIES = 200000
+
+# Number of cache hits whose last_used time is buffered before it is written in one batch
+TOUCH_BATCH_SIZE = 256
+
+
+def content_hash(*parts):
+    """SHA-256 over the given strings, separated so that ("ab", "c") != ("a", "bc")"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = (part or "").encode('utf-8')
+        digest.update(str(len(data)).encode('ascii') + b':' + data)
+    return digest.hexdigest()
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def open_database(path, schema):
+    """Open (and create if needed) a SQLite database shared between threads"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for statement in schema:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+class TranslationCache:
+    """
+    On-disk translation memory backed by SQLite.
+
+    Each entry holds the cleaned model output for one text in one language
+    (before character name replacement), keyed by a hash of the English text,
+    image description, model ID, target language and prompt.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = open_database(path, [
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " language TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)",
+        ])
+
+        # Row count kept in memory so puts don't have to count the table
+        self._count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        # last_used times of recent hits, written in batches
+        self._touched = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(english_text, description, model_id, language, prompt):
+        """Build the cache key for one text in one language"""
+        return content_hash(english_text, description, model_id, language, prompt)
+
+    def get(self, key):
+        """Return the cached translation for key, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._flush_touched()
+                self._conn.commit()
+            return row[0]
+
+    def put(self, key, language, text):
+        """Store a translation, evicting the least recently used entries when the cache is full"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO translations (key, language, text, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, language, text, now, now)
+            )
+            if cursor.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE translations SET language = ?, text = ?, created = ?, last_used = ? WHERE key = ?",
+                    (language, text, now, now, key)
+                )
+                self._touched.pop(key, None)
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                                   [(last_used, key) for key, last_used in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        if self._count <= self.max_entries:
+            return
+        # Recent hits must count as used before the oldest entries are picked
+        self._flush_touched()
+        # Drop a little more than needed so we don't evict on every insert
+        excess = self._count - int(self.max_entries * 0.9)
+        cursor = self._conn.execute(
+            "DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self._count -= cursor.rowcount
+        self.evictions += cursor.rowcount
+
+    def clear(self):
+        """Remove every cached translation"""
+        with self._lock:
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+            self._touched.clear()
+            self._count = 0
+
+    def stats(self):
+        """Return hit/miss statistics and the current number of entries"""
+        with self._lock:
+            entries = self._count
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": entries,
+            "evictions": self.evictions,
+        }
+
+    def job(self):
+        """Return a JobCache that counts the hits and misses of one job"""
+        return JobCache(self)
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+
+class DescriptionCache:
+    """
+    On-disk cache of vision model image descriptions backed by SQLite.
+
+    Entries are keyed by a hash of the image bytes, the vision model ID and the
+    vision system prompt, so an unchanged screenshot is never described twice.
+    The image hash is stored separately so all entries of one image can be
+    invalidated at once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_database(path, [
+            "CREATE TABLE IF NOT EXISTS descriptions ("
+            " key TEXT PRIMARY KEY,"
+            " image_hash TEXT NOT NULL,"
+            " image_name TEXT NOT NULL,"
+            " description TEXT NOT NULL,"
+            " created REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_descriptions_image_hash ON descriptions (image_hash)",
+        ])
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(image_hash, model_id, system_prompt):
+        """Build the cache key for one image, model and prompt"""
+        return content_hash(image_hash, model_id, system_prompt)
+
+    def get(self, key):
+        """Return the cached description for key, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT description FROM descriptions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, image_hash, image_name, description):
+        """Store the description of an image"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO descriptions (key, image_hash, image_name, description, created) VALUES (?, ?, ?, ?, ?)",
+                (key, image_hash, image_name, description, time.time())
+            )
+            self._conn.commit()
+
+    def invalidate(self, image_path):
+        """Remove the cached descriptions of an image (for every model and prompt). Returns the number removed."""
+        image_hash = file_hash(image_path)
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM descriptions WHERE image_hash = ?", (image_hash,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        """Return hit/miss statistics and the current number of entries"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+        }
+
+    def job(self):
+        """Return a JobCache that counts the hits and misses of one job"""
+        return JobCache(self)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobCache:
+    """
+    One job's handle on a shared cache.
+
+    Lookups and writes go to the shared cache, but hits and misses are counted
+    here as well, so a job reports its own numbers while other jobs use the
+    same cache at the same time.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.path = cache.path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # make_key, put, invalidate, ... of the shared cache
+        return getattr(self.cache, name)
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        value = self.cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def stats(self):
+        """Return the statistics of the shared cache with the hits and misses of this job"""
+        stats = self.cache.stats()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        stats.update(hits=hits, misses=misses)
+        if "hit_rate" in stats:
+            stats["hit_rate"] = (hits / (hits + misses)) if hits + misses else 0.0
+        return stats
+
+
+# One cache object per database file, shared by all jobs
+_TRANSLATION_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+_DESCRIPTION_CACHES = {}
+
+
+def get_translation_cache(path=None, max_entries=DEFAULT_MAX_ENTRIES):
+    """Return the shared TranslationCache for path (default: output/translation_cache.sqlite)"""
+    path = os.path.abspath(path or os.path.join(DEFAULT_CACHE_DIR, TRANSLATION_CACHE_FILENAME))
+    with _CACHES_LOCK:
+        cache = _TRANSLATION_CACHES.get(path)
+        if cache is None:
+            cache = TranslationCache(path, max_entries)
+            _TRANSLATION_CACHES[path] = cache
+        return cache
+
+
+def get_description_cache(path=None):
+    """Return the shared DescriptionCache for path (default: output/description_cache.sqlite)"""
+    path = os.path.abspath(path or os.path.join(DEFAULT_CACHE_DIR, DESCRIPTION_CACHE_FILENAME))
+    with _CACHES_LOCK:
+        cache = _DESCRIPTION_CACHES.get(path)
+        if cache is None:
+            cache = DescriptionCache(path)
+            _DESCRIPTION_CACHES[path] = cache
+        return cache
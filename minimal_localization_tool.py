@@ -6,11 +6,25 @@ import base64
 import time
 import csv
 import re
+import functools
+import mimetypes
+import queue
+import signal
+import threading
 import requests
+from collections import OrderedDict, deque
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait as wait_futures
 from dotenv import load_dotenv
 from PIL import Image
-from openai import OpenAI
+from openai import APIConnectionError, InternalServerError, OpenAI, RateLimitError
+from rate_limiter import (CANCEL_POLL_SECONDS, RateLimitExceeded, RequestCancelled, call_with_rate_limit, cancellable_sleep, estimate_tokens,
+                          get_rate_limiter, parse_retry_after)
+from api_clients import OPENROUTER_BASE_URL, get_api_clients
+from csv_ingest import CsvSource, SpilledGroups, iter_contiguous_groups
+from result_stream import JobCheckpoint, JsonlResults, JsonlWriter, checkpoint_path, is_completed_translation, write_json_array
+from localization_cache import (DEFAULT_CACHE_DIR, DESCRIPTION_CACHE_FILENAME, TRANSLATION_CACHE_FILENAME, content_hash, file_hash,
+                                get_description_cache, get_translation_cache)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,7 +43,7 @@ def create_openai_client(api_key=None):
     
     # Return client with the appropriate key
     return OpenAI(
-        base_url="https://openrouter.ai/api/v1",
+        base_url=OPENROUTER_BASE_URL,
         api_key=key_to_use,
     )
 
@@ -39,6 +53,7 @@ def create_openai_client(api_key=None):
 # OpenRouter model IDs
 #VISION_MODEL_ID = "openai/gpt-4-vision-preview"
 VISION_MODEL_ID = "openai/chatgpt-4o-latest"
+VISION_SYSTEM_PROMPT = "You are a detailed image description expert for a mobile game. Examine the game screenshot and create a concise description that includes the main elements, puzzle/challenge, visible text, and overall theme. Keep your description to a maximum of 5 sentences."
 # Available model mappings
 MODEL_IDS = {
     "grok3": "x-ai/grok-3-beta",
@@ -47,6 +62,22 @@ MODEL_IDS = {
     "gemini-1.5-pro": "google/gemini-flash-1.5-8b"
 }
 
+# Extra requests per text for languages whose translation could not be extracted from the answer
+MAX_REASKS = 2
+
+# Rows with the same English text share one translation: "description" only within the same
+# image description (identical requests), "text" across the whole job
+DEDUPE_SCOPES = ("description", "text")
+DEFAULT_DEDUPE_SCOPE = "description"
+
+# Finished translations the deduplicator remembers before the oldest are dropped
+DEDUPE_MAX_ENTRIES = 50000
+
+# Models that accept response_format={"type": "json_object"} through OpenRouter;
+# the others are asked for "Language: text" lines, which are parsed with regexes
+JSON_MODE_MODELS = frozenset(("x-ai/grok-3-beta", "openai/gpt-4.1", "google/gemini-flash-1.5-8b"))
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
 # Define language codes for output
 LANGUAGE_CODES = {
     "turkish": "tr",
@@ -93,6 +124,88 @@ LANGUAGE_NAMES = {
     "CN_TR": "chinese"
 }
 
+# Screenshots are downscaled and re-encoded before they are sent to the vision model
+IMAGE_MAX_EDGE = 1024
+IMAGE_FORMAT = "JPEG"
+IMAGE_QUALITY = 85
+IMAGE_CACHE_DIRNAME = "image_cache"
+IMAGE_FORMATS = {
+    "JPEG": (".jpg", "image/jpeg"),
+    "WEBP": (".webp", "image/webp"),
+    "PNG": (".png", "image/png"),
+}
+
+def image_mime_type(image_path):
+    """Return the MIME type of an image file based on its extension"""
+    mime_type, _ = mimetypes.guess_type(image_path)
+    return mime_type if mime_type and mime_type.startswith("image/") else "image/jpeg"
+
+def preprocess_image(image_path, max_edge=IMAGE_MAX_EDGE, image_format=IMAGE_FORMAT, quality=IMAGE_QUALITY, cache_dir=None):
+    """
+    Downscale an image so its longest edge is at most max_edge and re-encode it.
+    The result is written to cache_dir (default output/image_cache) under a name
+    derived from the image bytes and the settings, so each image is only
+    processed once. Returns the path of the processed file.
+    """
+    image_format = image_format.upper()
+    extension, _ = IMAGE_FORMATS[image_format]
+    cache_dir = cache_dir or os.path.join(DEFAULT_CACHE_DIR, IMAGE_CACHE_DIRNAME)
+    key = content_hash(file_hash(image_path), str(max_edge), image_format, str(quality))
+    output_path = os.path.join(cache_dir, key + extension)
+    if os.path.exists(output_path):
+        return output_path
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    with Image.open(image_path) as image:
+        image.load()
+        if max_edge and max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if image_format == "JPEG" and image.mode != "RGB":
+            # JPEG has no alpha channel, put transparent screenshots on white
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.split()[-1])
+            image = background
+        
+        # Write to a temporary name first so parallel workers never see half-written files
+        temp_path = f"{output_path}.{os.getpid()}.tmp"
+        image.save(temp_path, format=image_format, quality=quality, optimize=True)
+    os.replace(temp_path, output_path)
+    return output_path
+
+def _preprocess_image_task(args):
+    """Process pool entry point for preprocess_image, returns the original path on failure"""
+    image_path, options = args
+    try:
+        return preprocess_image(image_path, **options)
+    except Exception as e:
+        print(f"Error preprocessing image {os.path.basename(image_path)}: {str(e)}")
+        return image_path
+
+def preprocess_images(image_paths, image_options, max_workers=None):
+    """
+    Preprocess several images in a process pool so the resizing work runs on all CPU cores.
+    Returns {original path: processed path}.
+    """
+    image_paths = list(dict.fromkeys(image_paths))
+    if not image_paths:
+        return {}
+    
+    tasks = [(image_path, image_options) for image_path in image_paths]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(image_paths))
+    if max_workers <= 1:
+        return dict(zip(image_paths, map(_preprocess_image_task, tasks)))
+    
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            processed = list(executor.map(_preprocess_image_task, tasks))
+    except Exception as e:
+        # A broken pool should never stop the run; images are processed lazily instead
+        print(f"⚠️ Image preprocessing pool failed: {str(e)}")
+        return {}
+    print(f"✓ Preprocessed {len(processed)} images with {max_workers} processes")
+    return dict(zip(image_paths, processed))
+
 def encode_image(image_path):
     """Encode image to base64 for API request"""
     try:
@@ -103,10 +216,53 @@ def encode_image(image_path):
         print(f"Error encoding image: {str(e)}")
         return None
 
-def find_image_by_id(images_dir, image_id):
-    """Find an image file by its ID in the filename"""
+def _image_id_number(image_id):
+    """Convert image_id to string and remove "ID" prefix if present"""
+    return image_id.replace("ID", "") if image_id.startswith("ID") else image_id
+
+def build_image_index(images_dir):
+    """
+    Scan images_dir once and map image ID numbers to the files that contain them.
+    Follows the same naming rule as find_image_by_id: a file matches ID <n> when
+    its name contains "ID<n>." (case insensitive). Keys are lowercase ID numbers,
+    values list the matching paths in directory order.
+    """
+    index = {}
+    for filename in os.listdir(images_dir):
+        lower_name = filename.lower()
+        path = os.path.join(images_dir, filename)
+        start = lower_name.find("id")
+        while start != -1:
+            # Every dot after "ID" ends a candidate ID number
+            dot = lower_name.find(".", start + 2)
+            while dot != -1:
+                paths = index.setdefault(lower_name[start + 2:dot], [])
+                if not paths or paths[-1] != path:
+                    paths.append(path)
+                dot = lower_name.find(".", dot + 1)
+            start = lower_name.find("id", start + 1)
+    return index
+
+def check_image_index(image_index, image_ids):
+    """Return (IDs without an image, {ID: paths} for IDs matching more than one image)"""
+    missing = []
+    duplicates = {}
+    for image_id in image_ids:
+        paths = image_index.get(_image_id_number(image_id).lower(), [])
+        if not paths:
+            missing.append(image_id)
+        elif len(paths) > 1:
+            duplicates[image_id] = paths
+    return missing, duplicates
+
+def find_image_by_id(images_dir, image_id, image_index=None):
+    """Find an image file by its ID in the filename (using a prebuilt index if given)"""
     # Convert image_id to string and remove "ID" prefix if present
-    id_num = image_id.replace("ID", "") if image_id.startswith("ID") else image_id
+    id_num = _image_id_number(image_id)
+    
+    if image_index is not None:
+        paths = image_index.get(id_num.lower())
+        return paths[0] if paths else None
     
     # Look for files with names containing the ID
     pattern = re.compile(r".*ID" + id_num + r"\..*$", re.IGNORECASE)
@@ -125,8 +281,15 @@ def manual_ocr(image_path):
     print(f"⚠️ OCR not implemented for image: {os.path.basename(image_path)}")
     return f"[OCR text for {os.path.basename(image_path)} would appear here]"
 
-def get_image_description(image_path, api_key=None, debug=False):
-    """Get description of image using GPT 4o Vision model (limited to 5 sentences)"""
+def get_image_description(image_path, api_key=None, debug=False, rate_limiter=None, description_cache=None, image_options=None, cancel_event=None):
+    """
+    Get description of image using GPT 4o Vision model (limited to 5 sentences)
+    
+    If a DescriptionCache is given, an unchanged image is served from it and
+    successful descriptions are stored in it. image_options (max_edge,
+    image_format, quality) enable downscaling/re-encoding before the upload.
+    Raises RequestCancelled instead of sending or retrying once cancel_event is set.
+    """
     print(f"\n🔍 Getting image description for {os.path.basename(image_path)}...")
     
     if debug:
@@ -139,55 +302,88 @@ def get_image_description(image_path, api_key=None, debug=False):
         print("✗ No API key available for image description")
         return "Error: No API key available for image description"
     
+    # Reuse the description of an identical image described by the same model and prompt
+    cache_key = None
+    if description_cache:
+        image_hash = file_hash(image_path)
+        cache_key = description_cache.make_key(image_hash, VISION_MODEL_ID, VISION_SYSTEM_PROMPT)
+        cached_description = description_cache.get(cache_key)
+        if cached_description is not None:
+            print("✓ Image description served from cache")
+            return cached_description
+    
+    # Downscale and re-encode the screenshot to keep the upload small
+    upload_path = image_path
+    if image_options:
+        try:
+            upload_path = preprocess_image(image_path, **image_options)
+        except Exception as e:
+            print(f"⚠️ Could not preprocess image, sending the original: {str(e)}")
+    
     # Convert the image to base64
-    base64_image = encode_image(image_path)
+    base64_image = encode_image(upload_path)
     if not base64_image:
         return "Error: Failed to encode image"
+    mime_type = image_mime_type(upload_path)
+    
+    # Shared per-key rate limiter (a screenshot counts as roughly 1000 prompt tokens)
+    limiter = rate_limiter or get_rate_limiter(api_key_to_use)
+    estimated_tokens = 1000 + 300
+    timeout_seconds = 20
+    
+    # Pooled keep-alive session of the API key
+    session = get_api_clients(api_key_to_use).session
+    
+    def send_request():
+        response = session.post(
+            url=f"{OPENROUTER_BASE_URL}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {api_key_to_use}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://cascade.ai",  # Site URL for rankings
+                "X-Title": "Game Localization Tool",  # Site title for rankings
+            },
+            json={
+                "model": VISION_MODEL_ID,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": VISION_SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": "What does this game screenshot show?"
+                            },
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:{mime_type};base64,{base64_image}"
+                                }
+                            }
+                        ]
+                    }
+                ],
+                "max_tokens": 300
+            },
+            timeout=timeout_seconds
+        )
+        # Hand 429 responses to the rate limiter instead of treating them as results
+        if response.status_code == 429:
+            raise RateLimitExceeded(parse_retry_after(response.headers), f"Vision API rate limited: {response.text[:200]}")
+        return response
     
     try:
         # Direct API request to OpenRouter with timeout and retry logic
         max_retries = 2
         retry_count = 0
-        timeout_seconds = 20
         
         while retry_count <= max_retries:
             try:
                 print(f"Attempt {retry_count + 1} to connect to vision API...")
-                response = requests.post(
-                    url="https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {api_key_to_use}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://cascade.ai",  # Site URL for rankings
-                        "X-Title": "Game Localization Tool",  # Site title for rankings
-                    },
-                    json={
-                        "model": VISION_MODEL_ID,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "You are a detailed image description expert for a mobile game. Examine the game screenshot and create a concise description that includes the main elements, puzzle/challenge, visible text, and overall theme. Keep your description to a maximum of 5 sentences."
-                            },
-                            {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "text",
-                                        "text": "What does this game screenshot show?"
-                                    },
-                                    {
-                                        "type": "image_url",
-                                        "image_url": {
-                                            "url": f"data:image/jpeg;base64,{base64_image}"
-                                        }
-                                    }
-                                ]
-                            }
-                        ],
-                        "max_tokens": 300
-                    },
-                    timeout=timeout_seconds
-                )
+                response = call_with_rate_limit(send_request, limiter, estimated_tokens, cancel_event=cancel_event)
                 # If we got here, the request succeeded, so break the retry loop
                 break
             except requests.exceptions.Timeout:
@@ -195,7 +391,7 @@ def get_image_description(image_path, api_key=None, debug=False):
                 print(f"Request timed out after {timeout_seconds} seconds. Retry {retry_count}/{max_retries}")
                 if retry_count > max_retries:
                     raise Exception(f"API request timed out after {max_retries} retries")
-                time.sleep(2)  # Wait before retrying
+                cancellable_sleep(2, cancel_event)  # Wait before retrying
             except requests.exceptions.RequestException as req_err:
                 print(f"Request error: {str(req_err)}")
                 # For connection errors, we'll retry
@@ -203,7 +399,7 @@ def get_image_description(image_path, api_key=None, debug=False):
                     retry_count += 1
                     if retry_count > max_retries:
                         raise
-                    time.sleep(2)  # Wait before retrying
+                    cancellable_sleep(2, cancel_event)  # Wait before retrying
                 else:
                     # For other request errors, raise immediately
                     raise
@@ -246,6 +442,9 @@ def get_image_description(image_path, api_key=None, debug=False):
                 description = ' '.join(sentences[:5])
             
             print(f"✓ Successfully obtained image description: {description[:50]}...")
+            
+            if cache_key:
+                description_cache.put(cache_key, image_hash, os.path.basename(image_path), description)
 
             return description
         # Special handling for some API response formats
@@ -274,6 +473,8 @@ def get_image_description(image_path, api_key=None, debug=False):
             
             return "Error: Invalid response format from vision API"
     
+    except RequestCancelled:
+        raise
     except Exception as e:
         print(f"✗ Error getting image description: {str(e)}")
         # Instead of returning an error, provide a generic description to allow processing to continue
@@ -281,36 +482,105 @@ def get_image_description(image_path, api_key=None, debug=False):
         image_name = os.path.basename(image_path)
         return f"This is likely a game screen showing interactive elements. The player appears to be presented with a puzzle or challenge to solve. There may be instructions or game elements visible on screen. File: {image_name}"
 
+class CharacterNames(dict):
+    """
+    English character names (and their variants) mapped to the localized names
+    of one language, with a single compiled matcher for all of them.
+    """
+    
+    def __init__(self, names=None):
+        super().__init__(names or {})
+        # Case-insensitive matching; the matched text is mapped back by its group, never by lowercasing it,
+        # since case folding and str.lower() differ for letters like the Turkish "İ"
+        lookup = {name.lower(): localized for name, localized in self.items()}
+        if lookup:
+            # Longest names first so "Granny Amy" wins over a shorter "Amy".
+            # Only Latin letters and digits count as word characters around a name,
+            # so names are still found next to Japanese, Chinese or Thai text.
+            alternatives = sorted(lookup, key=len, reverse=True)
+            self._localized = {f"n{index}": lookup[name] for index, name in enumerate(alternatives)}
+            self._pattern = re.compile(
+                r'(?<![0-9A-Za-z\u00C0-\u024F_])(?:'
+                + '|'.join(f"(?P<n{index}>{re.escape(name)})" for index, name in enumerate(alternatives))
+                + r')(?![0-9A-Za-z\u00C0-\u024F_])',
+                re.IGNORECASE
+            )
+        else:
+            self._pattern = None
+    
+    def replace(self, text):
+        """Replace every character name in text in a single pass"""
+        if not text or self._pattern is None:
+            return text
+        return self._pattern.sub(lambda match: self._localized[match.lastgroup], text)
+
+def character_variants(char):
+    """Return the alternative spellings listed for a character in the roster file"""
+    variants = char.get("Variants") or []
+    if isinstance(variants, str):
+        variants = variants.split(",")
+    return [variant.strip() for variant in variants if variant and variant.strip()]
+
+def normalize_language_header(header):
+    """Map a roster column header such as "CZ (cestina)" or "cn_tr" to a language code, or None"""
+    code = header.split("(")[0].strip().upper().replace("-", "_").replace(" ", "_")
+    return code if code in LANGUAGE_NAMES else None
+
+# Parsed character tables per roster file, reused while the file is unchanged
+_CHARACTER_DATA_CACHE = {}
+_CHARACTER_DATA_LOCK = threading.Lock()
+
+def _parse_character_data(chars_file):
+    with open(chars_file, 'r', encoding='utf-8') as f:
+        chars_data = json.load(f)
+    
+    # Collect the names for each language
+    names = {}
+    
+    # Process each character
+    for char in chars_data:
+        en_name = char.get("Character Name (EN)", "") or char.get("EN", "")
+        if not en_name:
+            continue
+        # Known misspellings and variations get the same localized name
+        spellings = [en_name] + character_variants(char)
+        for header, localized_name in char.items():
+            code = normalize_language_header(header)
+            if code and localized_name:
+                lang_names = names.setdefault(LANGUAGE_NAMES[code], {})
+                for spelling in spellings:
+                    lang_names[spelling] = localized_name
+    
+    # Compile one matcher per language
+    char_lookup = {lang_name: CharacterNames(lang_names) for lang_name, lang_names in names.items()}
+    
+    print(f"✓ Successfully loaded character data for {len(chars_data)} characters in {len(char_lookup)} languages")
+    return char_lookup
+
 def load_character_data(chars_file):
-    """Load character data from JSON file"""
+    """
+    Load character data from JSON file
+    
+    Returns {language name: CharacterNames} for every roster column that maps
+    to a supported language code. The parsed tables are cached by file path and
+    modification time, so repeated jobs reuse them until the file changes.
+    """
     try:
         if not os.path.exists(chars_file):
             print(f"⚠️ Character file not found: {chars_file}")
             return {}
-            
-        with open(chars_file, 'r', encoding='utf-8') as f:
-            chars_data = json.load(f)
-            
-        # Create a lookup dictionary for each language
-        char_lookup = {
-            "turkish": {},
-            "french": {},
-            "german": {}
-        }
         
-        # Process each character
-        for char in chars_data:
-            en_name = char.get("Character Name (EN)", "") or char.get("EN", "")
-            if en_name:
-                if "TR" in char and char["TR"]:
-                    char_lookup["turkish"][en_name] = char["TR"]
-                if "FR" in char and char["FR"]:
-                    char_lookup["french"][en_name] = char["FR"]
-                if "DE" in char and char["DE"]:
-                    char_lookup["german"][en_name] = char["DE"]
-        
-        print(f"✓ Successfully loaded character data for {len(chars_data)} characters")
-        return char_lookup
+        path = os.path.abspath(chars_file)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with _CHARACTER_DATA_LOCK:
+            cached = _CHARACTER_DATA_CACHE.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+            
+            char_lookup = _parse_character_data(path)
+            _CHARACTER_DATA_CACHE[path] = (signature, char_lookup)
+            return char_lookup
     except Exception as e:
         print(f"✗ Error loading character data: {str(e)}")
         return {}
@@ -318,84 +588,72 @@ def load_character_data(chars_file):
 def replace_character_names(text, language, char_lookup):
     """Replace character names in the given text with localized versions"""
     # Skip if no character data exists for this language or if text is empty
-    if not text or language not in char_lookup:
+    if not text or not char_lookup or language not in char_lookup:
         return text
     
-    # Print debug information about character replacements
-    print(f"\n✓ Applying character replacements for language: {language}")
-    print(f"✓ Available character mappings: {list(char_lookup[language].keys())}")
-    
-    # Get character replacements for this language
+    # Get the compiled character names for this language
     char_data = char_lookup[language]
+    if not isinstance(char_data, CharacterNames):
+        char_data = CharacterNames(char_data)
     
-    # Start with the original text
-    result = text
-    original = text
-    
-    # Define special case handling for known variations and misspellings
-    special_cases = {
-        "lily": ["lilly", "lillie"],   # Common misspellings of Lily
-        "amy": ["amie", "aimee"],     # Common variations of Amy
-        "bubba": ["buba", "bubber"]   # Common variations of Bubba
-    }
-    
-    # Apply character replacements with special handling for variations
-    for english_name, localized_name in char_data.items():
-        # Standard replacement - case insensitive
-        pattern = r'\b' + re.escape(english_name) + r'\b'
-        result = re.sub(pattern, localized_name, result, flags=re.IGNORECASE)
-        
-        # Check for special cases and their variations
-        english_lower = english_name.lower()
-        if english_lower in special_cases:
-            for variation in special_cases[english_lower]:
-                variation_pattern = r'\b' + variation + r'\b'
-                result = re.sub(variation_pattern, localized_name, result, flags=re.IGNORECASE)
+    result = char_data.replace(text)
     
     # Report if any replacements were made for debugging
-    if result != original:
-        print(f"✓ Character names replaced in text: {original} -> {result}")
+    if result != text:
+        print(f"✓ Character names replaced in text: {text} -> {result}")
     
     return result
 
-def process_localization(description, english_text, model="grok3", languages=None, debug=False, char_lookup=None, api_key=None, custom_prompt=None):
-    """Process localization using the selected model"""
-    # Default languages if none specified
-    if languages is None:
-        languages = ["TR", "FR", "DE"]
+def build_system_prompt(description, languages, custom_prompt=None, grouped=False, json_output=False):
+    """
+    Build the system prompt for a localization request.
+    With grouped=True the model is asked to answer with one JSON object keyed by LOCID,
+    with json_output=True with one JSON object keyed by language name.
+    A custom prompt replaces the default context; the JSON answer formats are
+    still appended to it, since those answers can only be parsed as JSON.
+    """
+    language_titles = [LANGUAGE_NAMES.get(lang_code.upper(), 'Unknown').title() for lang_code in languages]
     
-    # Get model ID
-    model_id = MODEL_IDS.get(model, "x-ai/grok-3")
-    print(f"\n🔄 Processing localization for text: {english_text[:50]}... using {model_id}")
-    print(f"  Selected languages: {', '.join(languages)}")
+    if grouped:
+        example = ", ".join(f'"{title.lower()}": "[Translated text only]"' for title in language_titles)
+        format_block = f"""Each request contains several English texts of the same game screen, given as a JSON object keyed by LOCID.
+    Format your response as a single JSON object with the same LOCID keys. The value for each LOCID is an object
+    with one key per language (lowercase language name) holding the translated text only:
     
-    if debug:
-        print("  DEBUG MODE: Returning mock translations instead of calling API")
-        # Create result dictionary with mock translations for selected languages
-        result = {"english": english_text}
-        
-        # Mock translations for all supported languages
-        for lang_code in languages:
-            lang_name = LANGUAGE_NAMES.get(lang_code.upper(), "").lower()
-            if lang_name in LANGUAGE_CODES:
-                lang_key = LANGUAGE_CODES[lang_name]
-                mock_text = f"[{lang_code}] {english_text}"
-                
-                # Apply character name replacements if available
-                if char_lookup and lang_name in char_lookup:
-                    mock_text = replace_character_names(mock_text, lang_name, char_lookup)
-                    
-                result[lang_key] = mock_text
-                
-        return result
+    {{"LOCID": {{{example}}}}}
+    
+    Do not include ANY additional explanations, notes, or context in your response.
+    Return ONLY the JSON object."""
+    elif json_output:
+        example = ", ".join(f'"{title.lower()}": "[Translated text only]"' for title in language_titles)
+        format_block = f"""Format your response as a single JSON object with one key per language (lowercase language name)
+    holding the translated text only:
+    
+    {{{example}}}
+    
+    Do not include ANY additional explanations, notes, or context in your response.
+    Return ONLY the JSON object."""
+    else:
+        language_lines = "\n    ".join(f"{title}: [Translated text only]" for title in language_titles)
+        format_block = f"""Format your response for each language as follows:
+    
+    {language_lines}
+    
+    Do not include ANY additional explanations, notes, or context in your response.
+    Do not include the "Localization:**" prefix or any explanation section.
+    Return ONLY the direct translations for each language."""
     
     # Use custom prompt if provided, otherwise use default
     if custom_prompt:
-        # Replace placeholders in the custom prompt
-        system_prompt = custom_prompt
-    else:
-        # Default context prompt explaining what we want
-        system_prompt = f"""
+        if grouped or json_output:
+            return f"""{custom_prompt}
+
+    {format_block}
+    """
+        return custom_prompt
+    
+    # Default context prompt explaining what we want
+    return f"""
     You are a game localization translator expert.
 
     You have been provided with an image description and English text from a 'Brain Test' puzzle game.
@@ -416,122 +674,304 @@ def process_localization(description, english_text, model="grok3", languages=Non
     {description}
     
     Your task is to provide culturally-appropriate localizations of the English text in the following languages:
-    {', '.join([LANGUAGE_NAMES.get(lang_code.upper(), 'Unknown').title() for lang_code in languages])}
+    {', '.join(language_titles)}
     
     For localization, use cultural references, idioms, and wordplay specific to each language.
     
     These should preserve the game mechanics, humor, and puzzle elements but adapt them to feel natural 
     in each target language.
 
-    Format your response for each language as follows:
+    {format_block}
+    """
+
+def request_completion(system_prompt, user_prompt, model_id, api_key=None, max_tokens=512, rate_limiter=None, cancel_event=None,
+                       response_format=None):
+    """
+    Send a chat completion request through the shared rate limiter and return the response text.
+    response_format (e.g. JSON_RESPONSE_FORMAT) is passed on to models in JSON_MODE_MODELS.
+    Connection errors, timeouts and 5xx responses are retried a few times.
+    """
+    # Shared pooled client of the custom API key or default
+    # The client does not retry: 429s go to the shared rate limiter, other failures are retried below
+    client = get_api_clients(api_key or DEFAULT_OPENROUTER_API_KEY).openai_client
+    limiter = rate_limiter or get_rate_limiter(api_key or DEFAULT_OPENROUTER_API_KEY)
+    estimated_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + max_tokens
+    extra_options = {"response_format": response_format} if response_format and model_id in JSON_MODE_MODELS else {}
     
-    {"\n    ".join([f"{LANGUAGE_NAMES.get(lang_code.upper(), 'Unknown').title()}: [Translated text only]" for lang_code in languages])}
+    def send_request():
+        try:
+            # Call the selected model with OpenRouter headers
+            return client.chat.completions.create(
+                extra_headers={
+                    "HTTP-Referer": "https://cascade.ai",  # Site URL for rankings
+                    "X-Title": "Game Localization Tool",   # Site title for rankings
+                },
+                model=model_id,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.3,
+                **extra_options
+            )
+        except RateLimitError as e:
+            raise RateLimitExceeded(parse_retry_after(e.response.headers), str(e))
     
-    Do not include ANY additional explanations, notes, or context in your response.
-    Do not include the "Localization:**" prefix or any explanation section.
-    Return ONLY the direct translations for each language.
-    """
+    max_retries = 2
+    retry_count = 0
+    
+    while True:
+        try:
+            response = call_with_rate_limit(send_request, limiter, estimated_tokens, cancel_event=cancel_event)
+            break
+        except (APIConnectionError, InternalServerError) as e:
+            # APITimeoutError is an APIConnectionError
+            retry_count += 1
+            if retry_count > max_retries:
+                raise
+            print(f"Request error: {str(e)}. Retry {retry_count}/{max_retries}")
+            cancellable_sleep(2, cancel_event)  # Wait before retrying
     
+    # Extract response
+    return response.choices[0].message.content
+
+def lookup_cached_translations(cache, english_text, description, model_id, lang_names, custom_prompt=None):
+    """
+    Look up the translations of one text in the translation cache.
+    Returns ({lang_name: cached text}, {lang_name: cache key}) where the second dict
+    holds the keys of the languages that still need to be translated.
+    """
+    # The prompt template (not the filled-in prompt) is part of the key
+    prompt = custom_prompt or build_system_prompt("", [])
+    found = {}
+    missing_keys = {}
+    for lang_name in lang_names:
+        key = cache.make_key(english_text, description, model_id, lang_name, prompt)
+        text = cache.get(key)
+        if text is None:
+            missing_keys[lang_name] = key
+        else:
+            found[lang_name] = text
+    return found, missing_keys
+
+# "Localization:**" and "**Text:**" prefixes the models sometimes put before a translation
+_TRANSLATION_PREFIX_PATTERN = re.compile(r'Localization:\*\*\n\n|\*\*Text:\*\*\s*')
+
+# Start of an explanation or notes section; everything from there on is dropped
+_EXPLANATION_PATTERN = re.compile(r'\*\*Explanation:|Explanation:|\*\*Localization Notes:')
+
+def clean_translation_text(text):
+    """Remove prefixes and explanation sections the models sometimes add around a translation"""
+    text = _TRANSLATION_PREFIX_PATTERN.sub('', text)
+    explanation_match = _EXPLANATION_PATTERN.search(text)
+    if explanation_match:
+        text = text[:explanation_match.start()]
+    return text.strip()
+
+@functools.lru_cache(maxsize=256)
+def language_label_pattern(lang_names):
+    """
+    Compiled pattern of the "Turkish:" labels of a tuple of language names,
+    also in upper case or markdown bold ("**TURKISH:**"). Built once per
+    language selection instead of once per request.
+    """
+    # Longer names first, so no name can match the start of another
+    names = '|'.join(re.escape(lang_name) for lang_name in sorted(lang_names, key=len, reverse=True))
+    return re.compile(rf'(?<!\w)[*#]*({names})[*]*[ \t]*:[*]*', re.IGNORECASE)
+
+def parse_json_object(response_text):
+    """The JSON object in a response, ignoring markdown code fences and text around it; None if there is none"""
+    start = response_text.find("{")
+    end = response_text.rfind("}")
+    if start == -1 or end <= start:
+        return None
     try:
+        data = json.loads(response_text[start:end + 1])
+    except json.JSONDecodeError as e:
+        print(f"Warning: Could not parse response as JSON: {str(e)}")
+        return None
+    return data if isinstance(data, dict) else None
+
+def parse_localization_response(response_text, lang_names):
+    """
+    Parse the answer to a single-text localization request into {lang_name: text}.
+    A JSON object keyed by language name (JSON mode) is read first; otherwise the
+    text after each "Language:" label up to the next label is taken, in any order.
+    Languages that are missing or empty are left out.
+    """
+    data = parse_json_object(response_text)
+    if data:
+        entry = {str(key).lower(): value for key, value in data.items()}
+        parsed = {lang_name: entry[lang_name] for lang_name in lang_names
+                  if isinstance(entry.get(lang_name), str) and entry[lang_name].strip()}
+        if parsed:
+            return parsed
+    
+    parsed = {}
+    matches = list(language_label_pattern(tuple(lang_names)).finditer(response_text))
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        lang_name = match.group(1).lower()
+        text = response_text[match.end():next_match.start() if next_match else len(response_text)].strip()
+        if text and lang_name not in parsed:
+            parsed[lang_name] = text
+    return parsed
+
+class ReaskStats:
+    """Per-language counts of the targeted re-asks made for translations that could not be extracted"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def record(self, lang_name, reasks, recovered):
+        """Record that a text needed reasks extra requests for a language, and whether they produced a translation"""
+        with self._lock:
+            stats = self._stats.setdefault(lang_name, {"texts": 0, "reasks": 0, "recovered": 0, "failed": 0})
+            stats["texts"] += 1
+            stats["reasks"] += reasks
+            stats["recovered" if recovered else "failed"] += 1
+    
+    def stats(self):
+        """{lang_name: {"texts", "reasks", "recovered", "failed"}} for every language that was re-asked"""
+        with self._lock:
+            return {lang_name: dict(stats) for lang_name, stats in self._stats.items()}
+
+def process_localization(description, english_text, model="grok3", languages=None, debug=False, char_lookup=None, api_key=None, custom_prompt=None, rate_limiter=None, cache=None,
+                         cancel_event=None, max_reasks=MAX_REASKS, reask_stats=None):
+    """
+    Process localization using the selected model
+    
+    If a TranslationCache is given, cached languages are served from it and only
+    the remaining languages are sent to the model. Languages whose translation
+    cannot be extracted from the answer are asked for again on their own, up to
+    max_reasks times, and counted in reask_stats (a ReaskStats) if given.
+    Raises RequestCancelled once cancel_event is set.
+    """
+    # Default languages if none specified
+    if languages is None:
+        languages = ["TR", "FR", "DE"]
+    
+    # Get model ID
+    model_id = MODEL_IDS.get(model, "x-ai/grok-3")
+    print(f"\n🔄 Processing localization for text: {english_text[:50]}... using {model_id}")
+    print(f"  Selected languages: {', '.join(languages)}")
+    
+    if debug:
+        print("  DEBUG MODE: Returning mock translations instead of calling API")
+        # Create result dictionary with mock translations for selected languages
+        result = {"english": english_text}
+        
+        # Mock translations for all supported languages
+        for lang_code in languages:
+            lang_name = LANGUAGE_NAMES.get(lang_code.upper(), "").lower()
+            if lang_name in LANGUAGE_CODES:
+                mock_text = f"[{lang_code}] {english_text}"
+                
+                # Apply character name replacements if available
+                if char_lookup and lang_name in char_lookup:
+                    mock_text = replace_character_names(mock_text, lang_name, char_lookup)
+                    
+                result[lang_name] = mock_text
+                
+        return result
+    
+    # Serve what we can from the translation cache and only ask for the rest
+    cached_localization = {}
+    cache_keys = {}
+    if cache:
+        lang_names = [LANGUAGE_NAMES.get(lang_code.upper(), "").lower() for lang_code in languages]
+        cached, cache_keys = lookup_cached_translations(cache, english_text, description, model_id, [name for name in lang_names if name], custom_prompt)
+        for lang_name, text in cached.items():
+            # Character names are replaced after the cache, so roster changes apply to cached texts too
+            if char_lookup:
+                text = replace_character_names(text, lang_name, char_lookup)
+            cached_localization[lang_name] = text
+        
+        if cached_localization:
+            languages = [lang_code for lang_code in languages if LANGUAGE_NAMES.get(lang_code.upper(), "").lower() not in cached_localization]
+            if not languages:
+                print("✓ All translations served from cache")
+                return {"english": english_text, **cached_localization}
+            print(f"  {len(cached_localization)} translation(s) served from cache, requesting: {', '.join(languages)}")
+    
+    # Structured answers from models that support them; custom prompts get the JSON format block appended
+    json_mode = model_id in JSON_MODE_MODELS
+    
+    def request_languages(lang_codes):
+        """Ask the model for the given languages and return the non-empty translations it parsed to"""
+        system_prompt = build_system_prompt(description, lang_codes, custom_prompt, json_output=json_mode)
+        
         # Build the message with English text
         # Create a comma-separated list of the language names
-        language_list = ', '.join([LANGUAGE_NAMES.get(lang_code.upper(), 'Unknown').title() for lang_code in languages])
+        language_list = ', '.join([LANGUAGE_NAMES.get(lang_code.upper(), 'Unknown').title() for lang_code in lang_codes])
         
         user_prompt = f"""
 English Text: {english_text}
 
 Please provide localized versions in {language_list} that preserve the meaning, humor, and game mechanic while being culturally appropriate.
 """
+        if json_mode:
+            user_prompt += "Answer with a JSON object keyed by the lowercase language names.\n"
         
-        # Create client with the custom API key or default
-        client = create_openai_client(api_key)
-        
-        # Call the selected model with OpenRouter headers
-        response = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": "https://cascade.ai",  # Site URL for rankings
-                "X-Title": "Game Localization Tool",   # Site title for rankings
-            },
-            model=model_id,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=512,
-            temperature=0.3,
-        )
+        # Call the selected model through the shared rate limiter
+        response_text = request_completion(system_prompt, user_prompt, model_id, api_key, max_tokens=512, rate_limiter=rate_limiter, cancel_event=cancel_event,
+                                           response_format=JSON_RESPONSE_FORMAT if json_mode else None)
+        lang_names = [LANGUAGE_NAMES.get(lang_code.upper(), "").lower() for lang_code in lang_codes]
+        parsed = parse_localization_response(response_text, [lang_name for lang_name in lang_names if lang_name])
+        return {lang_name: text for lang_name, text in parsed.items() if clean_translation_text(text)}
+    
+    try:
+        parsed = request_languages(languages)
         
-        # Extract response
-        response_text = response.choices[0].message.content
+        # Ask again for the languages that could not be extracted, keeping the ones that could
+        retries = {}
+        for attempt in range(1, max_reasks + 1):
+            missing = [lang_code for lang_code in languages
+                       if LANGUAGE_NAMES.get(lang_code.upper()) and LANGUAGE_NAMES[lang_code.upper()] not in parsed]
+            if not missing:
+                break
+            print(f"  ↻ Re-asking for {', '.join(missing)} (attempt {attempt}/{max_reasks})")
+            for lang_code in missing:
+                retries[LANGUAGE_NAMES.get(lang_code.upper(), "").lower()] = attempt
+            try:
+                parsed.update(request_languages(missing))
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                # Keep the translations we already have
+                print(f"✗ Error re-asking for {', '.join(missing)}: {str(e)}")
+                break
         
         # Parse the response to extract localizations
         localization = {
-            "english": english_text
+            "english": english_text,
+            **cached_localization
         }
         
-        # Create dynamic patterns for matching each language translation
-        patterns = {}
-        
         # Get all language names from the selected codes
         selected_lang_names = [LANGUAGE_NAMES.get(lang_code.upper(), "").lower() for lang_code in languages]
+        selected_lang_names = [lang_name for lang_name in selected_lang_names if lang_name]
         
-        # Generate the regex patterns for each language
-        for i, lang_name in enumerate(selected_lang_names):
-            if not lang_name:
-                continue
-                
-            # Get the next language name(s) to use as boundary or end-of-string
-            next_langs = selected_lang_names[i+1:]
-            boundary = ""
-            
-            if next_langs:
-                # Create the boundary pattern using the next languages
-                boundary_parts = [f"(?:{next_lang.title()}|{next_lang.upper()})" for next_lang in next_langs if next_lang]
-                if boundary_parts:
-                    boundary = f"(?=(?:{'|'.join(boundary_parts)}|$))"
-                else:
-                    boundary = "(?=$)"
-            else:
-                boundary = "(?=$)"
-                
-            # Create the pattern for this language
-            pattern = f"(?:{lang_name.title()}|{lang_name.upper()})[:\s]+(.*?){boundary}"
-            patterns[lang_name] = pattern
-        
-        for lang, pattern in patterns.items():
-            match = re.search(pattern, response_text, re.DOTALL)
-            if match:
-                localization[lang] = match.group(1).strip()
+        for lang in selected_lang_names:
+            if lang in parsed:
+                localization[lang] = parsed[lang]
             else:
                 print(f"Warning: Could not extract {lang} localization")
                 localization[lang] = f"Error: Could not extract {lang} localization"
+            if reask_stats is not None and lang in retries:
+                reask_stats.record(lang, retries[lang], lang in parsed)
         
         # Process output format and apply character name replacements if needed
         for lang_code in languages:
             lang_name = LANGUAGE_NAMES.get(lang_code.upper(), "").lower()
             if lang_name in localization:
                 # Clean up the text by removing all prefixes and explanations
-                text = localization[lang_name]
-                
-                # Remove "Localization:**\n\n" prefix if present
-                if "Localization:**" in text:
-                    text = re.sub(r'Localization:\*\*\n\n', '', text)
+                text = clean_translation_text(localization[lang_name])
                 
-                # Remove "**Text:**" prefix if present
-                if "**Text:**" in text:
-                    text = re.sub(r'\*\*Text:\*\*\s*', '', text)
-                
-                # Remove any explanation sections
-                for pattern in [r'\*\*Explanation:\*\*.*', r'\n\n\*\*Explanation:.*', r'\*\*Localization Notes:\*\*.*', r'\n\n\*\*Localization Notes:.*']:
-                    text = re.sub(pattern, '', text, flags=re.DOTALL)
-                
-                # Remove any "Explanation:**" prefix and content after it
-                explanation_match = re.search(r'(Explanation:|\*\*Explanation:)', text)
-                if explanation_match:
-                    text = text[:explanation_match.start()].strip()
-                    
-                # Final cleanup - remove any trailing whitespace or newlines
-                text = text.strip()
+                # Remember successful translations before character names are localized
+                if lang_name in cache_keys and text and not text.startswith("Error:"):
+                    cache.put(cache_keys[lang_name], lang_name, text)
                         
                 # Apply character name replacements if character lookup is provided
                 if char_lookup:
@@ -543,141 +983,754 @@ Please provide localized versions in {language_list} that preserve the meaning,
         print("✓ Successfully processed localizations")
         return localization
         
+    except RequestCancelled:
+        raise
     except Exception as e:
         print(f"✗ Error processing localization: {str(e)}")
         return {
             "english": english_text,
             "turkish": f"Error: {str(e)}",
             "french": f"Error: {str(e)}",
-            "german": f"Error: {str(e)}"
+            "german": f"Error: {str(e)}",
+            **cached_localization
         }
 
+def parse_group_response(response_text, locids, lang_names):
+    """
+    Parse the JSON answer of a grouped localization request.
+    Returns {LOCID: {lang_name: text}} for every LOCID with at least one usable
+    translation; missing LOCIDs and languages are left out.
+    """
+    data = parse_json_object(response_text)
+    if data is None:
+        return {}
+    
+    parsed = {}
+    for locid in locids:
+        entry = data.get(locid)
+        if not isinstance(entry, dict):
+            continue
+        # Accept "turkish", "Turkish" or "TURKISH" as language keys
+        entry = {str(key).lower(): value for key, value in entry.items()}
+        translations = {}
+        for lang_name in lang_names:
+            value = entry.get(lang_name)
+            text = clean_translation_text(value) if isinstance(value, str) else ""
+            if text:
+                translations[lang_name] = text
+        if translations:
+            parsed[locid] = translations
+    return parsed
+
+def process_group_localization(description, rows, model="grok3", languages=None, debug=False, char_lookup=None, api_key=None, custom_prompt=None, rate_limiter=None, cache=None,
+                               cancel_event=None, max_reasks=MAX_REASKS, reask_stats=None):
+    """
+    Localize all rows of one image group with a single request.
+    Returns {LOCID: localization} where each localization has the same shape as
+    process_localization's result. Languages the grouped answer does not cover
+    are asked for with a per-row process_localization call instead, keeping
+    the translations it did cover.
+    """
+    # Default languages if none specified
+    if languages is None:
+        languages = ["TR", "FR", "DE"]
+    
+    def localize_text(english_text, lang_codes):
+        return process_localization(description, english_text, model, lang_codes, debug, char_lookup, api_key, custom_prompt, rate_limiter=rate_limiter, cache=cache,
+                                    cancel_event=cancel_event, max_reasks=max_reasks, reask_stats=reask_stats)
+    
+    # Nothing to gain from grouping a single row or from mock translations
+    if debug or len(rows) < 2:
+        return {row['LOCID']: localize_text(row['EN'], languages) for row in rows}
+    
+    model_id = MODEL_IDS.get(model, "x-ai/grok-3")
+    lang_names = [LANGUAGE_NAMES.get(lang_code.upper(), "").lower() for lang_code in languages]
+    lang_names = [lang_name for lang_name in lang_names if lang_name]
+    
+    # Rows whose translations are all cached don't need to be sent again
+    localizations = {}
+    cache_keys = {}
+    if cache:
+        pending_rows = []
+        for row in rows:
+            cached, missing_keys = lookup_cached_translations(cache, row['EN'], description, model_id, lang_names, custom_prompt)
+            if missing_keys:
+                cache_keys[row['LOCID']] = missing_keys
+                pending_rows.append(row)
+            else:
+                localization = {"english": row['EN']}
+                for lang_name, text in cached.items():
+                    if char_lookup:
+                        text = replace_character_names(text, lang_name, char_lookup)
+                    localization[lang_name] = text
+                localizations[row['LOCID']] = localization
+        if localizations:
+            print(f"  {len(localizations)}/{len(rows)} texts served from cache")
+        if len(pending_rows) < 2:
+            for row in pending_rows:
+                localizations[row['LOCID']] = localize_text(row['EN'], languages)
+            return localizations
+        rows = pending_rows
+    
+    locids = [row['LOCID'] for row in rows]
+    print(f"\n🔄 Processing grouped localization for {len(rows)} texts using {model_id}")
+    print(f"  Selected languages: {', '.join(languages)}")
+    
+    system_prompt = build_system_prompt(description, languages, custom_prompt, grouped=True)
+    texts = {row['LOCID']: row['EN'] for row in rows}
+    language_list = ', '.join(lang_name.title() for lang_name in lang_names)
+    user_prompt = f"""
+English Texts (JSON keyed by LOCID):
+{json.dumps(texts, ensure_ascii=False, indent=2)}
+
+Please provide localized versions in {language_list} that preserve the meaning, humor, and game mechanic while being culturally appropriate.
+Answer with a JSON object keyed by the LOCIDs above; use the lowercase language names as keys inside each entry.
+"""
+    # Leave room for every translation in the answer
+    max_tokens = min(4096, 256 + 128 * len(rows) * len(lang_names))
+    
+    parsed = {}
+    try:
+        response_text = request_completion(system_prompt, user_prompt, model_id, api_key, max_tokens=max_tokens, rate_limiter=rate_limiter, cancel_event=cancel_event,
+                                           response_format=JSON_RESPONSE_FORMAT)
+        parsed = parse_group_response(response_text, locids, lang_names)
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        print(f"✗ Error processing grouped localization: {str(e)}")
+    
+    complete = 0
+    for row in rows:
+        locid = row['LOCID']
+        missing = [lang_code for lang_code in languages
+                   if LANGUAGE_NAMES.get(lang_code.upper()) and LANGUAGE_NAMES[lang_code.upper()] not in parsed.get(locid, {})]
+        if locid in parsed:
+            localization = {"english": row['EN']}
+            for lang_name, text in parsed[locid].items():
+                # Remember the translation before character names are localized
+                if lang_name in cache_keys.get(locid, {}):
+                    cache.put(cache_keys[locid][lang_name], lang_name, text)
+                # Apply character name replacements if character lookup is provided
+                if char_lookup:
+                    text = replace_character_names(text, lang_name, char_lookup)
+                localization[lang_name] = text
+            localizations[locid] = localization
+        if not missing:
+            complete += 1
+            continue
+        # Fall back to a single-row request for whatever the grouped answer missed
+        print(f"Warning: Grouped response had no usable {', '.join(missing)} translation for {locid}, retrying it on its own")
+        localizations[locid] = {**localize_text(row['EN'], missing), **localizations.get(locid, {})}
+    
+    print(f"✓ Grouped request covered {complete}/{len(rows)} texts")
+    return localizations
+
 def read_csv_file(csv_file):
-    """Read CSV file and return rows"""
-    rows = []
+    """
+    Open a localization CSV and return a CsvSource that streams its rows,
+    or None if the file cannot be read. The separator and encoding are
+    detected from the start of the file; columns are matched case-insensitively.
+    """
     try:
-        with open(csv_file, 'r', encoding='utf-8-sig') as file:
-            reader = csv.reader(file, delimiter=';')
-            headers = next(reader)
+        source = CsvSource(csv_file)
+        print(f"✓ Successfully opened CSV file: {csv_file}")
+        print(f"  Separator: {source.delimiter!r}, encoding: {source.encoding}")
+        return source
+    except Exception as e:
+        print(f"✗ Error reading CSV file: {str(e)}")
+        return None
+
+def describe_image_group(image_id, images_dir, api_key=None, debug=False, skip_images=False, rate_limiter=None, description_cache=None, refresh_description=False,
+                         image_options=None, image_index=None, cancel_event=None):
+    """Resolve the image for an image ID and build the metadata part of its result"""
+    # If skip_images is True or no images_dir was provided
+    if skip_images or not images_dir:
+        description = "ENTERED IMAGE FOLDER NOT SHOWN"
+        filename = f"{image_id}.unknown"
+        ocr_text = "[OCR text not available - no image directory specified]"
+        print("⚠️ Skipping image processing, no valid images directory provided.")
+    else:
+        # Find image file in directory
+        image_path = find_image_by_id(images_dir, image_id, image_index)
+        if image_path:
+            print(f"✓ Found image at: {image_path}")
+            filename = os.path.basename(image_path)
             
-            # Check if the CSV has the required columns
-            required_columns = ['IDS', 'EN', 'LOCID']
-            if not all(col in headers for col in required_columns):
-                raise ValueError(f"CSV file must have columns: {required_columns}")
+            # Drop the cached description if a fresh one was requested for this ID
+            if refresh_description and description_cache:
+                removed = description_cache.invalidate(image_path)
+                print(f"✓ Invalidated {removed} cached description(s) for {filename}")
             
-            # Get column indices
-            ids_idx = headers.index('IDS')
-            en_idx = headers.index('EN')
-            locid_idx = headers.index('LOCID')
+            # Get image description
+            try:
+                # Fixed function call to match the function signature
+                description = get_image_description(image_path, api_key, debug, rate_limiter=rate_limiter, description_cache=description_cache,
+                                                   image_options=image_options, cancel_event=cancel_event)
+                print(f"📝 Image description: {description[:100]}...")
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                print(f"✗ Error getting image description: {str(e)}")
+                description = f"ERROR GETTING IMAGE DESCRIPTION: {str(e)}"
             
-            for row in reader:
-                if len(row) >= max(ids_idx, en_idx, locid_idx) + 1:
-                    # Create a simple dict with just the required fields
-                    row_dict = {
-                        'IDS': row[ids_idx],
-                        'EN': row[en_idx],
-                        'LOCID': row[locid_idx]
-                    }
-                    rows.append(row_dict)
+            # We're deliberately skipping actual OCR to avoid dependency issues
+            # In a production environment, you'd replace this with a working OCR solution
+            ocr_text = "[OCR functionality disabled to avoid dependency issues]"
+        else:
+            print(f"✗ Could not find image for ID: {image_id}")
+            description = "IMAGE NOT FOUND"
+            filename = f"{image_id}.unknown"
+            ocr_text = "[OCR text not available - image not found]"
+    
+    return {
+        "filename": filename,
+        "description": description,
+        "OCR_EN": ocr_text
+    }
+
+def localize_row(row, description, model="grok3", languages=None, debug=False, char_lookup=None, api_key=None, custom_prompt=None, rate_limiter=None, cache=None,
+                 cancel_event=None, max_reasks=MAX_REASKS, reask_stats=None):
+    """Localize a single CSV row and return its LOCID together with the result entry"""
+    if languages is None:
+        languages = ["TR", "FR", "DE"]
+    
+    # Process localization for this text
+    localization = process_localization(description, row['EN'], model, languages, debug, char_lookup, api_key, custom_prompt, rate_limiter=rate_limiter, cache=cache,
+                                        cancel_event=cancel_event, max_reasks=max_reasks, reask_stats=reask_stats)
+    return row['LOCID'], build_result_entry(row['EN'], localization, languages)
+
+def build_result_entry(english_text, localization, languages):
+    """Turn a localization dict into the per-LOCID entry stored in the results"""
+    # Add localization to the result
+    result_entry = {"EN": english_text}
+    
+    # Add all requested languages to the result
+    for lang_code in languages:
+        lang_name = LANGUAGE_NAMES.get(lang_code.upper(), "").lower()
+        if lang_name and lang_name in localization:
+            result_entry[lang_name] = localization[lang_name]
+        elif lang_name:
+            result_entry[lang_name] = f"[No translation available for {lang_name}]"
+    
+    return result_entry
+
+def wait_unless_cancelled(futures, cancel_event=None):
+    """Wait until all futures are done; returns False instead as soon as cancel_event is set"""
+    if cancel_event is None:
+        wait_futures(futures)
+        return True
+    while True:
+        _, not_done = wait_futures(futures, timeout=CANCEL_POLL_SECONDS)
+        if not not_done:
+            return True
+        if cancel_event.is_set():
+            return False
+
+def run_localization_pipeline(image_groups, describe, translate, max_workers=1, grouped=False, lookahead=None, cancel_event=None):
+    """
+    Run image descriptions and translations as a two-stage pipeline.
+    
+    image_groups is an iterable of (image_id, rows). A producer thread submits
+    describe(image_id) for upcoming image IDs while translate(rows, description)
+    tasks of earlier IDs are still running; translate returns a list of
+    (LOCID, result entry) pairs for the rows it was given (all rows of the group
+    at once with grouped=True, otherwise one row per task). Both stages use
+    bounded queues of `lookahead` image IDs, so the vision stage never runs
+    far ahead and only a bounded number of groups is held in memory.
+    
+    Yields the finished image results in input order. Once cancel_event is set
+    no new work is started, groups that are already finished are still yielded
+    and the pipeline returns without waiting for requests still in flight.
+    """
+    lookahead = lookahead or max(2, max_workers)
+    described = queue.Queue(maxsize=lookahead)
+    stop = threading.Event()
+    
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+    
+    vision_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vision")
+    translation_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
+    
+    def put(item):
+        """Queue an item for the consumer; gives up once it stopped or the job was cancelled"""
+        while not stop.is_set() and not cancelled():
+            try:
+                described.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for image_id, rows in image_groups:
+                if stop.is_set() or cancelled():
+                    return
+                # Blocks while the translation stage is `lookahead` groups behind
+                if not put((image_id, rows, vision_executor.submit(describe, image_id))):
+                    return
+        except Exception as e:
+            # Hand errors from reading the groups to the consumer
+            put(e)
+            return
+        put(None)
+    
+    producer = threading.Thread(target=produce, name="vision-producer", daemon=True)
+    producer.start()
+    
+    def finish(image_result, futures):
+        for future in futures:
+            for locid, result_entry in future.result():
+                # Add the entry to the image result
+                image_result[locid] = result_entry
+        return image_result
+    
+    pending = deque()
+    try:
+        while not cancelled():
+            try:
+                item = described.get(timeout=CANCEL_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            image_id, rows, description_future = item
+            if not wait_unless_cancelled([description_future], cancel_event):
+                break
+            image_result = description_future.result()
+            
+            batches = [rows] if grouped else [[row] for row in rows]
+            futures = [translation_executor.submit(translate, batch, image_result["description"]) for batch in batches]
+            pending.append((image_result, futures))
+            
+            # Emit finished groups in order and keep at most `lookahead` groups in flight
+            while pending and (len(pending) > lookahead or all(future.done() for future in pending[0][1])):
+                if not wait_unless_cancelled(pending[0][1], cancel_event):
+                    break
+                yield finish(*pending.popleft())
         
-        print(f"✓ Successfully read CSV file: {csv_file}")
-        print(f"  Rows: {len(rows)}")
-        return rows
-    except Exception as e:
-        print(f"✗ Error reading CSV file: {str(e)}")
-        return []
+        # After a cancellation this only yields the groups that already finished
+        while pending and wait_unless_cancelled(pending[0][1], cancel_event):
+            yield finish(*pending.popleft())
+    except RequestCancelled:
+        # A task noticed the cancellation first; the groups before it were already yielded
+        return
+    finally:
+        stop.set()
+        for _, futures in pending:
+            for future in futures:
+                future.cancel()
+        # Requests still in flight finish in the background; their results are dropped
+        vision_executor.shutdown(wait=not cancelled(), cancel_futures=True)
+        translation_executor.shutdown(wait=not cancelled(), cancel_futures=True)
+
+def normalize_text(text):
+    """English text as compared for deduplication: surrounding and repeated whitespace removed"""
+    return " ".join(text.split())
+
+# Result of a deduplication future whose owner failed; the rows waiting for it claim the text again
+_RECLAIM = object()
+
+class TranslationDeduper:
+    """
+    Translates each distinct text of a job once and fans the result out to
+    every row that has it.
+    
+    The first row with a key sends the request; rows with the same key that
+    arrive while it is in flight wait for its future instead of sending their
+    own, and later rows reuse the finished entry. If that request fails, or
+    returns an entry with an error or a missing language, the entry is not
+    reused: the waiting rows claim the text again and one of them translates
+    it. The key
+    is the normalized English text, the requested languages and, with
+    scope="description", the image description.
+    """
+    
+    def __init__(self, scope=DEFAULT_DEDUPE_SCOPE, max_entries=DEDUPE_MAX_ENTRIES):
+        if scope not in DEDUPE_SCOPES:
+            raise ValueError(f"Unknown dedupe scope: {scope} (expected one of {', '.join(DEDUPE_SCOPES)})")
+        self.scope = scope
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._futures = OrderedDict()
+        self._rows = 0
+        self._saved = 0
+    
+    def key(self, english_text, description, languages):
+        context = description if self.scope == "description" else None
+        return normalize_text(english_text), context, tuple(languages)
+    
+    def _claim(self, key, count=True):
+        """Return (future, owner) for a key; the owner has to translate it and set the future"""
+        with self._lock:
+            if count:
+                self._rows += 1
+            future = self._futures.get(key)
+            if future is not None:
+                self._futures.move_to_end(key)
+                return future, False
+            future = Future()
+            self._futures[key] = future
+            # Drop the oldest finished translations; ones still in flight are kept
+            while len(self._futures) > self.max_entries:
+                oldest_key, oldest = next(iter(self._futures.items()))
+                if not oldest.done():
+                    break
+                del self._futures[oldest_key]
+            return future, True
+    
+    def _release(self, claims):
+        """Give up the given claims after a failed request; rows waiting for them claim the texts again"""
+        with self._lock:
+            for key, future in claims:
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+        for _, future in claims:
+            future.set_result(_RECLAIM)
+    
+    def translate_rows(self, rows, description, languages, translate, cancel_event=None):
+        """
+        Return [(LOCID, result entry)] for rows like translate(rows, description, languages),
+        but only pass it the rows whose text is neither finished nor in flight.
+        """
+        return self._translate_rows(rows, description, languages, translate, cancel_event, count=True)
+    
+    def _translate_rows(self, rows, description, languages, translate, cancel_event, count):
+        claims = []
+        for row in rows:
+            key = self.key(row['EN'], description, languages)
+            claims.append((row, key) + self._claim(key, count))
+        
+        own_rows = [row for row, _, _, owner in claims if owner]
+        try:
+            entries = dict(translate(own_rows, description, languages)) if own_rows else {}
+        except BaseException:
+            # The error belongs to this task only; waiting rows translate their texts themselves
+            self._release([(key, future) for _, key, future, owner in claims if owner])
+            raise
+        # Only completed entries are shared; rows waiting for a failed one translate the text themselves
+        failed = []
+        for row, key, future, owner in claims:
+            if owner:
+                entry = entries[row['LOCID']]
+                if self._is_completed(entry):
+                    future.set_result(entry)
+                else:
+                    failed.append((key, future))
+        if failed:
+            self._release(failed)
+        
+        # Texts another task is still translating
+        waiting = [future for _, _, future, owner in claims if not owner]
+        if waiting and not wait_unless_cancelled(waiting, cancel_event):
+            raise RequestCancelled()
+        
+        # Texts whose owner failed are claimed again: translated here, or waited for if another row got there first
+        reclaimed_rows = [row for row, _, future, owner in claims if not owner and future.result() is _RECLAIM]
+        reclaimed = dict(self._translate_rows(reclaimed_rows, description, languages, translate, cancel_event, count=False)) if reclaimed_rows else {}
+        reused = sum(1 for _, _, future, owner in claims if not owner and future.result() is not _RECLAIM)
+        if reused:
+            with self._lock:
+                self._saved += reused
+        
+        results = []
+        for row, _, future, owner in claims:
+            if owner:
+                results.append((row['LOCID'], entries[row['LOCID']]))
+            elif future.result() is _RECLAIM:
+                results.append((row['LOCID'], reclaimed[row['LOCID']]))
+            else:
+                results.append((row['LOCID'], {**future.result(), "EN": row['EN']}))
+        return results
+    
+    @staticmethod
+    def _is_completed(entry):
+        """Whether every language of a result entry holds a finished translation"""
+        return all(is_completed_translation(text) for language, text in entry.items() if language != "EN")
+    
+    def stats(self):
+        """Rows seen, distinct texts translated and translation calls saved"""
+        with self._lock:
+            return {"rows": self._rows, "translated": self._rows - self._saved, "saved": self._saved}
 
-def process_csv_data(csv_data, images_dir, chars_file=None, model="grok3", languages=None, api_key=None, debug=False, skip_images=False, custom_prompt=None):
-    """Process CSV data and generate localization results"""
+def process_csv_data(csv_data, images_dir, chars_file=None, model="grok3", languages=None, api_key=None, debug=False, skip_images=False, custom_prompt=None, max_workers=1,
+                     requests_per_minute=None, tokens_per_minute=None, grouped=False, use_cache=True, cache_path=None,
+                     use_description_cache=True, description_cache_path=None, refresh_descriptions=None,
+                     image_max_edge=IMAGE_MAX_EDGE, image_format=IMAGE_FORMAT, image_quality=IMAGE_QUALITY,
+                     results_file=None, on_result=None, keep_results=True, checkpoint_file=None, resume=False, cancel_event=None,
+                     streaming=False, sorted_input=False, spill_dir=None, max_reasks=MAX_REASKS, dedupe=DEFAULT_DEDUPE_SCOPE):
+    """
+    Process CSV data and generate localization results
+    
+    Image descriptions and row translations run as a pipeline (see
+    run_localization_pipeline): upcoming image IDs are described while the
+    translations of earlier ones are in flight, with max_workers threads per
+    stage. Results are always returned in CSV order, one entry per image ID.
+    All API calls share the rate limiter of the API key, configured with the
+    requests_per_minute / tokens_per_minute budgets if given; the job takes
+    2 * max_workers of its slots so that both stages can run at once.
+    With grouped=True all rows of an image ID are translated with one request.
+    Translations are looked up in the on-disk translation cache (cache_path,
+    default output/translation_cache.sqlite) unless use_cache is False.
+    Image descriptions are cached the same way (description_cache_path); the
+    image IDs listed in refresh_descriptions get a fresh description.
+    Screenshots are downscaled to image_max_edge pixels and re-encoded as
+    image_format before upload (image_max_edge=0 sends the original files).
+    
+    Each finished image result is appended to results_file (JSON Lines) if given,
+    and on_result(image_id, image_result, completed, total) is called for it. With
+    keep_results=False the results are not collected in memory and the number
+    of image results is returned instead of the list.
+    
+    Finished groups are also recorded in checkpoint_file if given. With
+    resume=True the checkpoint is loaded first: image IDs whose rows are all
+    translated are restored without any API call, and for the others only the
+    (LOCID, language) pairs without a completed translation are redone.
+    
+    Setting cancel_event stops the job cooperatively: queued work is dropped,
+    requests still in flight are no longer waited for, and the image results
+    finished so far are written and returned as usual.
+    
+    By default all rows are grouped by image ID in memory first. With
+    streaming=True the groups are consumed lazily from the csv_data iterator
+    instead: as runs of consecutive rows if sorted_input is True, otherwise
+    through a temporary spill file in spill_dir (see SpilledGroups). Together
+    with keep_results=False memory use then stays bounded by the pipeline's
+    lookahead, whatever the size of the file. Each group's screenshot is sent
+    to the preprocessing process pool as the group is read, and with
+    sorted_input the total number of image IDs is unknown (on_result gets
+    total=None).
+    
+    A language that cannot be extracted from an answer is asked for again on
+    its own up to max_reasks times per text; the re-asks are summed up per
+    language at the end.
+    
+    Rows with the same English text are translated once and the result is
+    shared (see TranslationDeduper); dedupe is the scope ("description" or
+    "text") or None to send every row.
+    """
     # Default languages if none provided
     if languages is None:
         languages = ["TR", "FR", "DE"]
+    max_workers = max(1, int(max_workers or 1))
     # Load character data if a file is provided
     char_lookup = None
     if chars_file:
         char_lookup = load_character_data(chars_file)
     
     # Group rows by image ID
-    image_groups = {}
-    for row in csv_data:
-        image_id = row['IDS']
-        if image_id not in image_groups:
-            image_groups[image_id] = []
-        image_groups[image_id].append(row)
+    if streaming and sorted_input:
+        image_groups = iter_contiguous_groups(csv_data)
+        total = None
+    elif streaming:
+        image_groups = SpilledGroups(csv_data, spill_dir)
+        total = len(image_groups)
+        print(f"\n🗂️ Grouped {image_groups.row_count} rows into {total} image IDs via {image_groups.path}")
+    else:
+        image_groups = {}
+        for row in csv_data:
+            image_id = row['IDS']
+            if image_id not in image_groups:
+                image_groups[image_id] = []
+            image_groups[image_id].append(row)
+        total = len(image_groups)
     
-    results = []
+    deduper = TranslationDeduper(dedupe) if dedupe else None
+    if deduper and total is not None:
+        # Upper bound of what deduplication can save; the description scope can only share less
+        if isinstance(image_groups, dict):
+            row_count = sum(len(rows) for rows in image_groups.values())
+            distinct = len({normalize_text(row['EN']) for rows in image_groups.values() for row in rows})
+        else:
+            row_count = image_groups.row_count
+            distinct = image_groups.distinct_texts(normalize_text)
+        print(f"\n🧮 {row_count} rows hold {distinct} distinct English texts (dedupe scope: {dedupe})")
     
-    # Process each image ID
-    for image_id, rows in image_groups.items():
+    if max_workers > 1:
+        print(f"\n⚡ Concurrent mode: {max_workers} workers for {total or 'all'} image IDs")
+    
+    # Throttling is done by the shared rate limiter instead of fixed sleeps
+    rate_limiter = get_rate_limiter(api_key or DEFAULT_OPENROUTER_API_KEY)
+    rate_limiter.configure(requests_per_minute, tokens_per_minute)
+    
+    # The vision and translation stages each run max_workers requests at once
+    max_concurrency = 2 * max_workers
+    
+    # Keep-alive connection pool of the API key, sized to the number of concurrent requests
+    if not debug:
+        get_api_clients(api_key or DEFAULT_OPENROUTER_API_KEY, pool_size=max_concurrency)
+    
+    # Translation memory; mock translations in debug mode are never cached
+    cache = None
+    if use_cache and not debug:
+        # Hits and misses are counted per job; the cache itself is shared
+        cache = get_translation_cache(cache_path).job()
+        print(f"💾 Using translation cache: {cache.path}")
+    description_cache = None
+    if use_description_cache and not debug:
+        description_cache = get_description_cache(description_cache_path).job()
+        print(f"💾 Using image description cache: {description_cache.path}")
+    refresh_descriptions = set(refresh_descriptions or [])
+    reask_stats = ReaskStats()
+    
+    # Scan the images directory once and report problems before any API call is made
+    image_index = None
+    if images_dir and not skip_images:
+        image_index = build_image_index(images_dir)
+    if image_index is not None and total is not None:
+        image_ids = image_groups.image_ids() if streaming else image_groups.keys()
+        missing, duplicates = check_image_index(image_index, image_ids)
+        print(f"\n🖼️ Indexed images in {images_dir}: {total - len(missing)}/{total} image IDs have an image")
+        if missing:
+            print(f"⚠️ No image found for {len(missing)} ID(s): {', '.join(missing)}")
+        for image_id, paths in duplicates.items():
+            print(f"⚠️ {image_id} matches {len(paths)} images, using {os.path.basename(paths[0])}: {', '.join(os.path.basename(p) for p in paths)}")
+    
+    # Preprocess the screenshots in a process pool; the results are cached on disk
+    image_options = None
+    preprocess_pool = None
+    if image_max_edge and not debug and image_index is not None:
+        image_options = {"max_edge": image_max_edge, "image_format": image_format, "quality": image_quality}
+        if not streaming:
+            image_paths = [find_image_by_id(images_dir, image_id, image_index) for image_id in image_groups]
+            preprocess_images([image_path for image_path in image_paths if image_path], image_options)
+        else:
+            # Groups are not known up front; each one's screenshot is preprocessed as the group is read
+            preprocess_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    preprocessing = {}
+    
+    # Work already done by an earlier run of this job
+    checkpoint = JobCheckpoint(checkpoint_file, resume=resume) if checkpoint_file else None
+    if checkpoint and resume:
+        print(f"\n↩️ Resuming from checkpoint {checkpoint_file}: {checkpoint.image_count} image IDs, {checkpoint.done_count} translations already done")
+    
+    def missing_languages(row):
+        """Language codes of a row that still need a translation"""
+        previous = (checkpoint.previous_result(row['IDS']) or {}).get(row['LOCID']) if checkpoint else None
+        if not previous or previous.get("EN") != row['EN']:
+            # New row, or the English text changed since the checkpoint was written
+            return list(languages)
+        return [lang_code for lang_code in languages
+                if not checkpoint.is_done(row['IDS'], row['LOCID'], LANGUAGE_NAMES.get(lang_code.upper(), "").lower())]
+    
+    def describe(image_id):
+        preprocessed = preprocessing.pop(image_id, None)
+        if preprocessed is not None:
+            try:
+                # The processed file is in the image cache once this is done
+                preprocessed.result()
+            except Exception as e:
+                print(f"⚠️ Image preprocessing failed for {image_id}, processing it in the vision stage: {str(e)}")
+        previous = checkpoint.previous_result(image_id) if checkpoint else None
+        if previous and not str(previous.get("description", "")).startswith("Error:"):
+            # Reuse the description of the earlier run
+            return {key: previous[key] for key in ("filename", "description", "OCR_EN") if key in previous}
         print(f"\n📊 Processing image ID: {image_id}")
+        return describe_image_group(image_id, images_dir, api_key, debug, skip_images, rate_limiter=rate_limiter,
+                                    description_cache=description_cache, refresh_description=image_id in refresh_descriptions,
+                                    image_options=image_options, image_index=image_index, cancel_event=cancel_event)
+    
+    def request_rows(rows, description, row_languages):
+        if grouped:
+            localizations = process_group_localization(description, rows, model, row_languages, debug, char_lookup, api_key, custom_prompt, rate_limiter=rate_limiter, cache=cache,
+                                                       cancel_event=cancel_event, max_reasks=max_reasks, reask_stats=reask_stats)
+            return [(row['LOCID'], build_result_entry(row['EN'], localizations[row['LOCID']], row_languages)) for row in rows]
+        return [localize_row(row, description, model, row_languages, debug, char_lookup, api_key, custom_prompt, rate_limiter=rate_limiter, cache=cache,
+                             cancel_event=cancel_event, max_reasks=max_reasks, reask_stats=reask_stats)
+                for row in rows]
+    
+    def translate_rows(rows, description, row_languages):
+        if deduper:
+            return deduper.translate_rows(rows, description, row_languages, request_rows, cancel_event)
+        return request_rows(rows, description, row_languages)
+    
+    def translate(rows, description):
+        if not checkpoint:
+            return translate_rows(rows, description, languages)
         
-        # If skip_images is True or no images_dir was provided
-        if skip_images or not images_dir:
-            description = "ENTERED IMAGE FOLDER NOT SHOWN"
-            filename = f"{image_id}.unknown"
-            ocr_text = "[OCR text not available - no image directory specified]"
-            print("⚠️ Skipping image processing, no valid images directory provided.")
-        else:
-            # Find image file in directory
-            image_path = find_image_by_id(images_dir, image_id)
-            if image_path:
-                print(f"✓ Found image at: {image_path}")
-                filename = os.path.basename(image_path)
-                
-                # Get image description
-                try:
-                    # Fixed function call to match the function signature
-                    description = get_image_description(image_path, api_key, debug)
-                    print(f"📝 Image description: {description[:100]}...")
-                except Exception as e:
-                    print(f"✗ Error getting image description: {str(e)}")
-                    description = f"ERROR GETTING IMAGE DESCRIPTION: {str(e)}"
-                
-                # We're deliberately skipping actual OCR to avoid dependency issues
-                # In a production environment, you'd replace this with a working OCR solution
-                ocr_text = "[OCR functionality disabled to avoid dependency issues]"
-            else:
-                print(f"✗ Could not find image for ID: {image_id}")
-                description = "IMAGE NOT FOUND"
-                filename = f"{image_id}.unknown"
-                ocr_text = "[OCR text not available - image not found]"
-        
-        # Initialize the result object for this image
-        image_result = {
-            "filename": filename,
-            "description": description,
-            "OCR_EN": ocr_text
-        }
+        # Only translate the languages the checkpoint does not have yet
+        pending = {row['LOCID']: missing_languages(row) for row in rows}
+        todo_rows = [row for row in rows if pending[row['LOCID']]]
+        todo_languages = [lang_code for lang_code in languages if any(lang_code in pending[row['LOCID']] for row in todo_rows)]
+        new_entries = dict(translate_rows(todo_rows, description, todo_languages)) if todo_rows else {}
         
-        # Process each text item for this image
+        entries = []
         for row in rows:
-            locid = row['LOCID']
-            english_text = row['EN']
-            
-            # Process localization for this text
-            localization = process_localization(description, english_text, model, languages, debug, char_lookup, api_key, custom_prompt)
-            
-            # Add localization to the result
-            result_entry = {"EN": english_text}
-            
-            # Add all requested languages to the result
+            previous = (checkpoint.previous_result(row['IDS']) or {}).get(row['LOCID'], {})
+            new_entry = new_entries.get(row['LOCID'], {})
+            entry = {"EN": row['EN']}
             for lang_code in languages:
                 lang_name = LANGUAGE_NAMES.get(lang_code.upper(), "").lower()
-                if lang_name and lang_name in localization:
-                    result_entry[lang_name] = localization[lang_name]
+                if lang_code in pending[row['LOCID']]:
+                    entry[lang_name] = new_entry.get(lang_name, f"[No translation available for {lang_name}]")
                 elif lang_name:
-                    result_entry[lang_name] = f"[No translation available for {lang_name}]"
-            
-            # Add the entry to the image result
-            image_result[locid] = result_entry
-            
-            # Small delay to avoid rate limits
-            if not debug:
-                time.sleep(0.5)
-        
-        results.append(image_result)
+                    entry[lang_name] = previous[lang_name]
+            entries.append((row['LOCID'], entry))
+        return entries
+    
+    # IDs of the groups handed to the pipeline and not yet finished, in order (at most its lookahead)
+    submitted_ids = deque()
+    
+    def submitted_groups():
+        for image_id, rows in (image_groups.items() if isinstance(image_groups, dict) else image_groups):
+            submitted_ids.append(image_id)
+            if preprocess_pool:
+                image_path = find_image_by_id(images_dir, image_id, image_index)
+                if image_path:
+                    preprocessing[image_id] = preprocess_pool.submit(_preprocess_image_task, (image_path, image_options))
+            yield image_id, rows
     
-    return results
+    results = []
+    completed = 0
+    writer = JsonlWriter(results_file) if results_file else None
+    # Other jobs on the same API key keep their own concurrency cap while this one runs
+    rate_limiter.add_job(max_concurrency)
+    try:
+        pipeline = run_localization_pipeline(submitted_groups(), describe, translate, max_workers, grouped, cancel_event=cancel_event)
+        for image_result in pipeline:
+            image_id = submitted_ids.popleft()
+            completed += 1
+            if writer:
+                writer.write(image_result)
+            if checkpoint:
+                checkpoint.write(image_id, image_result)
+            if on_result:
+                on_result(image_id, image_result, completed, total)
+            if keep_results:
+                results.append(image_result)
+    finally:
+        rate_limiter.remove_job(max_concurrency)
+        if writer:
+            writer.close()
+        if checkpoint:
+            checkpoint.close()
+        if isinstance(image_groups, SpilledGroups):
+            image_groups.close()
+        if preprocess_pool:
+            preprocess_pool.shutdown(wait=False, cancel_futures=True)
+    
+    if cancel_event is not None and cancel_event.is_set():
+        print(f"\n🛑 Cancelled: kept the results of {completed} of {total or 'all'} image IDs")
+    
+    if not debug:
+        stats = rate_limiter.stats()
+        print(f"\n📈 API requests: {stats['requests']}, rate limited: {stats['rate_limited']}, final concurrency: {stats['concurrency_limit']}/{stats['max_concurrency']}")
+    if cache:
+        stats = cache.stats()
+        print(f"💾 Translation cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries")
+    if description_cache:
+        stats = description_cache.stats()
+        print(f"💾 Description cache: {stats['hits']} hits, {stats['misses']} vision calls needed")
+    if deduper:
+        stats = deduper.stats()
+        print(f"♻️ Deduplication: {stats['translated']} distinct texts translated for {stats['rows']} rows, {stats['saved']} translation calls saved")
+    for lang_name, stats in reask_stats.stats().items():
+        print(f"↻ {lang_name.title()}: {stats['reasks']} re-asks for {stats['texts']} texts, {stats['recovered']} recovered, {stats['failed']} still missing")
+    
+    return results if keep_results else completed
 
 def save_results_as_json(results, output_file):
     """Save results as JSON file"""
@@ -685,8 +1738,9 @@ def save_results_as_json(results, output_file):
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
+        # Written item by item so results can also be streamed from a JSONL file
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+            write_json_array(results, f)
         
         print(f"\n✓ Successfully saved JSON results to: {output_file}")
         return True
@@ -700,34 +1754,31 @@ def save_results_as_csv(results, output_file):
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        # Flatten the results structure for CSV
-        rows = []
         headers = ["filename", "image_id", "locid", "english", "turkish", "french", "german"]
         
-        for result in results:
-            filename = result["filename"]
-            # Extract ID from filename (assuming format like BT4_Level4_ID1.png)
-            match = re.search(r"ID(\d+)", filename)
-            image_id = match.group(1) if match else ""
-            
-            # Add entries for each localization key (LEVEL_TEXT_1, HINT_1_1, etc.)
-            for key, value in result.items():
-                if key not in ["filename", "description", "OCR_EN"]:
-                    rows.append([
-                        filename,
-                        image_id,
-                        key,
-                        value["EN"],
-                        value["turkish"],
-                        value["french"],
-                        value["german"]
-                    ])
-        
         with open(output_file, 'w', encoding='utf-8', newline='') as f:
             writer = csv.writer(f, delimiter=';')
             writer.writerow(headers)
-            for row in rows:
-                writer.writerow(row)
+            
+            # Flatten the results structure for CSV, one result at a time
+            for result in results:
+                filename = result["filename"]
+                # Extract ID from filename (assuming format like BT4_Level4_ID1.png)
+                match = re.search(r"ID(\d+)", filename)
+                image_id = match.group(1) if match else ""
+                
+                # Add entries for each localization key (LEVEL_TEXT_1, HINT_1_1, etc.)
+                for key, value in result.items():
+                    if key not in ["filename", "description", "OCR_EN"]:
+                        writer.writerow([
+                            filename,
+                            image_id,
+                            key,
+                            value["EN"],
+                            value["turkish"],
+                            value["french"],
+                            value["german"]
+                        ])
         
         print(f"\n✓ Successfully saved CSV results to: {output_file}")
         return True
@@ -735,10 +1786,35 @@ def save_results_as_csv(results, output_file):
         print(f"\n✗ Error saving CSV results: {str(e)}")
         return False
 
-def process_localization_csv(csv_file, images_dir, output_dir, chars_file=None, model="grok3", debug=False):
-    """Process localization from CSV file"""
+def install_cancel_handler(cancel_event):
+    """
+    Make Ctrl+C cancel the run cooperatively by setting cancel_event; a second
+    Ctrl+C aborts immediately. Returns the previous SIGINT handler, or None when
+    not called from the main thread (where signal handlers cannot be installed).
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    
+    def handle_sigint(signum, frame):
+        if cancel_event.is_set():
+            raise KeyboardInterrupt
+        cancel_event.set()
+        print("\n🛑 Cancelling... finished results will be saved (press Ctrl+C again to abort immediately)")
+    
+    return signal.signal(signal.SIGINT, handle_sigint)
+
+def process_localization_csv(csv_file, images_dir, output_dir, chars_file=None, model="grok3", debug=False, max_workers=1,
+                             requests_per_minute=None, tokens_per_minute=None, grouped=False, use_cache=True,
+                             use_description_cache=True, refresh_descriptions=None,
+                             image_max_edge=IMAGE_MAX_EDGE, image_format=IMAGE_FORMAT, image_quality=IMAGE_QUALITY, resume=False,
+                             streaming=False, sorted_input=False, max_reasks=MAX_REASKS, dedupe=DEFAULT_DEDUPE_SCOPE):
+    """
+    Process localization from CSV file (resume=True continues from the CSV's checkpoint in output_dir;
+    streaming=True groups the rows lazily so very large files are processed in bounded memory)
+    """
     print(f"\n🚀 Starting localization processing from CSV: {csv_file}")
     print(f"📊 Using model: {model} for translations")
+    print(f"⚙️ Workers: {max_workers}")
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
@@ -750,23 +1826,51 @@ def process_localization_csv(csv_file, images_dir, output_dir, chars_file=None,
         print("✗ No data to process. Exiting.")
         return False
     
-    # Process CSV data and get results
-    results = process_csv_data(csv_data, images_dir, chars_file, model, debug)
-    
-    if not results:
-        print("✗ No results were generated. Nothing to save.")
-        return False
-    
     # Generate timestamped output filenames
     timestamp = time.strftime("%Y%m%d-%H%M%S")
+    results_file = os.path.join(output_dir, f"localization_results_{timestamp}.jsonl")
     json_output = os.path.join(output_dir, f"localization_results_{timestamp}.json")
     csv_output = os.path.join(output_dir, f"localization_results_{timestamp}.csv")
     
-    # Save results as JSON and CSV
+    # One checkpoint per CSV file, so --resume picks up the last run of the same CSV
+    checkpoint_file = checkpoint_path(output_dir, csv_file)
+    if resume and not os.path.exists(checkpoint_file):
+        print(f"⚠️ No checkpoint found at {checkpoint_file}, starting from the beginning")
+    
+    # Ctrl+C stops the run but still saves what has been translated
+    cancel_event = threading.Event()
+    previous_handler = install_cancel_handler(cancel_event)
+    
+    # Process CSV data, appending each finished image ID to the JSONL file
+    print(f"📝 Streaming results to: {results_file}")
+    try:
+        result_count = process_csv_data(csv_data, images_dir, chars_file, model, debug=debug, max_workers=max_workers,
+                                        requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute, grouped=grouped,
+                                        use_cache=use_cache, cache_path=os.path.join(output_dir, TRANSLATION_CACHE_FILENAME),
+                                        use_description_cache=use_description_cache,
+                                        description_cache_path=os.path.join(output_dir, DESCRIPTION_CACHE_FILENAME),
+                                        refresh_descriptions=refresh_descriptions,
+                                        image_max_edge=image_max_edge, image_format=image_format, image_quality=image_quality,
+                                        results_file=results_file, keep_results=False, checkpoint_file=checkpoint_file, resume=resume,
+                                        cancel_event=cancel_event, streaming=streaming, sorted_input=sorted_input, spill_dir=output_dir,
+                                        max_reasks=max_reasks, dedupe=dedupe)
+    finally:
+        if previous_handler is not None:
+            signal.signal(signal.SIGINT, previous_handler)
+    
+    if not result_count:
+        print("✗ No results were generated. Nothing to save.")
+        return False
+    
+    # Save results as JSON and CSV, streamed from the JSONL file
+    results = JsonlResults(results_file)
     json_saved = save_results_as_json(results, json_output)
     csv_saved = save_results_as_csv(results, csv_output)
     
-    print("\n✅ Localization processing complete!")
+    if cancel_event.is_set():
+        print("\n🛑 Localization processing cancelled, partial results saved (use --resume to continue)")
+    else:
+        print("\n✅ Localization processing complete!")
     return json_saved and csv_saved
 
 def main():
@@ -779,6 +1883,23 @@ def main():
     parser.add_argument("--model", help="Translation model to use (grok3, gpt-4o, claude-3-7-sonnet, gemini-1.5-pro)", default="grok3", 
                         choices=["grok3", "gpt-4o", "claude-3-7-sonnet", "gemini-1.5-pro"])
     parser.add_argument("--debug", help="Run in debug mode without calling API", action="store_true")
+    parser.add_argument("--workers", help="Number of concurrent API requests (1 = sequential)", type=int, default=1)
+    parser.add_argument("--rpm", help="Requests per minute allowed for the API key", type=int, default=None)
+    parser.add_argument("--tpm", help="Tokens per minute allowed for the API key", type=int, default=None)
+    parser.add_argument("--grouped", help="Translate all rows of an image ID with a single request", action="store_true")
+    parser.add_argument("--no_cache", help="Bypass the translation cache and translate every text again", action="store_true")
+    parser.add_argument("--no_description_cache", help="Bypass the image description cache and describe every image again", action="store_true")
+    parser.add_argument("--refresh_descriptions", help="Image IDs (e.g. ID1 ID7) whose cached description should be replaced", nargs="+", default=None)
+    parser.add_argument("--image_max_edge", help="Downscale screenshots to this many pixels on the longest edge (0 = send originals)", type=int, default=IMAGE_MAX_EDGE)
+    parser.add_argument("--image_format", help="Format screenshots are re-encoded to before upload", default=IMAGE_FORMAT,
+                        choices=list(IMAGE_FORMATS.keys()), type=str.upper)
+    parser.add_argument("--image_quality", help="JPEG/WebP quality used when re-encoding screenshots", type=int, default=IMAGE_QUALITY)
+    parser.add_argument("--resume", help="Continue the last run of this CSV from its checkpoint, skipping finished translations", action="store_true")
+    parser.add_argument("--streaming", help="Group rows lazily instead of in memory, for very large CSV files", action="store_true")
+    parser.add_argument("--sorted_input", help="With --streaming: the CSV is sorted by IDS, so groups are read as consecutive rows without a spill file", action="store_true")
+    parser.add_argument("--dedupe", help="Translate repeated English texts once: within the same image description, across the whole file, or off",
+                        choices=DEDUPE_SCOPES + ("off",), default=DEFAULT_DEDUPE_SCOPE)
+    parser.add_argument("--max_reasks", help="Extra requests per text for languages missing from the answer (0 = none)", type=int, default=MAX_REASKS)
     
     # Parse arguments
     args = parser.parse_args()
@@ -790,7 +1911,22 @@ def main():
         args.output_dir, 
         args.chars_file, 
         args.model,
-        args.debug
+        args.debug,
+        args.workers,
+        args.rpm,
+        args.tpm,
+        args.grouped,
+        not args.no_cache,
+        not args.no_description_cache,
+        args.refresh_descriptions,
+        args.image_max_edge,
+        args.image_format,
+        args.image_quality,
+        args.resume,
+        args.streaming,
+        args.sorted_input,
+        args.max_reasks,
+        None if args.dedupe == "off" else args.dedupe
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+import os
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Default budgets, can be overridden with environment variables or CLI flags
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("OPENROUTER_RPM", "120"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("OPENROUTER_TPM", "200000"))
+
+# How many times a single request is retried after a 429 before giving up
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Wait used after a 429 that came without any Retry-After information
+DEFAULT_BACKOFF_SECONDS = 5.0
+MAX_BACKOFF_SECONDS = 120.0
+
+# How often waiting requests check whether their job was cancelled
+CANCEL_POLL_SECONDS = 0.25
+
+
+class RateLimitExceeded(Exception):
+    """Raised by a request function when the provider answered with HTTP 429"""
+
+    def __init__(self, retry_after=None, message="Rate limit exceeded"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestCancelled(Exception):
+    """Raised instead of sending a request once the job it belongs to was cancelled"""
+
+    def __init__(self, message="Request cancelled"):
+        super().__init__(message)
+
+
+def check_cancelled(cancel_event):
+    """Raise RequestCancelled if cancel_event is set"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise RequestCancelled()
+
+
+def cancellable_sleep(seconds, cancel_event=None):
+    """time.sleep() that returns early and raises RequestCancelled once cancel_event is set"""
+    if cancel_event is None:
+        time.sleep(seconds)
+        return
+    cancel_event.wait(seconds)
+    check_cancelled(cancel_event)
+
+
+def parse_retry_after(headers):
+    """
+    Read the wait time in seconds from rate limit response headers.
+    Supports Retry-After (seconds or HTTP date), retry-after-ms and
+    X-RateLimit-Reset (epoch milliseconds, as sent by OpenRouter).
+    Returns None if the headers do not say how long to wait.
+    """
+    if not headers:
+        return None
+
+    try:
+        value = headers.get("retry-after-ms")
+        if value:
+            return max(0.0, float(value) / 1000.0)
+    except (TypeError, ValueError):
+        pass
+
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            try:
+                retry_at = parsedate_to_datetime(value)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    value = headers.get("X-RateLimit-Reset") or headers.get("x-ratelimit-reset")
+    if value:
+        try:
+            reset = float(value)
+            # OpenRouter reports the reset time in milliseconds
+            if reset > 1e11:
+                reset /= 1000.0
+            return max(0.0, reset - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    return None
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token)"""
+    return len(text or "") // 4 + 1
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared request budget for one API key.
+
+    Combines a requests-per-minute and a tokens-per-minute token bucket with an
+    adaptive concurrency limit: every 429 halves the number of requests allowed
+    in flight and pauses new requests for the Retry-After period, and a run of
+    successful requests raises the limit again one step at a time.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE, max_concurrency=8):
+        self._condition = threading.Condition()
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency_limit = self.max_concurrency
+        self._default_max_concurrency = self.max_concurrency
+
+        # Concurrency caps of the jobs currently using this limiter
+        self._job_caps = []
+
+        # Start with full buckets so the first requests go out immediately
+        self._request_allowance = float(requests_per_minute)
+        self._token_allowance = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._success_streak = 0
+
+        # Statistics for reporting
+        self.total_requests = 0
+        self.rate_limited_count = 0
+
+    def configure(self, requests_per_minute=None, tokens_per_minute=None):
+        """Update the request and token budgets of an existing limiter"""
+        with self._condition:
+            if requests_per_minute:
+                self.requests_per_minute = requests_per_minute
+                self._request_allowance = min(self._request_allowance, float(requests_per_minute))
+            if tokens_per_minute:
+                self.tokens_per_minute = tokens_per_minute
+                self._token_allowance = min(self._token_allowance, float(tokens_per_minute))
+            self._condition.notify_all()
+
+    def _set_max_concurrency(self, max_concurrency):
+        self.max_concurrency = max(1, max_concurrency)
+        if self.rate_limited_count:
+            # Keep the lowered limit learned from earlier 429s
+            self.concurrency_limit = min(self.concurrency_limit, self.max_concurrency)
+        else:
+            self.concurrency_limit = self.max_concurrency
+        self._condition.notify_all()
+
+    def add_job(self, max_concurrency):
+        """
+        Register a job that sends up to max_concurrency requests at once.
+        While jobs are registered the limiter allows the largest cap among
+        them, so a job starting later never lowers the cap of one still running.
+        """
+        with self._condition:
+            self._job_caps.append(max(1, max_concurrency))
+            self._set_max_concurrency(max(self._job_caps))
+
+    def remove_job(self, max_concurrency):
+        """Unregister a job added with add_job()"""
+        with self._condition:
+            cap = max(1, max_concurrency)
+            if cap in self._job_caps:
+                self._job_caps.remove(cap)
+            self._set_max_concurrency(max(self._job_caps) if self._job_caps else self._default_max_concurrency)
+
+    @contextmanager
+    def job(self, max_concurrency):
+        """Context manager wrapping add_job() and remove_job()"""
+        self.add_job(max_concurrency)
+        try:
+            yield self
+        finally:
+            self.remove_job(max_concurrency)
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_allowance = min(float(self.requests_per_minute), self._request_allowance + elapsed * self.requests_per_minute / 60.0)
+        self._token_allowance = min(float(self.tokens_per_minute), self._token_allowance + elapsed * self.tokens_per_minute / 60.0)
+
+    def _wait_time(self, now, tokens):
+        """Seconds until a request of the given size may start (0 if it may start now)"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= self.concurrency_limit:
+            # Woken up by release()
+            return None
+        waits = [0.0]
+        if self._request_allowance < 1.0:
+            waits.append((1.0 - self._request_allowance) * 60.0 / self.requests_per_minute)
+        if self._token_allowance < tokens:
+            waits.append((tokens - self._token_allowance) * 60.0 / self.tokens_per_minute)
+        return max(waits)
+
+    def acquire(self, estimated_tokens=0, cancel_event=None):
+        """Block until a request of estimated_tokens may be sent (raises RequestCancelled if cancel_event is set meanwhile)"""
+        with self._condition:
+            # A single request can never need more than the whole per-minute budget
+            tokens = min(float(estimated_tokens), float(self.tokens_per_minute))
+            while True:
+                check_cancelled(cancel_event)
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now, tokens)
+                if wait == 0.0:
+                    break
+                if cancel_event is not None:
+                    # Wake up regularly to notice a cancellation
+                    wait = CANCEL_POLL_SECONDS if wait is None else min(wait, CANCEL_POLL_SECONDS)
+                self._condition.wait(timeout=wait)
+
+            self._request_allowance -= 1.0
+            self._token_allowance -= tokens
+            self._in_flight += 1
+            self.total_requests += 1
+
+    def release(self):
+        """Mark a request started with acquire() as finished"""
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, estimated_tokens=0, cancel_event=None):
+        """Context manager wrapping acquire() and release()"""
+        self.acquire(estimated_tokens, cancel_event)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_success(self):
+        """Grow the concurrency limit again after a run of successful requests"""
+        with self._condition:
+            self._success_streak += 1
+            if self.concurrency_limit < self.max_concurrency and self._success_streak >= self.concurrency_limit * 2:
+                self.concurrency_limit += 1
+                self._success_streak = 0
+                print(f"⚡ Rate limiter: concurrency raised to {self.concurrency_limit}")
+                self._condition.notify_all()
+
+    def record_rate_limit(self, retry_after=None):
+        """Shrink the concurrency limit and pause new requests after a 429"""
+        with self._condition:
+            self.rate_limited_count += 1
+            self._success_streak = 0
+            self.concurrency_limit = max(1, self.concurrency_limit // 2)
+
+            if retry_after is None:
+                retry_after = DEFAULT_BACKOFF_SECONDS
+            retry_after = min(retry_after, MAX_BACKOFF_SECONDS)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+            # Do not let the buckets burst again straight after the pause
+            self._request_allowance = min(self._request_allowance, 0.0)
+            print(f"⚠️ Rate limited (429): waiting {retry_after:.1f}s, concurrency lowered to {self.concurrency_limit}")
+
+    def stats(self):
+        """Return a snapshot of the limiter statistics"""
+        with self._condition:
+            return {
+                "requests": self.total_requests,
+                "rate_limited": self.rate_limited_count,
+                "concurrency_limit": self.concurrency_limit,
+                "max_concurrency": self.max_concurrency,
+            }
+
+
+def call_with_rate_limit(send, limiter, estimated_tokens=0, max_retries=MAX_RATE_LIMIT_RETRIES, cancel_event=None):
+    """
+    Call send() inside a limiter slot, retrying when it raises RateLimitExceeded.
+    Any other exception is passed through unchanged. Raises RequestCancelled
+    instead of waiting for or retrying a request once cancel_event is set.
+    """
+    attempt = 0
+    while True:
+        try:
+            with limiter.slot(estimated_tokens, cancel_event):
+                result = send()
+        except RateLimitExceeded as e:
+            limiter.record_rate_limit(e.retry_after)
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            print(f"Retrying rate limited request ({attempt}/{max_retries})")
+            continue
+
+        limiter.record_success()
+        return result
+
+
+# One limiter per API key, shared by every job using that key
+_RATE_LIMITERS = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(api_key=None):
+    """Return the shared limiter for an API key, creating it on first use"""
+    with _RATE_LIMITERS_LOCK:
+        limiter = _RATE_LIMITERS.get(api_key or "")
+        if limiter is None:
+            limiter = AdaptiveRateLimiter()
+            _RATE_LIMITERS[api_key or ""] = limiter
+        return limiter
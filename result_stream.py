@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Rows inserted per batch while a checkpoint is indexed on resume
+CHECKPOINT_BATCH_SIZE = 1000
+# Earlier results of a resumed checkpoint kept in memory for repeated lookups
+CHECKPOINT_RECENT_RESULTS = 64
+
+
+class JsonlWriter:
+    """
+    Append-only JSON Lines file for the results of a running job.
+
+    Every image result is written as one line and flushed straight away, so a
+    crash only loses the groups that were still in flight.
+    """
+
+    def __init__(self, path, mode='w'):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, mode, encoding='utf-8')
+        self.count = 0
+
+    def write(self, item):
+        self._file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_jsonl(path):
+    """Yield the items of a JSON Lines file, skipping a truncated last line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash while writing leaves at most one partial line at the end
+                print(f"⚠️ Skipping unreadable line in {path}")
+
+
+class JsonlResults:
+    """Re-iterable view of a JSON Lines result file (every iteration reads the file again)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        return iter_jsonl(self.path)
+
+
+def write_json_array(items, f, indent=2):
+    """
+    Write an iterable as a JSON array to an open text file, one item at a time.
+    The output is identical to json.dump(list(items), f, ensure_ascii=False, indent=indent).
+    """
+    padding = " " * indent
+    first = True
+    for item in items:
+        f.write("[\n" if first else ",\n")
+        first = False
+        text = json.dumps(item, ensure_ascii=False, indent=indent)
+        f.write(padding + text.replace("\n", "\n" + padding))
+    f.write("[]" if first else "\n]")
+
+
+def is_completed_translation(text):
+    """True if a result entry holds a real translation rather than an error placeholder"""
+    return bool(text) and not text.startswith(("Error:", "[No translation"))
+
+
+def checkpoint_path(output_dir, csv_file, job_key=None):
+    """
+    Path of the checkpoint of a CSV file: <stem>.checkpoint.jsonl, or
+    <stem>.<job_key>.checkpoint.jsonl when several jobs may run on CSVs with the same name
+    """
+    stem = os.path.splitext(os.path.basename(csv_file))[0]
+    if job_key:
+        stem = f"{stem}.{job_key}"
+    return os.path.join(output_dir, f"{stem}.checkpoint.jsonl")
+
+
+class JobCheckpoint:
+    """
+    Checkpoint of a job, stored as JSON Lines next to its results.
+
+    Each line holds the image ID and its finished result. The (IDS, LOCID,
+    language) triples that hold a completed translation are derived from it,
+    so a resumed job only redoes missing or failed work. With resume=False an
+    existing checkpoint is replaced; with resume=True it is loaded and extended.
+
+    On resume the earlier results are indexed by image ID in a temporary
+    SQLite file next to the checkpoint instead of a dict, so memory stays
+    bounded however large the checkpoint is; the last few results looked up
+    are kept in memory.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._conn = None
+        self._index_path = None
+        self._recent = OrderedDict()
+        # Earlier results are looked up from the vision and translation threads
+        self._lock = threading.Lock()
+        self._image_count = 0
+        self._done_count = 0
+        if resume and os.path.exists(path):
+            self._load(path)
+        self._writer = JsonlWriter(path, 'a' if resume else 'w')
+
+    def _load(self, path):
+        fd, self._index_path = tempfile.mkstemp(prefix='checkpoint_', suffix='.sqlite', dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+        self._conn = sqlite3.connect(self._index_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE results (ids TEXT PRIMARY KEY, result TEXT NOT NULL)")
+
+        batch = []
+        for item in iter_jsonl(path):
+            # A later line for the same image ID replaces the earlier one
+            batch.append((item["IDS"], json.dumps(item["result"], ensure_ascii=False)))
+            if len(batch) >= CHECKPOINT_BATCH_SIZE:
+                self._conn.executemany("INSERT OR REPLACE INTO results (ids, result) VALUES (?, ?)", batch)
+                batch = []
+        self._conn.executemany("INSERT OR REPLACE INTO results (ids, result) VALUES (?, ?)", batch)
+        self._conn.commit()
+
+        for (result,) in self._conn.execute("SELECT result FROM results"):
+            self._image_count += 1
+            self._done_count += len(self._completed(json.loads(result)))
+
+    @staticmethod
+    def _completed(result):
+        """(LOCID, language) pairs of a result that hold a completed translation"""
+        return [(locid, language)
+                for locid, entry in result.items() if isinstance(entry, dict)
+                for language, text in entry.items()
+                if language != "EN" and is_completed_translation(text)]
+
+    @property
+    def image_count(self):
+        """Number of image IDs loaded from an earlier run"""
+        return self._image_count
+
+    @property
+    def done_count(self):
+        """Number of completed (IDS, LOCID, language) triples"""
+        return self._done_count
+
+    def is_done(self, image_id, locid, language):
+        entry = (self.previous_result(image_id) or {}).get(locid)
+        return isinstance(entry, dict) and language != "EN" and is_completed_translation(entry.get(language))
+
+    def previous_result(self, image_id):
+        """The last recorded result of an image ID, or None"""
+        with self._lock:
+            if self._conn is None:
+                return None
+            if image_id in self._recent:
+                self._recent.move_to_end(image_id)
+                return self._recent[image_id]
+            row = self._conn.execute("SELECT result FROM results WHERE ids = ?", (image_id,)).fetchone()
+            result = json.loads(row[0]) if row else None
+            self._recent[image_id] = result
+            if len(self._recent) > CHECKPOINT_RECENT_RESULTS:
+                self._recent.popitem(last=False)
+            return result
+
+    def write(self, image_id, result):
+        # Only the state loaded on resume is kept, and that on disk, so long jobs stay bounded
+        self._writer.write({"IDS": image_id, "result": result})
+
+    def close(self):
+        self._writer.close()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        if self._index_path and os.path.exists(self._index_path):
+            os.remove(self._index_path)
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# Test script to verify the pooled per-key API clients
+
+from api_clients import close_api_clients, get_api_clients
+
+
+def test_api_clients_are_shared_per_key_and_pool_grows():
+    clients = get_api_clients("test-key", pool_size=2)
+    assert get_api_clients("test-key") is clients
+    assert get_api_clients("other-key") is not clients
+
+    get_api_clients("test-key", pool_size=32)
+    assert clients.session.get_adapter("https://openrouter.ai")._pool_maxsize == 32
+
+    close_api_clients()
+    assert get_api_clients("test-key") is not clients
+    close_api_clients()
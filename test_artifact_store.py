@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# Test script to verify the content-addressed artifact store for generated downloads
+
+from artifact_store import ArtifactStore
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    first = store.put_bytes(b'{"a": 1}', "output_1.json")
+    second = store.put_bytes(b'{"a": 1}', "output_2.json")
+    other = store.put_bytes(b'{"a": 2}', "output_3.json")
+
+    assert first == second != other
+    artifact = store.get(first)
+    # Re-storing the content keeps the name other links were handed out with
+    assert artifact["filename"] == "output_1.json"
+    assert artifact["mimetype"] == "application/json"
+    assert artifact["size"] == 8
+    with open(artifact["path"], "rb") as f:
+        assert f.read() == b'{"a": 1}'
+    assert not any(p.name for p in (tmp_path / "artifacts" / "tmp").iterdir())
+
+
+def test_put_file_moves_the_file(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    path = store.temp_path(".zip")
+    with open(path, "wb") as f:
+        f.write(b"PK")
+    artifact_id = store.put_file(path, "strings.zip")
+    assert store.get(artifact_id)["mimetype"] == "application/zip"
+    assert not (tmp_path / "artifacts" / "tmp" / path).exists()
+
+
+def test_unknown_or_invalid_ids_are_rejected(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    assert store.get("0" * 64) is None
+    assert store.get("../../etc/passwd") is None
+
+
+def test_artifacts_are_deleted_with_their_last_job(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    shared = store.put_bytes(b'{"a": 1}', "output_1.json", job_id="job-a")
+    store.put_bytes(b'{"a": 1}', "output_2.json", job_id="job-b")
+    own = store.put_bytes(b'{"a": 2}', "output_3.json", job_id="job-a")
+    path = store.get(own)["path"]
+
+    assert store.release(["job-a"]) == 1
+    assert store.get(own) is None
+    assert not (tmp_path / "artifacts" / path).exists()
+    # Still referenced by job-b
+    assert store.get(shared) is not None
+    assert store.job_ids(shared) == ["job-b"]
+    assert store.release(["job-b"]) == 1
+    assert store.get(shared) is None
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # Test script to verify that character replacements are working with example_chars.json
 
+import minimal_localization_tool
 from minimal_localization_tool import load_character_data, replace_character_names, process_localization
 import json
 import os
@@ -53,3 +54,36 @@ result = process_localization(
 
 print("\nFull localization result with character replacements:")
 print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+def test_variants_and_longest_names_are_replaced_in_one_pass():
+    tr = char_lookup["turkish"]
+    assert replace_character_names("Lilly and lillie met Granny Aimee.", "turkish", char_lookup) == \
+        f"{tr['Lily']} and {tr['Lily']} met {tr['Granny Amy']}."
+    # A localized name is never replaced again, even if it contains another name
+    assert replace_character_names("Lily", "german", {"german": {"Lily": "Lily Lilli", "Lilli": "X"}}) == "Lily Lilli"
+    assert replace_character_names("Lilyana", "turkish", char_lookup) == "Lilyana"
+
+
+def test_roster_headers_map_to_all_languages_and_are_cached(tmp_path):
+    assert set(char_lookup) == set(minimal_localization_tool.LANGUAGE_NAMES.values())
+    assert char_lookup["czech"]["Lily"] == "Mazaná Lucka"
+    assert char_lookup["chinese"]["Lily"] == "俏皮莉莉"
+    # Names are found next to text without word spacing
+    assert replace_character_names("Lilyが来た", "japanese", char_lookup) == "おしゃまなリリーが来た"
+
+    roster = tmp_path / "chars.json"
+    roster.write_text(json.dumps([{"EN": "Lily", "HU (magyar)": "Cseles Csenge"}]), encoding="utf-8")
+    first = load_character_data(str(roster))
+    assert load_character_data(str(roster)) is first
+    roster.write_text(json.dumps([{"EN": "Lily", "HU (magyar)": "Csenge", "TR": "Bediş"}]), encoding="utf-8")
+    os.utime(roster, ns=(0, 10**9))
+    second = load_character_data(str(roster))
+    assert second is not first
+    assert second["hungarian"]["Lily"] == "Csenge" and "turkish" in second
+
+
+def test_names_whose_lowercase_differs_from_case_folding_are_replaced():
+    # "İ".lower() is "i̇" (two code points), so the match cannot be looked up by its lowercase
+    tr = char_lookup["turkish"]
+    assert replace_character_names("LİLY nerede?", "turkish", char_lookup) == f"{tr['Lily']} nerede?"
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# Test script to verify CSV dialect/encoding detection, row streaming and lazy grouping
+
+import os
+import types
+import pytest
+from csv_ingest import CsvFormatError, CsvSource, SpilledGroups, iter_contiguous_groups, validate_csv_file
+
+ROWS = [
+    {"IDS": "ID1", "EN": "Tap on the biggest flower, then wait.", "LOCID": "LEVEL_TEXT_1"},
+    {"IDS": "ID1", "EN": "Drag out the Sun; behind Lily's head.", "LOCID": "HINT_1_1"},
+    {"IDS": "ID2", "EN": "Lets find Tricky Lily", "LOCID": "LEVEL_TEXT_2"},
+]
+
+
+def write_csv(tmp_path, text, encoding="utf-8", name="data.csv"):
+    path = tmp_path / name
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+@pytest.mark.parametrize("delimiter", [";", ",", "\t"])
+def test_delimiters_are_detected(tmp_path, delimiter):
+    lines = ["IDS" + delimiter + "EN" + delimiter + "LOCID"]
+    for row in ROWS:
+        text = row["EN"]
+        if delimiter in text:
+            text = '"' + text + '"'
+        lines.append(delimiter.join([row["IDS"], text, row["LOCID"]]))
+    source = CsvSource(write_csv(tmp_path, "\n".join(lines) + "\n"))
+    assert source.delimiter == delimiter
+    assert list(source) == ROWS
+
+
+def test_bom_extra_columns_and_case_insensitive_header(tmp_path):
+    text = "locid;ids;Notes;en\r\nLEVEL_TEXT_1;ID1;x;Hello\r\n\r\nshort\r\n"
+    source = CsvSource(write_csv(tmp_path, text, "utf-8-sig"))
+    assert source.encoding == "utf-8-sig"
+    assert list(source) == [{"IDS": "ID1", "EN": "Hello", "LOCID": "LEVEL_TEXT_1"}]
+    assert source.skipped_rows == 1
+
+
+def test_windows_1252_file(tmp_path):
+    source = CsvSource(write_csv(tmp_path, "IDS;EN;LOCID\nID1;Café time;TEXT_1\n", "cp1252"))
+    assert source.encoding == "cp1252"
+    assert next(iter(source))["EN"] == "Café time"
+
+
+def test_rows_are_streamed(tmp_path):
+    source = CsvSource(write_csv(tmp_path, "IDS;EN;LOCID\nID1;Hello;TEXT_1\n"))
+    assert isinstance(iter(source), types.GeneratorType)
+
+
+def test_missing_column_is_rejected(tmp_path):
+    path = write_csv(tmp_path, "IDS;TEXT;LOCID\nID1;Hello;TEXT_1\n")
+    with pytest.raises(CsvFormatError):
+        CsvSource(path)
+    assert validate_csv_file(path) == (False, "Missing required column: EN")
+    assert validate_csv_file(write_csv(tmp_path, "", name="empty.csv"))[0] is False
+
+
+def group_in_memory(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row["IDS"], []).append(row)
+    return list(groups.items())
+
+
+def test_contiguous_groups_of_sorted_rows():
+    groups = iter_contiguous_groups(iter(ROWS))
+    assert isinstance(groups, types.GeneratorType)
+    assert list(groups) == group_in_memory(ROWS)
+
+
+def test_spilled_groups_match_in_memory_grouping(tmp_path):
+    # Unsorted input: ID1 reappears after ID2
+    rows = ROWS + [{"IDS": "ID1", "EN": "Well done!", "LOCID": "END_1_1"}]
+    groups = SpilledGroups(iter(rows), str(tmp_path), batch_size=2)
+    assert len(groups) == 2 and groups.row_count == 4
+    assert list(groups.image_ids()) == ["ID1", "ID2"]
+    assert list(groups) == group_in_memory(rows)
+    assert groups.distinct_texts() == 4
+    assert groups.distinct_texts(lambda text: "same") == 1
+    groups.close()
+    assert not os.path.exists(groups.path)
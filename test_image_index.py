@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+# Test script to verify the prebuilt image ID index matches find_image_by_id
+
+from minimal_localization_tool import build_image_index, check_image_index, find_image_by_id
+
+
+def test_index_follows_find_image_by_id_naming_rule(tmp_path):
+    for name in ["BT4_Level4_ID1.png", "BT4_Level4_ID12.png", "ID2.png", "id2.JPG", "ID5.v2.png", "notes.txt"]:
+        (tmp_path / name).write_bytes(b"")
+    images_dir = str(tmp_path)
+    index = build_image_index(images_dir)
+
+    for image_id in ["ID1", "ID12", "ID2", "ID5", "ID3", "12"]:
+        assert find_image_by_id(images_dir, image_id, index) == find_image_by_id(images_dir, image_id)
+
+    missing, duplicates = check_image_index(index, ["ID1", "ID2", "ID3"])
+    assert missing == ["ID3"]
+    assert list(duplicates) == ["ID2"]
+    assert len(duplicates["ID2"]) == 2
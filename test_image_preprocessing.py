@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# Test script to verify screenshot preprocessing before vision uploads
+
+from PIL import Image
+from minimal_localization_tool import image_mime_type, preprocess_image, preprocess_images
+
+
+def make_screenshot(path, size=(2560, 1440)):
+    Image.new("RGBA", size, (30, 144, 255, 128)).save(path)
+    return str(path)
+
+
+def test_preprocess_downscales_and_reencodes(tmp_path):
+    source = make_screenshot(tmp_path / "BT4_Level4_ID1.png")
+    cache_dir = str(tmp_path / "image_cache")
+
+    processed = preprocess_image(source, max_edge=1024, image_format="JPEG", quality=80, cache_dir=cache_dir)
+    assert processed.endswith(".jpg")
+    assert image_mime_type(processed) == "image/jpeg"
+    with Image.open(processed) as image:
+        assert image.format == "JPEG"
+        assert max(image.size) == 1024
+
+    # Same image and settings are served from the cache directory
+    assert preprocess_image(source, max_edge=1024, image_format="JPEG", quality=80, cache_dir=cache_dir) == processed
+    webp = preprocess_image(source, max_edge=512, image_format="WEBP", cache_dir=cache_dir)
+    assert image_mime_type(webp) == "image/webp"
+
+
+def test_preprocess_images_in_process_pool(tmp_path):
+    sources = [make_screenshot(tmp_path / f"ID{i}.png", (1600, 900)) for i in range(3)]
+    options = {"max_edge": 800, "image_format": "JPEG", "quality": 85, "cache_dir": str(tmp_path / "cache")}
+    processed = preprocess_images(sources, options, max_workers=2)
+    assert set(processed) == set(sources)
+    for path in processed.values():
+        with Image.open(path) as image:
+            assert image.size == (800, 450)
+
+
+def test_streaming_preprocesses_each_group_in_the_pool(tmp_path, monkeypatch):
+    from concurrent.futures import Future
+    import minimal_localization_tool
+    from minimal_localization_tool import process_csv_data
+
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    for i in (1, 2):
+        make_screenshot(images_dir / f"BT4_Level4_ID{i}.png", (64, 64))
+    submitted = []
+
+    class RecordingPool:
+        def __init__(self, max_workers=None):
+            pass
+
+        def submit(self, fn, args):
+            submitted.append(args[0])
+            future = Future()
+            future.set_result(args[0])
+            return future
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    described = []
+    monkeypatch.setattr(minimal_localization_tool, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(minimal_localization_tool, "get_image_description",
+                        lambda image_path, *args, **kwargs: described.append(image_path) or "A screen")
+    monkeypatch.setattr(minimal_localization_tool, "process_localization",
+                        lambda description, english_text, *args, **kwargs: {"english": english_text, "turkish": english_text})
+    rows = [{"IDS": "ID2", "EN": "Two", "LOCID": "LEVEL_TEXT_2"}, {"IDS": "ID1", "EN": "One", "LOCID": "LEVEL_TEXT_1"}]
+    results = process_csv_data(iter(rows), str(images_dir), languages=["TR"], api_key="test-key", use_cache=False,
+                               use_description_cache=False, streaming=True, spill_dir=str(tmp_path))
+
+    assert [r["filename"] for r in results] == ["BT4_Level4_ID2.png", "BT4_Level4_ID1.png"]
+    # Every screenshot went through the pool before the vision stage described it
+    assert sorted(submitted) == sorted(described)
+    assert len(submitted) == 2
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# Test script to verify the background job manager
+
+import threading
+import time
+from job_manager import JobManager, JobQueueFull
+
+
+def wait_for(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_jobs_run_in_parallel_and_report_progress():
+    events = []
+    manager = JobManager(max_workers=2, emit=lambda event, data, room: events.append((room, event, data)))
+    barrier = threading.Barrier(2, timeout=2)
+
+    def target(job):
+        # Both jobs must be running at the same time to pass the barrier
+        barrier.wait()
+        job.emit("progress", {"completed": 1, "total": 1})
+        return {"status": "done"}
+
+    jobs = [manager.submit(target, {}) for _ in range(2)]
+    for job in jobs:
+        wait_for(job)
+    assert [job.state for job in jobs] == ["completed", "completed"]
+    assert manager.get(jobs[0].id).to_dict()["completed"] == 1
+    assert {room for room, _, _ in events} == {job.id for job in jobs}
+    manager.shutdown()
+
+
+def test_queue_is_bounded_and_queued_jobs_can_be_cancelled():
+    manager = JobManager(max_workers=1, max_queued=1)
+    release = threading.Event()
+    running = manager.submit(lambda job: release.wait(2) and None or "done", {})
+    while running.state == "queued":
+        time.sleep(0.01)
+    queued = manager.submit(lambda job: "never", {})
+    try:
+        manager.submit(lambda job: "rejected", {})
+        assert False, "queue should be full"
+    except JobQueueFull:
+        pass
+
+    assert manager.cancel(queued.id)
+    assert queued.state == "cancelled"
+    release.set()
+    wait_for(running)
+    assert running.state == "completed"
+    assert not manager.cancel(running.id)
+    manager.shutdown()
+
+
+def test_jobs_are_listed_for_their_owner():
+    manager = JobManager(max_workers=1)
+    mine = manager.submit(lambda job: "done", {}, owner="client-a")
+    theirs = manager.submit(lambda job: "done", {}, owner="client-b")
+    wait_for(mine)
+    wait_for(theirs)
+    assert [job["job_id"] for job in manager.list_jobs(owner="client-a")] == [mine.id]
+    assert len(manager.list_jobs()) == 2
+    manager.shutdown()
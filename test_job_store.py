@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# Test script to verify the per-job result store used by the web exports
+
+from job_store import JobResultStore
+
+RESULTS = [
+    ("ID1", {"filename": "ID1.png", "description": "A garden", "OCR_EN": "",
+             "LEVEL_TEXT_1": {"EN": "Tap the flower", "turkish": "Çiçeğe dokun", "french": "Touchez la fleur"},
+             "HINT_1_1": {"EN": "Look up", "turkish": "Yukarı bak", "french": "Regardez en haut"}}),
+    ("ID2", {"filename": "ID2.png", "description": "A room", "OCR_EN": "",
+             "LEVEL_TEXT_2": {"EN": "Find Lily", "turkish": "Lily'yi bul", "french": "Trouvez Lily"}}),
+]
+
+
+def make_store(tmp_path, **kwargs):
+    store = JobResultStore(str(tmp_path / "jobs.sqlite"), **kwargs)
+    store.create_job("job-a", {"TR": "turkish", "FR": "french"}, "20250101_000000_joba", owner="client-1")
+    for image_id, result in RESULTS:
+        store.add_result("job-a", image_id, result)
+    return store
+
+
+def test_results_are_kept_per_job_in_order(tmp_path):
+    store = make_store(tmp_path)
+    store.create_job("job-b", {"DE": "german"}, "20250101_000001_jobb", owner="client-2")
+    store.add_result("job-b", "ID9", {"filename": "ID9.png", "TEXT_9": {"EN": "Hi", "german": "Hallo"}})
+
+    assert list(store.results("job-a")) == [result for _, result in RESULTS]
+    assert list(store.iter_results("job-a", batch_size=1)) == [result for _, result in RESULTS]
+    assert store.get_job("job-a")["image_count"] == 2
+    assert store.get_job("job-a")["languages"] == {"TR": "turkish", "FR": "french"}
+    assert store.get_job("job-a")["owner"] == "client-1"
+    # Each client only finds its own jobs
+    assert store.latest_job_id("client-1") == "job-a"
+    assert store.latest_job_id("client-2") == "job-b"
+    assert store.latest_job_id("client-3") is None
+
+
+def test_query_filters_and_pages(tmp_path):
+    store = make_store(tmp_path)
+    items, total = store.query("job-a", language="turkish", limit=2)
+    assert total == 3
+    assert [item["text"] for item in items] == ["Çiçeğe dokun", "Yukarı bak"]
+
+    items, total = store.query("job-a", language="turkish", limit=2, offset=2)
+    assert [(item["IDS"], item["LOCID"]) for item in items] == [("ID2", "LEVEL_TEXT_2")]
+
+    items, total = store.query("job-a", image_id="ID1", locid="HINT_1_1")
+    assert total == 3
+    assert {item["language"]: item["text"] for item in items}["french"] == "Regardez en haut"
+
+
+def test_oldest_jobs_are_pruned(tmp_path):
+    deleted = []
+    store = make_store(tmp_path, max_jobs=2)
+    store.on_delete = deleted.extend
+    store.create_job("job-b", {}, "b")
+    store.create_job("job-c", {}, "c")
+    assert "job-a" in deleted
+    assert store.get_job("job-a") is None
+    assert store.query("job-a")[1] == 0
+    assert store.get_job("job-c") is not None
+
+
+def test_exports_are_invalidated_by_new_results(tmp_path):
+    store = make_store(tmp_path)
+    store.save_export("job-a", "zip:default:FR,TR", "a" * 64, 2)
+    assert store.get_export("job-a", "zip:default:FR,TR") == "a" * 64
+    assert store.get_export("job-a", "zip:stored:FR,TR") is None
+
+    store.add_result("job-a", "ID3", {"filename": "ID3.png", "TEXT_3": {"EN": "Hi", "turkish": "Selam"}})
+    assert store.get_export("job-a", "zip:default:FR,TR") is None
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# Test script to verify the single-pass strings_<lang>.json exporter
+
+import io
+import json
+import zipfile
+from language_export import LanguageExporter, format_export_key, write_language_zip
+
+results = [
+    {"filename": "ID1.png", "description": "A garden", "OCR_EN": "",
+     "LEVEL_TEXT_1": {"EN": "Tap the flower", "turkish": "Çiçeğe dokun", "french": "Error: timeout"},
+     "HINT_1_2": {"EN": "Look up", "turkish": "Yukarı bak", "french": "Regardez en haut"}},
+    {"filename": "ID2.png", "description": "A room", "OCR_EN": "",
+     "END_2_1": {"EN": "Well done", "turkish": "[No translation available for turkish]", "french": "Bravo"},
+     "SHOP_TITLE": {"EN": "Shop", "turkish": "Mağaza", "french": "Boutique"}},
+]
+
+
+def test_export_keys():
+    assert format_export_key("LEVEL_TEXT_3_1") == "question_3_1"
+    assert format_export_key("HINT_4") == "hint_4"
+    assert format_export_key("END_2_1") == "endText_2_1"
+    assert format_export_key("SHOP_TITLE") == "custom_SHOP_TITLE"
+    assert format_export_key("description") is None
+
+
+def test_all_languages_in_one_pass():
+    passes = []
+
+    class Results:
+        def __iter__(self):
+            passes.append(1)
+            return iter(results)
+
+    exports = LanguageExporter(["TR", "FR", "EN"]).export(Results())
+    assert len(passes) == 1
+    assert exports["TR"] == {"question_1": "Çiçeğe dokun", "hint_1_2": "Yukarı bak", "endText_2_1": "", "custom_SHOP_TITLE": "Mağaza"}
+    assert exports["FR"]["question_1"] == ""
+    assert exports["FR"]["endText_2_1"] == "Bravo"
+    assert exports["EN"]["hint_1_2"] == "Look up"
+
+
+def test_zip_holds_one_file_per_language():
+    output = io.BytesIO()
+    write_language_zip(results, {"TR": "turkish", "FR": "french"}, output)
+    with zipfile.ZipFile(output) as zf:
+        assert sorted(zf.namelist()) == ["strings_fr.json", "strings_tr.json"]
+        assert json.loads(zf.read("strings_fr.json"))["custom_SHOP_TITLE"] == "Boutique"
+
+
+def test_streamed_zip_matches_for_every_compression():
+    from language_export import ZIP_COMPRESSION, stream_language_zip
+
+    for compression in ZIP_COMPRESSION:
+        chunks = list(stream_language_zip(results, {"TR": "turkish", "FR": "french"}, compression))
+        # One chunk per language file plus the central directory
+        assert len(chunks) == 3
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+            assert zf.testzip() is None
+            assert json.loads(zf.read("strings_tr.json"))["question_1"] == "Çiçeğe dokun"
+            stored = zf.getinfo("strings_tr.json").compress_type == zipfile.ZIP_STORED
+            assert stored == (compression == "stored")
+
+
+def test_streamed_zip_walks_the_results_once_for_all_languages():
+    from language_export import stream_language_zip
+
+    passes = []
+
+    class Results:
+        def __iter__(self):
+            passes.append(1)
+            return iter(results)
+
+    chunks = list(stream_language_zip(Results(), {"TR": "turkish", "FR": "french", "DE": "german"}))
+    # One chunk per language file plus the central directory
+    assert len(chunks) == 4 and len(passes) == 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert json.loads(zf.read("strings_fr.json"))["endText_2_1"] == "Bravo"
+
+
+def test_export_cache_key_ignores_language_order():
+    from language_export import export_cache_key
+
+    assert export_cache_key(["TR", "fr"]) == export_cache_key({"FR": "french", "TR": "turkish"})
+    assert export_cache_key(["TR"], "stored") != export_cache_key(["TR"])
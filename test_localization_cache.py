@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# Test script to verify the translation cache used by process_localization
+
+import minimal_localization_tool
+from minimal_localization_tool import process_localization
+from localization_cache import TranslationCache
+
+
+def fake_completion_factory(calls):
+    def fake_completion(system_prompt, user_prompt, model_id, api_key=None, max_tokens=512, rate_limiter=None, cancel_event=None, response_format=None):
+        calls.append(system_prompt)
+        lines = []
+        if "Turkish" in system_prompt:
+            lines.append("Turkish: Güneş nerede?")
+        if "French" in system_prompt:
+            lines.append("French: Où est le soleil ?")
+        return "\n".join(lines)
+    return fake_completion
+
+
+def test_cache_hit_miss_and_eviction(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    key = cache.make_key("Where is the sun?", "desc", "model", "turkish", "prompt")
+    assert cache.get(key) is None
+    cache.put(key, "turkish", "Güneş nerede?")
+    assert cache.get(key) == "Güneş nerede?"
+    assert cache.make_key("Where is the sun?", "other desc", "model", "turkish", "prompt") != key
+
+    for i in range(20):
+        cache.put(cache.make_key(str(i), "", "", "turkish", ""), "turkish", str(i))
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["entries"] <= 10
+
+
+def test_jobs_report_their_own_cache_stats(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    key = cache.make_key("Where is the sun?", "desc", "model", "turkish", "prompt")
+    cache.put(key, "turkish", "Güneş nerede?")
+    first_job, second_job = cache.job(), cache.job()
+
+    assert first_job.get(key) == "Güneş nerede?"
+    assert second_job.get("unknown") is None
+    assert first_job.stats()["hits"] == 1 and first_job.stats()["misses"] == 0
+    assert second_job.stats()["hits"] == 0 and second_job.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["entries"] == 1
+
+    # A re-stored key is not counted twice
+    first_job.put(key, "turkish", "Güneş nerede ki?")
+    assert cache.stats()["entries"] == 1
+    cache.close()
+    assert TranslationCache(str(tmp_path / "cache.sqlite")).get(key) == "Güneş nerede ki?"
+
+
+def test_process_localization_only_requests_missing_languages(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(minimal_localization_tool, "request_completion", fake_completion_factory(calls))
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"))
+
+    first = process_localization("A sunny screen", "Where is the sun?", languages=["TR"], cache=cache)
+    assert first["turkish"] == "Güneş nerede?"
+
+    second = process_localization("A sunny screen", "Where is the sun?", languages=["TR", "FR"], cache=cache)
+    assert second["turkish"] == "Güneş nerede?"
+    assert second["french"] == "Où est le soleil ?"
+    # The second request only asked for French
+    assert "Turkish" not in calls[1]
+
+    third = process_localization("A sunny screen", "Where is the sun?", languages=["TR", "FR"], cache=cache)
+    assert third == second
+    assert len(calls) == 2
+
+
+class FakeVisionResponse:
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return {"choices": [{"message": {"content": "A cartoon sun hides behind a girl. The player must drag it out."}}]}
+
+
+def test_image_description_served_from_cache_until_invalidated(tmp_path, monkeypatch):
+    from localization_cache import DescriptionCache
+    from minimal_localization_tool import get_image_description
+
+    posts = []
+    monkeypatch.setattr(minimal_localization_tool.requests.Session, "post", lambda self, **kwargs: posts.append(kwargs) or FakeVisionResponse())
+    image_path = tmp_path / "BT1_ID1.png"
+    image_path.write_bytes(b"not really a png")
+    cache = DescriptionCache(str(tmp_path / "descriptions.sqlite"))
+
+    first = get_image_description(str(image_path), api_key="test-key", description_cache=cache)
+    second = get_image_description(str(image_path), api_key="test-key", description_cache=cache)
+    assert first == second
+    assert len(posts) == 1
+
+    assert cache.invalidate(str(image_path)) == 1
+    get_image_description(str(image_path), api_key="test-key", description_cache=cache)
+    assert len(posts) == 2
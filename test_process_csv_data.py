@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+# Test script to verify process_csv_data output in sequential and concurrent mode
+
+import json
+import threading
+import time
+import minimal_localization_tool
+from minimal_localization_tool import (JSON_RESPONSE_FORMAT, ReaskStats, TranslationDeduper, build_system_prompt, clean_translation_text,
+                                       parse_localization_response, process_csv_data, process_group_localization, process_localization,
+                                       run_localization_pipeline)
+
+# Sample rows in the same shape as read_csv_file returns
+csv_data = [
+    {"IDS": "ID1", "EN": "Tap on the biggest flower.", "LOCID": "LEVEL_TEXT_1"},
+    {"IDS": "ID1", "EN": "Drag out the Sun behind Lily's head.", "LOCID": "HINT_1_1"},
+    {"IDS": "ID2", "EN": "Lets find Tricky Lily", "LOCID": "LEVEL_TEXT_2"},
+    {"IDS": "ID2", "EN": "Doctor Worry dont worry?", "LOCID": "END_2_1"},
+    {"IDS": "ID3", "EN": "Where is the sun?", "LOCID": "LEVEL_TEXT_3"},
+]
+
+
+def run(max_workers):
+    return process_csv_data(csv_data, None, languages=["TR", "FR"], debug=True, skip_images=True, max_workers=max_workers)
+
+
+def test_sequential_results_keep_csv_order():
+    results = run(1)
+    assert [r["filename"] for r in results] == ["ID1.unknown", "ID2.unknown", "ID3.unknown"]
+    assert list(results[0].keys()) == ["filename", "description", "OCR_EN", "LEVEL_TEXT_1", "HINT_1_1"]
+    assert results[1]["END_2_1"]["EN"] == "Doctor Worry dont worry?"
+
+
+def test_concurrent_results_match_sequential():
+    assert run(8) == run(1)
+
+
+def test_grouped_mode_uses_one_request_and_falls_back_per_row(monkeypatch):
+    calls = []
+
+    def fake_completion(system_prompt, user_prompt, model_id, api_key=None, max_tokens=512, rate_limiter=None, cancel_event=None, response_format=None):
+        calls.append(user_prompt)
+        if len(calls) == 1:
+            # Grouped answer that is missing the French text of HINT_1_1
+            return "```json\n" + json.dumps({
+                "LEVEL_TEXT_1": {"Turkish": "En büyük çiçeğe dokun.", "French": "Touche la plus grande fleur."},
+                "HINT_1_1": {"turkish": "Güneşi sürükle."},
+            }) + "\n```"
+        return "Turkish: Güneşi sürükle.\nFrench: Fais glisser le soleil."
+
+    monkeypatch.setattr(minimal_localization_tool, "request_completion", fake_completion)
+    localizations = process_group_localization("A screen", csv_data[:2], languages=["TR", "FR"])
+
+    assert len(calls) == 2
+    assert "English Texts (JSON keyed by LOCID)" in calls[0]
+    # Only the missing language is asked for again
+    assert "in French that" in calls[1]
+    assert localizations["LEVEL_TEXT_1"]["french"] == "Touche la plus grande fleur."
+    assert localizations["HINT_1_1"]["french"] == "Fais glisser le soleil."
+
+
+def test_custom_prompts_keep_the_grouped_answer_format():
+    prompt = build_system_prompt("A screen", ["TR", "FR"], custom_prompt="Localize this Brain Test level.", grouped=True)
+    assert prompt.startswith("Localize this Brain Test level.")
+    assert '{"LOCID": {"turkish": "[Translated text only]", "french": "[Translated text only]"}}' in prompt
+
+
+def test_grouped_debug_results_match_per_row():
+    grouped = process_csv_data(csv_data, None, languages=["TR", "FR"], debug=True, skip_images=True, grouped=True)
+    assert grouped == run(1)
+
+
+def test_parse_localization_response_reads_json_and_labels():
+    assert parse_localization_response('```json\n{"Turkish": "Güneş nerede?", "french": "Où est le soleil ?"}\n```',
+                                       ["turkish", "french"]) == {"turkish": "Güneş nerede?", "french": "Où est le soleil ?"}
+    # Labels in any order, upper case or bold, with text spanning several lines
+    labeled = "**FRENCH:** Où est\nle soleil ?\nTurkish: Güneş nerede?"
+    assert parse_localization_response(labeled, ["turkish", "french"]) == {"turkish": "Güneş nerede?", "french": "Où est\nle soleil ?"}
+    assert parse_localization_response("Turkish: Güneş nerede?", ["turkish", "german"]) == {"turkish": "Güneş nerede?"}
+    assert clean_translation_text("**Text:** Güneş nerede?\n\n**Explanation:** a pun") == "Güneş nerede?"
+
+
+def test_process_localization_uses_json_mode_for_supported_models(monkeypatch):
+    formats = []
+
+    def fake_completion(system_prompt, user_prompt, model_id, api_key=None, max_tokens=512, rate_limiter=None, cancel_event=None, response_format=None):
+        formats.append(response_format)
+        if response_format:
+            return json.dumps({"turkish": "Güneş nerede?"})
+        return "Turkish: Güneş nerede?\n\nExplanation: literal"
+
+    monkeypatch.setattr(minimal_localization_tool, "request_completion", fake_completion)
+    assert process_localization("desc", "Where is the sun?", "grok3", ["TR"])["turkish"] == "Güneş nerede?"
+    assert process_localization("desc", "Where is the sun?", "claude-3-7-sonnet", ["TR"])["turkish"] == "Güneş nerede?"
+    # Custom prompts, which the web UI always sends, use JSON mode too
+    assert process_localization("desc", "Where is the sun?", "grok3", ["TR"], custom_prompt="Localize this level.")["turkish"] == "Güneş nerede?"
+    assert formats == [JSON_RESPONSE_FORMAT, None, JSON_RESPONSE_FORMAT]
+    assert '{"turkish": "[Translated text only]"}' in build_system_prompt("desc", ["TR"], "Localize this level.", json_output=True)
+
+
+def test_missing_languages_are_reasked_within_budget(monkeypatch):
+    prompts = []
+
+    def fake_completion(system_prompt, user_prompt, model_id, api_key=None, max_tokens=512, rate_limiter=None, cancel_event=None, response_format=None):
+        prompts.append(user_prompt)
+        # German never comes back; French only once Turkish is done
+        if "French" in user_prompt and "Turkish" not in user_prompt:
+            return json.dumps({"french": "Où est le soleil ?"})
+        return json.dumps({"turkish": "Güneş nerede?"})
+
+    monkeypatch.setattr(minimal_localization_tool, "request_completion", fake_completion)
+    stats = ReaskStats()
+    localization = process_localization("desc", "Where is the sun?", "grok3", ["TR", "FR", "DE"], max_reasks=2, reask_stats=stats)
+    assert localization["turkish"] == "Güneş nerede?"
+    assert localization["french"] == "Où est le soleil ?"
+    assert localization["german"].startswith("Error:")
+    assert len(prompts) == 3
+    assert stats.stats() == {
+        "french": {"texts": 1, "reasks": 1, "recovered": 1, "failed": 0},
+        "german": {"texts": 1, "reasks": 2, "recovered": 0, "failed": 1},
+    }
+
+    prompts.clear()
+    assert process_localization("desc", "Where is the sun?", "grok3", ["TR", "FR"], max_reasks=0)["french"].startswith("Error:")
+    assert len(prompts) == 1
+
+
+def test_repeated_texts_are_translated_once(monkeypatch):
+    repeated = csv_data + [
+        {"IDS": "ID4", "EN": "Where is  the sun? ", "LOCID": "LEVEL_TEXT_4"},
+        {"IDS": "ID4", "EN": "Tap on the biggest flower.", "LOCID": "HINT_4_1"},
+    ]
+    texts = []
+    real_localization = minimal_localization_tool.process_localization
+
+    def counting_localization(description, english_text, *args, **kwargs):
+        texts.append(english_text)
+        return real_localization(description, english_text, *args, **kwargs)
+
+    monkeypatch.setattr(minimal_localization_tool, "process_localization", counting_localization)
+    undeduped = process_csv_data(repeated, None, languages=["TR"], debug=True, skip_images=True, dedupe=None)
+    assert len(texts) == 7
+
+    texts.clear()
+    deduped = process_csv_data(repeated, None, languages=["TR"], debug=True, skip_images=True, max_workers=4, dedupe="text")
+    assert len(texts) == 5
+    assert deduped[3]["LEVEL_TEXT_4"]["EN"] == "Where is  the sun? "
+    assert deduped[3]["HINT_4_1"] == undeduped[3]["HINT_4_1"]
+
+
+def test_completion_requests_retry_connection_and_server_errors(monkeypatch):
+    import httpx
+    from types import SimpleNamespace
+    from openai import APIConnectionError, APITimeoutError, InternalServerError
+    from rate_limiter import AdaptiveRateLimiter
+
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    failures = [APIConnectionError(request=request), APITimeoutError(request=request),
+                InternalServerError("Bad gateway", response=httpx.Response(502, request=request), body=None)]
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        if failures:
+            raise failures.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Turkish: Merhaba"))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(minimal_localization_tool, "get_api_clients", lambda api_key: SimpleNamespace(openai_client=client))
+    monkeypatch.setattr(minimal_localization_tool, "cancellable_sleep", lambda seconds, cancel_event=None: None)
+    limiter = AdaptiveRateLimiter(requests_per_minute=6000, tokens_per_minute=10**7)
+
+    # Two retries are not enough for three failures in a row
+    try:
+        minimal_localization_tool.request_completion("system", "Hello", "model", api_key="key", rate_limiter=limiter)
+        assert False, "the third failure should be raised"
+    except InternalServerError:
+        pass
+    assert len(calls) == 3
+    assert minimal_localization_tool.request_completion("system", "Hello", "model", api_key="key", rate_limiter=limiter) == "Turkish: Merhaba"
+    assert limiter.stats()["rate_limited"] == 0
+
+
+def test_rows_wait_for_a_translation_in_flight():
+    deduper = TranslationDeduper("description")
+    calls = []
+
+    def slow_translate(rows, description, languages):
+        calls.append([row['LOCID'] for row in rows])
+        time.sleep(0.2)
+        return [(row['LOCID'], {"EN": row['EN'], "turkish": "Güneş nerede?"}) for row in rows]
+
+    results = []
+    threads = [threading.Thread(target=lambda row=row: results.append(deduper.translate_rows([row], "desc", ["TR"], slow_translate)))
+               for row in ({"EN": "Where is the sun?", "LOCID": "A"}, {"EN": "Where is the sun?", "LOCID": "B"})]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    assert calls == [["A"]]
+    assert sorted(entry for [(entry, _)] in results) == ["A", "B"]
+    assert deduper.stats() == {"rows": 2, "translated": 1, "saved": 1}
+    # A different image description is a different request
+    deduper.translate_rows([{"EN": "Where is the sun?", "LOCID": "C"}], "other desc", ["TR"], slow_translate)
+    assert len(calls) == 2
+
+
+def test_rows_take_over_a_text_whose_request_failed():
+    deduper = TranslationDeduper("text")
+    calls = []
+
+    def flaky_translate(rows, description, languages):
+        calls.append([row['LOCID'] for row in rows])
+        time.sleep(0.2)
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        return [(row['LOCID'], {"EN": row['EN'], "turkish": "Güneş nerede?"}) for row in rows]
+
+    outcomes = {}
+
+    def run_row(locid):
+        try:
+            outcomes[locid] = deduper.translate_rows([{"EN": "Where is the sun?", "LOCID": locid}], "desc", ["TR"], flaky_translate)
+        except RuntimeError as e:
+            outcomes[locid] = e
+
+    threads = [threading.Thread(target=run_row, args=(locid,)) for locid in ("A", "B", "C")]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    # Only the owner's group fails; one waiting row translates the text for both of them
+    assert isinstance(outcomes["A"], RuntimeError)
+    assert len(calls) == 2
+    assert outcomes["B"] == [("B", {"EN": "Where is the sun?", "turkish": "Güneş nerede?"})]
+    assert outcomes["C"] == [("C", {"EN": "Where is the sun?", "turkish": "Güneş nerede?"})]
+    assert deduper.stats()["rows"] == 3
+
+
+def test_rows_take_over_a_text_whose_translation_came_back_as_an_error():
+    deduper = TranslationDeduper("text")
+    calls = []
+
+    def flaky_translate(rows, description, languages):
+        calls.append([row['LOCID'] for row in rows])
+        time.sleep(0.2)
+        turkish = "Error: connection reset" if len(calls) == 1 else "Güneş nerede?"
+        return [(row['LOCID'], {"EN": row['EN'], "turkish": turkish}) for row in rows]
+
+    outcomes = {}
+    threads = [threading.Thread(target=lambda locid=locid: outcomes.update(
+                   deduper.translate_rows([{"EN": "Where is the sun?", "LOCID": locid}], "desc", ["TR"], flaky_translate)))
+               for locid in ("A", "B")]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    # The error stays with the owner's row; the waiting row sends its own request
+    assert len(calls) == 2
+    assert outcomes["A"]["turkish"] == "Error: connection reset"
+    assert outcomes["B"]["turkish"] == "Güneş nerede?"
+    assert deduper.stats() == {"rows": 2, "translated": 2, "saved": 0}
+    # A later row reuses the successful translation, not the error
+    [(_, entry)] = deduper.translate_rows([{"EN": "Where is the sun?", "LOCID": "C"}], "desc", ["TR"], flaky_translate)
+    assert entry["turkish"] == "Güneş nerede?" and len(calls) == 2
+    assert deduper.stats()["saved"] == 1
+
+
+def test_streaming_results_match_in_memory_grouping(tmp_path):
+    unsorted = csv_data[2:] + csv_data[:2] + [{"IDS": "ID2", "EN": "One more", "LOCID": "HINT_2_1"}]
+    expected = process_csv_data(unsorted, None, languages=["TR"], debug=True, skip_images=True)
+    spilled = process_csv_data(iter(unsorted), None, languages=["TR"], debug=True, skip_images=True, max_workers=4,
+                               streaming=True, spill_dir=str(tmp_path))
+    assert spilled == expected
+    assert list(tmp_path.iterdir()) == []
+
+    contiguous = process_csv_data(iter(csv_data), None, languages=["TR"], debug=True, skip_images=True,
+                                  streaming=True, sorted_input=True)
+    assert contiguous == process_csv_data(csv_data, None, languages=["TR"], debug=True, skip_images=True)
+
+
+
+def test_pipeline_describes_ahead_and_keeps_order():
+    groups = [(f"ID{i}", [{"LOCID": f"TEXT_{i}", "EN": str(i)}]) for i in range(6)]
+    translation_started = threading.Event()
+    described_early = []
+
+    def describe(image_id):
+        # Upcoming images are described while the first translation is still running
+        if image_id != "ID0":
+            described_early.append(translation_started.is_set())
+        return {"filename": image_id, "description": image_id, "OCR_EN": ""}
+
+    def translate(rows, description):
+        if description == "ID0":
+            translation_started.set()
+            time.sleep(0.2)
+        return [(row["LOCID"], row["EN"]) for row in rows]
+
+    results = list(run_localization_pipeline(groups, describe, translate, max_workers=3))
+    assert [r["filename"] for r in results] == [f"ID{i}" for i in range(6)]
+    assert [r[f"TEXT_{i}"] for i, r in enumerate(results)] == [str(i) for i in range(6)]
+    assert described_early
+
+
+def test_pipeline_cancel_keeps_finished_groups_and_returns_quickly():
+    groups = [(f"ID{i}", [{"LOCID": f"TEXT_{i}", "EN": str(i)}]) for i in range(6)]
+    cancel_event = threading.Event()
+    release = threading.Event()
+
+    def describe(image_id):
+        return {"filename": image_id, "description": image_id, "OCR_EN": ""}
+
+    def translate(rows, description):
+        if description == "ID1":
+            # A slow request that is still in flight when the job is cancelled
+            cancel_event.set()
+            release.wait(5)
+        return [(row["LOCID"], row["EN"]) for row in rows]
+
+    start = time.monotonic()
+    try:
+        results = list(run_localization_pipeline(groups, describe, translate, max_workers=1, cancel_event=cancel_event))
+    finally:
+        release.set()
+    assert time.monotonic() - start < 2
+    assert [r["filename"] for r in results] == ["ID0"]
+
+
+def test_pipeline_producer_exits_when_the_consumer_stops():
+    groups = [(f"ID{i}", [{"LOCID": f"TEXT_{i}", "EN": str(i)}]) for i in range(3)]
+
+    def describe(image_id):
+        return {"filename": image_id, "description": image_id, "OCR_EN": ""}
+
+    def translate(rows, description):
+        return [(row["LOCID"], row["EN"]) for row in rows]
+
+    pipeline = run_localization_pipeline(groups, describe, translate, lookahead=1)
+    assert next(pipeline)["filename"] == "ID0"
+    # The producer is left with a full queue and must not block on it forever
+    pipeline.close()
+    deadline = time.monotonic() + 2
+    while any(thread.name == "vision-producer" for thread in threading.enumerate()) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not any(thread.name == "vision-producer" for thread in threading.enumerate())
+
+
+def test_pipeline_stages_overlap_within_the_rate_limiter(monkeypatch):
+    rows = [{"IDS": f"ID{i}", "EN": f"Text {i}.{j}", "LOCID": f"TEXT_{i}_{j}"} for i in range(4) for j in range(2)]
+    lock = threading.Lock()
+    translating = [0]
+    described_during_translation = []
+
+    def slow_describe(image_id, images_dir, api_key=None, debug=False, skip_images=False, rate_limiter=None, **kwargs):
+        with rate_limiter.slot():
+            with lock:
+                described_during_translation.append(translating[0] > 0)
+            time.sleep(0.2)
+        return {"filename": image_id, "description": image_id, "OCR_EN": ""}
+
+    def slow_localization(description, english_text, model, languages, *args, rate_limiter=None, **kwargs):
+        with rate_limiter.slot():
+            with lock:
+                translating[0] += 1
+            time.sleep(0.2)
+            with lock:
+                translating[0] -= 1
+        return {"english": english_text, "turkish": english_text}
+
+    monkeypatch.setattr(minimal_localization_tool, "describe_image_group", slow_describe)
+    monkeypatch.setattr(minimal_localization_tool, "process_localization", slow_localization)
+    results = process_csv_data(rows, None, languages=["TR"], api_key="pipeline-overlap-test", debug=True, max_workers=1, dedupe=None)
+
+    assert len(results) == 4
+    # With one worker per stage the limiter still has a slot for the vision stage
+    # while a translation holds the other one
+    assert any(described_during_translation)
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(4), indent=2, ensure_ascii=False))
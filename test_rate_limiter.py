@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# Test script to verify the adaptive rate limiter used for OpenRouter requests
+
+import time
+import threading
+import pytest
+from rate_limiter import AdaptiveRateLimiter, RateLimitExceeded, RequestCancelled, call_with_rate_limit, parse_retry_after
+
+
+def test_parse_retry_after_headers():
+    assert parse_retry_after({"Retry-After": "3"}) == 3.0
+    assert parse_retry_after({"retry-after-ms": "1500"}) == 1.5
+    reset_ms = str(int((time.time() + 10) * 1000))
+    assert 8 < parse_retry_after({"X-RateLimit-Reset": reset_ms}) <= 10
+    assert parse_retry_after({}) is None
+
+
+def test_rate_limit_shrinks_and_success_grows_concurrency():
+    limiter = AdaptiveRateLimiter(requests_per_minute=6000, tokens_per_minute=10**7, max_concurrency=8)
+    limiter.record_rate_limit(0.01)
+    assert limiter.concurrency_limit == 4
+    for _ in range(100):
+        limiter.record_success()
+    assert limiter.concurrency_limit == 8
+
+
+def test_call_with_rate_limit_retries_429():
+    limiter = AdaptiveRateLimiter(requests_per_minute=6000, tokens_per_minute=10**7, max_concurrency=2)
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitExceeded(retry_after=0.01)
+        return "ok"
+
+    assert call_with_rate_limit(send, limiter) == "ok"
+    assert len(attempts) == 3
+    assert limiter.stats()["rate_limited"] == 2
+
+
+def test_cancel_stops_waiting_for_a_slot():
+    limiter = AdaptiveRateLimiter(requests_per_minute=1, tokens_per_minute=10**7, max_concurrency=2)
+    limiter.acquire()
+    limiter.release()
+    cancel_event = threading.Event()
+    threading.Timer(0.1, cancel_event.set).start()
+
+    # The next request would wait up to a minute for the request budget
+    start = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        call_with_rate_limit(lambda: "sent", limiter, cancel_event=cancel_event)
+    assert time.monotonic() - start < 2
+
+
+def test_jobs_on_one_key_keep_the_largest_concurrency_cap():
+    limiter = AdaptiveRateLimiter(requests_per_minute=6000, tokens_per_minute=10**7, max_concurrency=8)
+    with limiter.job(6):
+        # A smaller job starting later does not lower the cap of the running one
+        with limiter.job(2):
+            assert limiter.stats()["max_concurrency"] == 6
+        limiter.add_job(10)
+        assert limiter.stats()["max_concurrency"] == 10
+        limiter.remove_job(10)
+        assert limiter.stats()["max_concurrency"] == 6
+    assert limiter.stats()["max_concurrency"] == 8
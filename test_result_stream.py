@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# Test script to verify results are streamed to JSONL and exported from it
+
+import io
+import json
+from minimal_localization_tool import process_csv_data
+from result_stream import JsonlResults, checkpoint_path, iter_jsonl, write_json_array
+
+csv_data = [
+    {"IDS": "ID1", "EN": "Tap on the biggest flower.", "LOCID": "LEVEL_TEXT_1"},
+    {"IDS": "ID2", "EN": "Lets find Tricky Lily", "LOCID": "LEVEL_TEXT_2"},
+    {"IDS": "ID2", "EN": "Doctor Worry dont worry?", "LOCID": "END_2_1"},
+]
+
+
+def test_json_array_matches_json_dump():
+    items = [{"a": "ü", "b": {"c": [1, 2]}}, {"d": ""}]
+    for value in (items, []):
+        out = io.StringIO()
+        write_json_array(iter(value), out)
+        assert out.getvalue() == json.dumps(value, ensure_ascii=False, indent=2)
+
+
+def test_results_streamed_to_jsonl_with_progress(tmp_path):
+    results_file = tmp_path / "results.jsonl"
+    progress = []
+    count = process_csv_data(csv_data, None, languages=["TR"], debug=True, skip_images=True,
+                             results_file=str(results_file), keep_results=False,
+                             on_result=lambda image_id, result, done, total: progress.append((image_id, result["filename"], done, total)))
+    assert count == 2
+    assert progress == [("ID1", "ID1.unknown", 1, 2), ("ID2", "ID2.unknown", 2, 2)]
+    assert list(JsonlResults(str(results_file))) == process_csv_data(csv_data, None, languages=["TR"], debug=True, skip_images=True)
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"filename": "ID1.png"}\n{"filename": "ID', encoding="utf-8")
+    assert list(iter_jsonl(str(path))) == [{"filename": "ID1.png"}]
+
+
+def test_resume_only_redoes_missing_work(tmp_path, monkeypatch):
+    import minimal_localization_tool
+    calls = []
+
+    def fake_localization(description, english_text, model="grok3", languages=None, *args, **kwargs):
+        calls.append((english_text, languages))
+        return {minimal_localization_tool.LANGUAGE_NAMES[code]: f"{code}: {english_text}" for code in languages}
+
+    monkeypatch.setattr(minimal_localization_tool, "process_localization", fake_localization)
+    checkpoint_file = str(tmp_path / "job.checkpoint.jsonl")
+    process_csv_data(csv_data, None, languages=["TR"], skip_images=True, use_cache=False, use_description_cache=False,
+                     checkpoint_file=checkpoint_file)
+
+    # Mark one translation of the first run as failed
+    lines = [json.loads(line) for line in open(checkpoint_file, encoding="utf-8")]
+    lines[1]["result"]["END_2_1"]["turkish"] = "Error: timeout"
+    with open(checkpoint_file, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(line) + "\n" for line in lines)
+
+    calls.clear()
+    resumed = process_csv_data(csv_data, None, languages=["TR", "FR"], skip_images=True, use_cache=False, use_description_cache=False,
+                               checkpoint_file=checkpoint_file, resume=True)
+
+    # French is new for every row, Turkish is only redone for the failed row
+    assert calls == [("Tap on the biggest flower.", ["FR"]), ("Lets find Tricky Lily", ["FR"]), ("Doctor Worry dont worry?", ["TR", "FR"])]
+    assert resumed[1]["END_2_1"] == {"EN": "Doctor Worry dont worry?", "turkish": "TR: Doctor Worry dont worry?", "french": "FR: Doctor Worry dont worry?"}
+
+    # Nothing is left to do on a second resume
+    calls.clear()
+    assert process_csv_data(csv_data, None, languages=["TR", "FR"], skip_images=True, use_cache=False, use_description_cache=False,
+                            checkpoint_file=checkpoint_file, resume=True) == resumed
+    assert calls == []
+    # The index of the loaded checkpoint is removed again
+    assert [path.name for path in tmp_path.iterdir()] == ["job.checkpoint.jsonl"]
+
+
+def test_checkpoints_of_jobs_on_the_same_csv_do_not_collide(tmp_path):
+    assert checkpoint_path(str(tmp_path), "uploads/levels.csv") == str(tmp_path / "levels.checkpoint.jsonl")
+    first = checkpoint_path(str(tmp_path), "uploads/levels.csv", "job1")
+    second = checkpoint_path(str(tmp_path), "other/levels.csv", "job2")
+    assert first == str(tmp_path / "levels.job1.checkpoint.jsonl")
+    assert first != second